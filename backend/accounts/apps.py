@@ -1,6 +1,25 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core import checks
 
 
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        import accounts.signals
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Cached token authentication needs a cache every worker shares"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend.endswith(('LocMemCache', 'DummyCache')):
+        return [checks.Warning(
+            'The default cache is per-process, so logouts and role changes only '
+            'invalidate cached token authentication in one worker.',
+            hint='Set CACHE_BACKEND and CACHE_LOCATION to a shared cache (Redis or Memcached).',
+            id='accounts.W001',
+        )]
+    return []
@@ -0,0 +1,64 @@
+"""
+Token authentication with the token, its user and the user's profile cached.
+
+``TokenAuthentication`` reads the token and user on every request, and
+the permission classes then load ``request.user.userprofile`` for the
+role. Here all three come from one query on a cache miss and none on a
+hit.
+
+Entries are dropped once the transaction that deletes a token, saves a
+user or changes a role commits (see ``accounts.signals``). Writes that skip
+signals (``QuerySet.update()``) must call ``forget_user()`` themselves;
+otherwise entries expire after ``AUTH_CACHE_TIMEOUT`` seconds. Every web
+worker must see the same cache for this to hold: with the per-process
+``LocMemCache`` a logout only reaches one worker (``check --deploy`` warns).
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+
+TOKEN_CACHE_KEY = 'auth:token:{}'
+
+
+def auth_cache_timeout():
+    return getattr(settings, 'AUTH_CACHE_TIMEOUT', 5 * 60)
+
+
+def token_cache_key(key):
+    # Keys are secrets; keep them out of the cache's key space
+    return TOKEN_CACHE_KEY.format(hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+
+def forget_token(key):
+    cache.delete(token_cache_key(key))
+
+
+def forget_user(user):
+    """Drop the cached authentication of ``user``'s (a user or its id) tokens"""
+    from rest_framework.authtoken.models import Token
+    keys = Token.objects.filter(user=user).values_list('key', flat=True)
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """``TokenAuthentication`` that resolves token -> user -> profile through the cache"""
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        token = cache.get(cache_key)
+        if token is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related('user__userprofile').get(key=key)
+            except model.DoesNotExist:
+                raise AuthenticationFailed(_('Invalid token.'))
+            cache.set(cache_key, token, auth_cache_timeout())
+
+        if not token.user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return (token.user, token)
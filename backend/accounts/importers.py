@@ -0,0 +1,201 @@
+"""
+Bulk staff provisioning (a season's casual workers at once).
+
+Rows are validated together, with one query for usernames already taken.
+Passwords are hashed across a process pool. Users, profiles, farm group
+memberships and API tokens are then written with ``bulk_create`` in a
+single transaction. ``bulk_create`` skips the ``post_save`` signals, so
+the profiles and group memberships the signals would add one user at a
+time are written here, a batch at a time. Nothing is written unless
+every row is valid.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.authtoken.models import Token
+
+from permissions.models import UserProfile
+from permissions.signals import ROLE_GROUPS, farm_group_ids
+
+from .serializers import StaffRowSerializer
+
+
+USER_FIELDS = ('username', 'email', 'first_name', 'last_name')
+PROFILE_FIELDS = (
+    'phone_number', 'employee_id', 'hire_date', 'salary', 'weekly_tasks', 'is_active_employee', 'notes'
+)
+
+BATCH_SIZE = 1000
+
+# Starting spawned workers takes about a second; below this many passwords
+# hashing in-process (a few hundred ms each) is quicker
+INLINE_HASH_LIMIT = 8
+
+
+def _clean_row(row):
+    """Drop blank spreadsheet cells so defaults apply"""
+    if not isinstance(row, dict):
+        return None
+    return {
+        key: value.strip() if isinstance(value, str) and key != 'password' else value
+        for key, value in row.items()
+        if value is not None and value != ''
+    }
+
+
+def validate_rows(rows, default_role='guest'):
+    """
+    Validate every row.
+
+    Returns ``(validated, errors)``, both keyed by row index. Rows without
+    a ``role`` get ``default_role``.
+    """
+    serializer = StaffRowSerializer()
+    validated = {}
+    errors = {}
+    for index, row in enumerate(rows):
+        row = _clean_row(row)
+        if row is None:
+            errors[index] = {'non_field_errors': ['Expected an object.']}
+            continue
+        try:
+            data = serializer.run_validation(row)
+        except serializers.ValidationError as exc:
+            errors[index] = exc.detail
+            continue
+        data.setdefault('role', default_role)
+        # As create_staff() will store it, so the checks below see the same name
+        data['username'] = User.normalize_username(data['username'])
+        if 'password' in data:
+            try:
+                validate_password(data['password'], User(**{field: data.get(field, '') for field in USER_FIELDS}))
+            except DjangoValidationError as exc:
+                errors[index] = {'password': exc.messages}
+                continue
+        validated[index] = data
+
+    # One query for the usernames already taken
+    by_username = {}
+    for index, data in validated.items():
+        by_username.setdefault(data['username'], []).append(index)
+    taken = set(User.objects.filter(username__in=by_username).values_list('username', flat=True))
+    for username, indexes in by_username.items():
+        if username in taken:
+            for index in indexes:
+                errors[index] = {'username': ['A user with that username already exists.']}
+        else:
+            for index in indexes[1:]:
+                errors[index] = {'username': [f'Repeats row {indexes[0] + 1}.']}
+    return validated, errors
+
+
+def hash_passwords(passwords, workers=None):
+    """``make_password()`` of each password (``None`` for an unusable one)"""
+    if workers is None:
+        workers = getattr(settings, 'PASSWORD_HASH_WORKERS', 1)
+    if workers < 2 or sum(password is not None for password in passwords) < INLINE_HASH_LIMIT:
+        return [make_password(password) for password in passwords]
+    # Spawned rather than forked: the parent is a (possibly threaded) web
+    # worker holding database connections. Workers load the hasher settings.
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup,
+    ) as pool:
+        return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def create_staff(entries, tokens=True, workers=None):
+    """
+    Create a user, profile, farm group membership and (with ``tokens``) an
+    API token for each validated entry.
+
+    Returns the profiles, in order, with ``profile.user`` (and its
+    ``auth_token``) attached.
+    """
+    passwords = hash_passwords([data.get('password') for data in entries], workers)
+    users = []
+    for data, password in zip(entries, passwords):
+        is_admin = data['role'] == 'admin'
+        fields = {field: data.get(field, '') for field in USER_FIELDS}
+        # What User.objects.create_user() would store
+        fields['username'] = User.normalize_username(fields['username'])
+        fields['email'] = User.objects.normalize_email(fields['email'])
+        users.append(User(**fields, password=password, is_staff=is_admin, is_superuser=is_admin))
+
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        if any(user.pk is None for user in users):
+            # Backends that cannot return ids from a bulk insert
+            pks = dict(
+                User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id')
+            )
+            for user in users:
+                user.pk = pks[user.username]
+
+        profiles = [
+            UserProfile(user=user, role=data['role'], **{field: data[field] for field in PROFILE_FIELDS if field in data})
+            for user, data in zip(users, entries)
+        ]
+        UserProfile.objects.bulk_create(profiles, batch_size=BATCH_SIZE)
+        if any(profile.pk is None for profile in profiles):
+            pks = dict(
+                UserProfile.objects.filter(user__in=[user.pk for user in users]).values_list('user_id', 'id')
+            )
+            for profile in profiles:
+                profile.pk = pks[profile.user_id]
+
+        group_ids = farm_group_ids()
+        User.groups.through.objects.bulk_create(
+            [User.groups.through(user_id=profile.user_id, group_id=group_ids[ROLE_GROUPS[profile.role]])
+             for profile in profiles if profile.role in ROLE_GROUPS],
+            batch_size=BATCH_SIZE,
+        )
+
+        if tokens:
+            Token.objects.bulk_create(
+                [Token(user=user, key=Token.generate_key()) for user in users], batch_size=BATCH_SIZE,
+            )
+
+    for profile in profiles:
+        profile.loaded_role = profile.role
+    return profiles
+
+
+def import_staff(rows, default_role='guest', tokens=True, workers=None):
+    """
+    Validate and create a batch of staff accounts.
+
+    Returns ``(report, ok)``. ``report['errors']`` holds one entry per
+    invalid row (1-based ``row`` numbers); when it is non-empty nothing is
+    written. Rows without a ``password`` get an unusable one and sign in
+    with their token.
+    """
+    validated, errors = validate_rows(rows, default_role)
+    report = {
+        'created': 0,
+        'errors': [
+            {'row': index + 1, 'errors': errors[index]}
+            for index in sorted(errors)
+        ],
+        'users': [],
+    }
+    if errors or not rows:
+        return report, not errors
+
+    profiles = create_staff([validated[index] for index in range(len(rows))], tokens, workers)
+    report['created'] = len(profiles)
+    report['users'] = [
+        {
+            'row': index + 1, 'id': profile.user.pk, 'username': profile.user.username, 'role': profile.role,
+            **({'token': profile.user.auth_token.key} if tokens else {}),
+        }
+        for index, profile in enumerate(profiles)
+    ]
+    return report, True
@@ -0,0 +1,62 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ParseError
+
+from accounts.importers import import_staff
+from animals.parsers import ROW_FORMATS, guess_row_format, read_rows
+from permissions.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Create staff accounts from a CSV, JSON or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument(
+            '--format',
+            dest='row_format',
+            choices=ROW_FORMATS,
+            help='File format (guessed from the extension by default)',
+        )
+        parser.add_argument(
+            '--role',
+            default='guest',
+            choices=[role for role, _ in UserProfile.ROLE_CHOICES],
+            help='Role for rows without one (default: guest)',
+        )
+        parser.add_argument('--tokens', metavar='PATH', help='Write each username and API token to this CSV file')
+        parser.add_argument('--workers', type=int, help='Password hashing processes (default: PASSWORD_HASH_WORKERS)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        row_format = options['row_format'] or guess_row_format(path)
+
+        started = time.monotonic()
+        try:
+            with open(path, 'rb') as stream:
+                rows = read_rows(stream, row_format, key='staff')
+        except OSError as exc:
+            raise CommandError(f'Could not read {path}: {exc}')
+        except ParseError as exc:
+            raise CommandError(str(exc.detail))
+
+        self.stdout.write(f'Importing {len(rows)} staff from {path}...')
+        report, ok = import_staff(rows, options['role'], workers=options['workers'])
+
+        if not ok:
+            for error in report['errors']:
+                self.stderr.write(f"Row {error['row']}: {error['errors']}")
+            raise CommandError(f"{len(report['errors'])} invalid rows; nothing was imported.")
+
+        if options['tokens']:
+            with open(options['tokens'], 'w', newline='') as stream:
+                writer = csv.writer(stream)
+                writer.writerow(['username', 'token'])
+                writer.writerows((user['username'], user['token']) for user in report['users'])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"Created {report['created']} staff accounts in {elapsed:.1f}s")
+        )
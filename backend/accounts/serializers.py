@@ -2,6 +2,9 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+
+from permissions.models import UserProfile
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -48,3 +51,21 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'date_joined')
         read_only_fields = ('id', 'date_joined')
+
+
+class StaffRowSerializer(serializers.Serializer):
+    """One row of a staff import: the account and its profile"""
+
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    password = serializers.CharField(required=False, trim_whitespace=False)
+    email = serializers.EmailField(required=False)
+    first_name = serializers.CharField(required=False, max_length=150)
+    last_name = serializers.CharField(required=False, max_length=150)
+    role = serializers.ChoiceField(choices=UserProfile.ROLE_CHOICES, required=False)
+    phone_number = serializers.CharField(required=False, max_length=15)
+    employee_id = serializers.CharField(required=False, max_length=20)
+    hire_date = serializers.DateField(required=False)
+    salary = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    weekly_tasks = serializers.CharField(required=False)
+    is_active_employee = serializers.BooleanField(required=False)
+    notes = serializers.CharField(required=False)
@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from permissions.models import UserProfile
+
+from .authentication import forget_token, forget_user
+
+
+# Invalidate only once the change commits: until then another request
+# could read, and cache again, the old rows.
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    key = instance.key
+    transaction.on_commit(lambda: forget_token(key))
+
+
+@receiver(post_save, sender=User)
+def forget_saved_user(sender, instance, created, update_fields=None, **kwargs):
+    """Deactivation, password changes, ... (not the last_login stamp of a login)"""
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    user_id = instance.pk
+    transaction.on_commit(lambda: forget_user(user_id))
+
+
+@receiver(post_save, sender=UserProfile)
+def forget_changed_role(sender, instance, created, **kwargs):
+    if created or instance.role == instance.loaded_role:
+        return
+    user_id = instance.user_id
+    transaction.on_commit(lambda: forget_user(user_id))
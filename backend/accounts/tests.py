@@ -0,0 +1,199 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from accounts.importers import import_staff
+from accounts.views import create_user_view
+from permissions.models import UserProfile
+from permissions.permissions import HasCapability
+from permissions.signals import _group_ids
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_user('manager', password='pw-123456')
+        admin.userprofile.role = 'admin'
+        admin.userprofile.save()
+        worker = User.objects.create_user('herder', password='pw-123456')
+        cls.admin_id, cls.worker_id = admin.pk, worker.pk
+        cls.admin_token = Token.objects.create(user=admin).key
+        cls.worker_token = Token.objects.create(user=worker).key
+
+    def setUp(self):
+        cache.clear()
+        # Running on_commit callbacks caches group ids this test rolls back
+        self.addCleanup(_group_ids.clear)
+
+    def get(self, token, name, **kwargs):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        return self.client.get(reverse(name, kwargs=kwargs))
+
+    def test_warm_path_is_free(self):
+        with self.assertNumQueries(1):  # token, user and profile together
+            response = self.get(self.worker_token, 'accounts:profile')
+        self.assertEqual(response.data['role'], 'guest')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(self.worker_token, 'accounts:profile').status_code, 200)
+
+    def test_role_change_and_logout_invalidate(self):
+        self.assertEqual(self.get(self.worker_token, 'accounts:list_users').status_code, 403)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.admin_token}')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                reverse('accounts:update_user_role', kwargs={'user_id': self.worker_id}), {'role': 'admin'},
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.get(self.worker_token, 'accounts:list_users').status_code, 200)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.worker_token}')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(reverse('accounts:logout')).status_code, 200)
+        self.assertEqual(self.get(self.worker_token, 'accounts:profile').status_code, 401)
+
+    def test_changes_outside_the_api_invalidate(self):
+        self.assertEqual(self.get(self.admin_token, 'accounts:list_users').status_code, 200)
+        profile = UserProfile.objects.get(user_id=self.admin_id)
+        profile.role = 'farm_worker'  # e.g. in the Django admin
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertEqual(self.get(self.admin_token, 'accounts:list_users').status_code, 403)
+
+        self.assertEqual(self.get(self.worker_token, 'accounts:profile').status_code, 200)
+        worker = User.objects.get(pk=self.worker_id)
+        worker.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            worker.save()
+        self.assertEqual(self.get(self.worker_token, 'accounts:profile').status_code, 401)
+
+        self.assertEqual(self.get(self.admin_token, 'accounts:profile').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            Token.objects.get(key=self.admin_token).delete()
+        self.assertEqual(self.get(self.admin_token, 'accounts:profile').status_code, 401)
+
+
+class CapabilityTests(APITestCase):
+    def test_accountant(self):
+        accountant = User.objects.create_user('books', password='pw-123456')
+        accountant.userprofile.role = 'farm_accountant'
+        accountant.userprofile.save()
+        self.client.force_authenticate(User.objects.select_related('userprofile').get(pk=accountant.pk))
+
+        response = self.client.get(reverse('accounts:profile'))
+        self.assertEqual(response.data['permissions'], {
+            'can_create_animals': False, 'can_edit_animals': False, 'can_delete_animals': False,
+            'can_view_reports': True, 'can_manage_users': False,
+        })
+        self.assertEqual(response.data['capabilities'], ['animals.view', 'data.export', 'reports.view'])
+        self.assertEqual(self.client.get(reverse('animals:animal-list')).status_code, 200)
+        self.assertEqual(self.client.post(reverse('animals:animal-list'), {'name': 'Kid'}).status_code, 403)
+        self.assertEqual(self.client.get(reverse('animals:animal-parents')).status_code, 403)
+
+    def test_unknown_capability(self):
+        with self.assertRaises(ImproperlyConfigured):
+            HasCapability('animals.milk')
+
+
+class UserGroupTests(APITestCase):
+    def test_groups_follow_role_changes_only(self):
+        User.objects.create_user('owner', password='pw-123456')  # the first user is the admin
+        user = User.objects.create_user('herder', password='pw-123456')
+        self.assertEqual(list(user.groups.values_list('name', flat=True)), ['Guest Users'])
+
+        profile = UserProfile.objects.get(user=user)
+        profile.salary = 1200
+        with self.assertNumQueries(1):  # the profile's own UPDATE
+            profile.save()
+
+        profile.role = 'admin'
+        profile.save()
+        user.refresh_from_db()
+        self.assertEqual(list(user.groups.values_list('name', flat=True)), ['Farm Administrators'])
+        self.assertTrue(user.is_staff and user.is_superuser)
+
+        profile.role = 'manager'  # no farm group
+        profile.save()
+        self.assertFalse(user.groups.exists())
+
+
+class ImportStaffTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_user('manager', password='pw-123456')
+        cls.admin_id = admin.pk
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.select_related('userprofile').get(pk=self.admin_id))
+
+    def test_import(self):
+        rows = [
+            {'username': 'casual1', 'first_name': 'Sane', 'salary': '4500'},
+            {'username': 'casual2', 'password': 'dipping-day-2026'},
+            {'username': 'books', 'role': 'farm_accountant'},
+        ]
+        url = reverse('accounts:import_staff')
+        # usernames taken, group ids (cached once committed), one insert each
+        # for users, profiles, memberships and tokens, and the savepoint
+        with self.assertNumQueries(8):
+            response = self.client.post(f'{url}?role=farm_worker', rows, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual([user['role'] for user in response.data['users']], ['farm_worker', 'farm_worker', 'farm_accountant'])
+
+        casual = User.objects.select_related('userprofile').get(username='casual2')
+        self.assertTrue(casual.check_password('dipping-day-2026'))
+        self.assertFalse(User.objects.get(username='casual1').has_usable_password())
+        self.assertEqual(list(casual.groups.values_list('name', flat=True)), ['Farm Workers'])
+        self.assertEqual(casual.auth_token.key, response.data['users'][1]['token'])
+
+        response = self.client.post(url, [{'username': 'casual1'}, {'username': 'new'}, {'username': 'new'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [1, 3])
+        self.assertFalse(User.objects.filter(username='new').exists())
+
+
+class CreateUserTests(APITestCase):
+    """create_user_view goes through the staff importer; it must store and report what create_user() did"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('manager', password='pw-123456')
+
+    def post(self, user, profile=None):
+        request = APIRequestFactory().post('/', {'user': user, 'profile': profile or {}}, format='json')
+        force_authenticate(request, User.objects.select_related('userprofile').get(pk=self.admin.pk))
+        return create_user_view(request)
+
+    def user(self, **fields):
+        return {'username': 'herder', 'password': 'dipping-day-2026', 'password_confirm': 'dipping-day-2026', **fields}
+
+    def test_normalises_like_create_user(self):
+        response = self.post(self.user(username='ｈｅｒｄｅｒ', email='Herder@Sidai.EXAMPLE'), {'role': 'farm_worker'})
+        self.assertEqual(response.status_code, 201, response.data)
+        user = User.objects.get(pk=response.data['user']['id'])
+        self.assertEqual((user.username, user.email), ('herder', 'Herder@sidai.example'))
+        self.assertEqual(user.userprofile.role, 'farm_worker')
+        self.assertTrue(user.check_password('dipping-day-2026'))
+
+        # The serializer validated the password without the user, as before
+        response = self.post(self.user(username='pastures', password='pastures-9', password_confirm='pastures-9'))
+        self.assertEqual(response.status_code, 201, response.data)
+
+        report, ok = import_staff([{'username': 'ｃａｓｕａｌ', 'email': 'Casual@Sidai.EXAMPLE'}, {'username': 'casual'}])
+        self.assertFalse(ok)
+        self.assertEqual(report['errors'][0]['row'], 2)
+
+    def test_error_shape(self):
+        user = self.user(password_confirm='other')
+        response = self.post(user)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'non_field_errors': ["Passwords don't match"]})
+
+        response = self.post(self.user(), {'role': 'boss', 'salary': 'lots'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'role', 'salary'})
+        self.assertTrue(all(isinstance(messages, list) for messages in response.data.values()))
+        self.assertFalse(User.objects.filter(username='herder').exists())
@@ -10,5 +10,6 @@ urlpatterns = [
     path('profile/', views.user_profile_view, name='profile'),
     path('csrf-token/', views.csrf_token_view, name='csrf_token'),
     path('users/', views.list_users_view, name='list_users'),
+    path('users/bulk/', views.import_staff_view, name='import_staff'),
     path('users/<int:user_id>/role/', views.update_user_role_view, name='update_user_role'),
 ]
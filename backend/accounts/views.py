@@ -1,6 +1,8 @@
 from permissions.serializers import UserProfileSerializer
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
@@ -9,7 +11,10 @@ from django.middleware.csrf import get_token
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.contrib.auth.models import User
+from .importers import create_staff, import_staff, validate_rows
 from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserSerializer
+from animals.parsers import CSVParser, NDJSONParser, guess_row_format, read_rows
+from permissions import capabilities
 from permissions.permissions import IsAdminUser
 from permissions.models import UserProfile
 
@@ -23,21 +28,19 @@ def create_user_view(request):
     # Create user
     serializer = UserRegistrationSerializer(data=user_data)
     if serializer.is_valid():
-        user = serializer.save()
-        # Create or update profile
-        profile, created = UserProfile.objects.get_or_create(user=user)
-        profile.role = profile_data.get('role', 'guest')
-        profile.salary = profile_data.get('salary')
-        profile.weekly_tasks = profile_data.get('weekly_tasks', '')
-        profile.phone_number = profile_data.get('phone_number')
-        profile.employee_id = profile_data.get('employee_id')
-        profile.hire_date = profile_data.get('hire_date')
-        profile.is_active_employee = profile_data.get('is_active_employee', True)
-        profile.notes = profile_data.get('notes', '')
-        profile.save()
+        fields = {
+            key: value for key, value in serializer.validated_data.items() if key not in ('password', 'password_confirm')
+        }
+        # User, profile and group written once each, without a second profile save.
+        # The password passed the serializer's validators; it is not checked again.
+        validated, errors = validate_rows([{**profile_data, **fields}])
+        if errors:
+            # Field -> messages, as serializer.errors
+            return Response(dict(errors[0]), status=status.HTTP_400_BAD_REQUEST)
+        profile = create_staff([{**validated[0], 'password': serializer.validated_data['password']}], tokens=False)[0]
         return Response({
             'message': 'User created successfully',
-            'user': UserSerializer(user).data,
+            'user': UserSerializer(profile.user).data,
             'profile': UserProfileSerializer(profile).data
         }, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -89,7 +92,7 @@ def login_view(request):
 @permission_classes([IsAuthenticated])
 def logout_view(request):
     try:
-        # Delete token
+        # Delete token (its cached authentication goes with it, see accounts.signals)
         Token.objects.filter(user=request.user).delete()
         
         # Clear session
@@ -109,27 +112,15 @@ def logout_view(request):
 def user_profile_view(request):
     user_data = UserSerializer(request.user).data
     
-    # Add role information if profile exists
+    # Role and what it allows, from the capability matrix
+    role = capabilities.role_of(request.user) or 'guest'
+    user_data['role'] = role
     if hasattr(request.user, 'userprofile'):
-        user_data['role'] = request.user.userprofile.role
         user_data['role_display'] = request.user.userprofile.get_role_display()
-        user_data['permissions'] = {
-            'can_create_animals': request.user.userprofile.is_admin,
-            'can_edit_animals': request.user.userprofile.is_admin or request.user.userprofile.is_farm_worker,
-            'can_delete_animals': request.user.userprofile.is_admin,
-            'can_view_reports': request.user.userprofile.is_admin or request.user.userprofile.is_farm_worker or request.user.userprofile.is_farm_accountant,
-            'can_manage_users': request.user.userprofile.is_admin,
-        }
     else:
-        user_data['role'] = 'guest'
         user_data['role_display'] = 'Guest User'
-        user_data['permissions'] = {
-            'can_create_animals': False,
-            'can_edit_animals': False,
-            'can_delete_animals': False,
-            'can_view_reports': False,
-            'can_manage_users': False,
-        }
+    user_data['permissions'] = capabilities.profile_flags(role)
+    user_data['capabilities'] = capabilities.capabilities_of(role)
     
     return Response(user_data)
 
@@ -166,6 +157,34 @@ def list_users_view(request):
     return Response({'users': users_data})
 
 
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+@parser_classes([JSONParser, NDJSONParser, CSVParser, MultiPartParser])
+def import_staff_view(request):
+    """
+    Create many staff accounts at once from CSV, JSON or NDJSON (body or uploaded ``file``).
+
+    ``?role=`` sets the role of rows without one (default guest). Every
+    user gets an API token, listed in the report.
+    """
+    default_role = request.query_params.get('role', 'guest')
+    if default_role not in dict(UserProfile.ROLE_CHOICES):
+        return Response({'error': 'Invalid role'}, status=status.HTTP_400_BAD_REQUEST)
+
+    upload = request.FILES.get('file')
+    if upload is not None:
+        rows = read_rows(upload, guess_row_format(upload.name, upload.content_type), key='staff')
+    elif isinstance(request.data, list):
+        rows = request.data
+    elif isinstance(request.data, dict) and isinstance(request.data.get('staff'), list):
+        rows = request.data['staff']
+    else:
+        raise ParseError('Send a list of staff, a "staff" list, or a "file" upload.')
+
+    report, ok = import_staff(rows, default_role)
+    return Response(report, status=status.HTTP_201_CREATED if ok else status.HTTP_400_BAD_REQUEST)
+
+
 @api_view(['PUT'])
 @permission_classes([IsAdminUser])
 def update_user_role_view(request, user_id):
@@ -185,7 +204,7 @@ def update_user_role_view(request, user_id):
             profile.salary = request.data['salary']
         if 'weekly_tasks' in request.data:
             profile.weekly_tasks = request.data['weekly_tasks']
-        profile.save()  # This will trigger the signal to update groups
+        profile.save()  # This will trigger the signals to update groups and cached authentication
 
         return Response({
             'message': f'User {user.username} role updated to {profile.get_role_display()}',
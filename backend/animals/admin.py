@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Animal
+from .models import Animal, AnimalIdSequence, HealthEvent, WeightRecord
 
 
 @admin.register(Animal)
@@ -7,7 +7,7 @@ class AnimalAdmin(admin.ModelAdmin):
     list_display = ['animal_id', 'name', 'sex', 'breed', 'year_of_birth', 'health_status', 'created_at']
     list_filter = ['sex', 'breed', 'health_status', 'year_of_birth']
     search_fields = ['animal_id', 'name', 'notes']
-    readonly_fields = ['animal_id', 'qr_code', 'created_at', 'updated_at']
+    readonly_fields = ['animal_id', 'created_at', 'updated_at']
     
     fieldsets = (
         ('Basic Information', {
@@ -21,7 +21,31 @@ class AnimalAdmin(admin.ModelAdmin):
             'fields': ('weight', 'health_status', 'notes')
         }),
         ('System', {
-            'fields': ('qr_code', 'created_at', 'updated_at'),
+            'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(AnimalIdSequence)
+class AnimalIdSequenceAdmin(admin.ModelAdmin):
+    list_display = ['prefix', 'last_value']
+    search_fields = ['prefix']
+
+
+@admin.register(WeightRecord)
+class WeightRecordAdmin(admin.ModelAdmin):
+    list_display = ['animal', 'weight', 'measured_at', 'recorded_by']
+    list_filter = ['measured_at']
+    search_fields = ['animal__animal_id', 'animal__name']
+    raw_id_fields = ['animal']
+    date_hierarchy = 'measured_at'
+
+
+@admin.register(HealthEvent)
+class HealthEventAdmin(admin.ModelAdmin):
+    list_display = ['animal', 'status', 'diagnosis', 'treatment', 'vet', 'occurred_on']
+    list_filter = ['status', 'occurred_on']
+    search_fields = ['animal__animal_id', 'animal__name', 'diagnosis', 'treatment', 'vet']
+    raw_id_fields = ['animal']
+    date_hierarchy = 'occurred_on'
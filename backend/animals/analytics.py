@@ -0,0 +1,148 @@
+"""
+Growth analytics over weight records.
+
+Records are fetched column-wise with ``values_list`` and everything after
+that is NumPy: per-animal figures come from ``np.add.reduceat`` over
+records sorted by animal, so the cost is a single query plus a few
+vector operations, whatever the herd size.
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+from django.db import connections
+
+
+SECONDS_PER_DAY = 86400.0
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+DAYS_PER_MONTH = 30.4375
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def load_records(records):
+    """
+    Fetch ``(animal, day, weight)`` arrays from a ``WeightRecord`` queryset.
+
+    Rows are ordered by animal then time; ``day`` is days since the epoch.
+    """
+    queryset = records.order_by('animal_id', 'measured_at', 'id').values_list('animal_id', 'measured_at', 'weight')
+    # Django's per-value converters (time zones, Decimal) cost more than the
+    # query itself at this size, so the rows are read from the cursor as-is.
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+    animals, times, weights = zip(*rows)
+    return np.array(animals, dtype=np.int64), _epoch_days(times), np.array(weights, dtype=float)
+
+
+def _epoch_days(times):
+    # Naive values from the database are UTC (USE_TZ). Subtracting is several
+    # times faster than datetime.timestamp() or a datetime64 conversion.
+    epoch = EPOCH if times[0].tzinfo is not None else EPOCH.replace(tzinfo=None)
+    seconds = np.fromiter(((moment - epoch).total_seconds() for moment in times), dtype=float, count=len(times))
+    return seconds / SECONDS_PER_DAY
+
+
+def day_to_datetime(day):
+    return datetime.fromtimestamp(day * SECONDS_PER_DAY, tz=timezone.utc)
+
+
+def birth_day(year_of_birth):
+    """Mid-year of the birth year, in epoch days; only the year is recorded"""
+    return datetime(int(year_of_birth), 7, 1, tzinfo=timezone.utc).timestamp() / SECONDS_PER_DAY
+
+
+def daily_gain(animals, days, weights):
+    """
+    Average daily gain (kg/day) per animal.
+
+    ADG is the least-squares slope of weight over time, so one bad reading
+    moves it less than a first-to-last difference would. Animals with a
+    single reading, or all readings at the same moment, get NaN.
+
+    Returns a dict of arrays, one entry per animal, in ``animals`` order.
+    """
+    if not len(animals):
+        empty = np.empty(0)
+        return {
+            'animal': np.empty(0, dtype=np.int64), 'records': np.empty(0, dtype=np.int64),
+            'first_day': empty, 'last_day': empty, 'first_weight': empty, 'last_weight': empty, 'adg': empty,
+        }
+    starts = np.flatnonzero(np.r_[True, animals[1:] != animals[:-1]])
+    ends = np.r_[starts[1:], len(animals)] - 1
+    count = np.diff(np.r_[starts, len(animals)]).astype(float)
+
+    # Centre each animal's times on its first reading to keep the sums small
+    t = days - np.repeat(days[starts], count.astype(np.int64))
+    sum_t = np.add.reduceat(t, starts)
+    sum_w = np.add.reduceat(weights, starts)
+    sum_tt = np.add.reduceat(t * t, starts)
+    sum_tw = np.add.reduceat(t * weights, starts)
+    denominator = count * sum_tt - sum_t * sum_t
+    with np.errstate(divide='ignore', invalid='ignore'):
+        adg = np.where(denominator > 1e-12, (count * sum_tw - sum_t * sum_w) / denominator, np.nan)
+
+    return {
+        'animal': animals[starts],
+        'records': count.astype(np.int64),
+        'first_day': days[starts],
+        'last_day': days[ends],
+        'first_weight': weights[starts],
+        'last_weight': weights[ends],
+        'adg': adg,
+    }
+
+
+def summarize(values, percentiles=PERCENTILES):
+    """Count, mean and percentiles of the finite ``values``"""
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    summary = {'count': int(values.size)}
+    if not values.size:
+        summary['mean'] = None
+        summary.update({f'p{p}': None for p in percentiles})
+        return summary
+    summary['mean'] = float(values.mean())
+    summary.update(zip((f'p{p}' for p in percentiles), np.percentile(values, percentiles).tolist()))
+    return summary
+
+
+def group_summaries(keys, values, percentiles=PERCENTILES):
+    """``summarize()`` for each distinct key; returns ``[(key, summary), ...]`` sorted by key"""
+    keys = np.asarray(keys)
+    values = np.asarray(values, dtype=float)
+    if not keys.size:
+        return []
+    order = np.argsort(keys, kind='stable')
+    keys, values = keys[order], values[order]
+    distinct, starts = np.unique(keys, return_index=True)
+    return [
+        (key.item(), summarize(group, percentiles))
+        for key, group in zip(distinct, np.split(values, starts[1:]))
+    ]
+
+
+def growth_curve(animals, days, weights, births, bin_days=DAYS_PER_MONTH):
+    """
+    Weight by age for a group of animals.
+
+    ``births`` maps animal id to its birth day (see ``birth_day()``).
+    Readings are binned by age; each bin reports the age in days at its
+    start and ``summarize()`` of the weights in it.
+    """
+    if not len(animals):
+        return []
+    ids = np.fromiter(births.keys(), dtype=np.int64, count=len(births))
+    born = np.fromiter(births.values(), dtype=float, count=len(births))
+    order = np.argsort(ids)
+    ids, born = ids[order], born[order]
+    age = days - born[np.searchsorted(ids, animals)]
+    keep = age >= 0
+    bins = np.floor(age[keep] / bin_days).astype(np.int64)
+    return [
+        dict(age_days=round(bin_ * bin_days), **summary)
+        for bin_, summary in group_summaries(bins, weights[keep])
+    ]
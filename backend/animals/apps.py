@@ -1,6 +1,30 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core import checks
 
 
 class AnimalsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'animals'
+
+    def ready(self):
+        import animals.signals
+        from farm_management import search
+        from .models import Animal
+        search.register(Animal, {'animal_id': 'A', 'name': 'A', 'notes': 'C'})
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_herd_cache(app_configs, **kwargs):
+    """Cached herd results are invalidated on write, which a per-process cache only sees in one worker"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend.endswith('LocMemCache'):
+        from .cache import herd_cache_timeout
+        return [checks.Warning(
+            'The default cache is per-process, so edits only invalidate cached herd statistics, '
+            'parent picker lists and QR scan lookups in the worker that made them; the others '
+            f'serve them for up to {herd_cache_timeout()}s.',
+            hint='Set CACHE_BACKEND and CACHE_LOCATION to a shared cache (Redis or Memcached).',
+            id='animals.W001',
+        )]
+    return []
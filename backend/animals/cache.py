@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.cache import cache
+
+
+STATISTICS_CACHE_KEY = 'animals:statistics'
+
+# Parent picker candidates, one list per animal type ('all' for every type)
+PARENTS_CACHE_KEY = 'animals:parents:{}'
+PARENT_TYPES = ['all', 'Cow', 'Goat', 'Sheep', 'Pig', 'Dog']
+
+# QR scan lookups, one entry per animal_id tag
+SCAN_CACHE_KEY = 'animals:scan:{}'
+
+HERD_CACHE_KEYS = [
+    STATISTICS_CACHE_KEY,
+    *(PARENTS_CACHE_KEY.format(type_) for type_ in PARENT_TYPES),
+]
+
+
+def herd_cache_timeout():
+    return getattr(settings, 'HERD_CACHE_TIMEOUT', 60 * 60)
+
+
+def invalidate_herd_caches():
+    """Drop every cached herd-wide result (statistics, ...)"""
+    cache.delete_many(HERD_CACHE_KEYS)
+
+
+def invalidate_scans(animal_ids):
+    """
+    Drop the cached scan results for these animal_id tags.
+
+    Only a shared cache backend drops them for every worker; with locmem the
+    others keep them for ``herd_cache_timeout()``.
+    """
+    cache.delete_many([SCAN_CACHE_KEY.format(tag) for tag in animal_ids])
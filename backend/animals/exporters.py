@@ -0,0 +1,236 @@
+"""
+Streaming herd export.
+
+Rows are read with a server-side ``.iterator()`` and written out a chunk at
+a time, so memory use does not grow with the herd. The columns match the
+bulk import format: ``father`` and ``mother`` hold ``animal_id`` tags, so an
+export can be imported into another farm as-is. Timestamps are written as
+the JSON API renders them, in ``TIME_ZONE``.
+
+CSV cells starting with a character a spreadsheet would read as a formula
+(``=``, ``+``, ``-``, ``@``) get a leading ``'``, so a name or note typed
+by a user cannot run in the accountant's spreadsheet. XLSX cells are
+inline strings, which are never evaluated.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.fields import DateTimeField
+
+
+CHUNK_SIZE = 2000
+
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('animal_id', 'animal_id'),
+    ('type', 'type'),
+    ('name', 'name'),
+    ('sex', 'sex'),
+    ('breed', 'breed'),
+    ('year_of_birth', 'year_of_birth'),
+    ('father', 'father__animal_id'),
+    ('mother', 'mother__animal_id'),
+    ('father_name', 'father_name'),
+    ('mother_name', 'mother_name'),
+    ('weight', 'weight'),
+    ('health_status', 'health_status'),
+    ('notes', 'notes'),
+    ('age', 'age'),
+    ('offspring_count', 'offspring_count'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+)
+
+
+def export_rows(queryset, chunk_size=CHUNK_SIZE):
+    """Yield one tuple per animal in ``queryset`` (annotated with ``with_summary()``)"""
+    return queryset.values_list(*(source for _, source in EXPORT_COLUMNS)).iterator(chunk_size=chunk_size)
+
+
+_encoder = DjangoJSONEncoder()
+
+_datetime_field = DateTimeField()
+
+# Leading characters that make a spreadsheet read a CSV cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _api_value(value):
+    """``value`` as the JSON API renders it (datetimes in the current time zone)"""
+    if isinstance(value, datetime):
+        return _datetime_field.to_representation(value)
+    return value
+
+
+def _cell(value):
+    """Spreadsheet text for a value; dates are written as in the JSON API"""
+    if value is None:
+        return ''
+    value = _api_value(value)
+    if hasattr(value, 'isoformat'):
+        return _encoder.default(value)
+    return value
+
+
+def _csv_cell(value):
+    value = _cell(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _batched(rows, size=CHUNK_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for batch in _batched(rows):
+        writer.writerows([_csv_cell(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def stream_ndjson(rows):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for batch in _batched(rows):
+        yield ''.join(
+            _encoder.encode(dict(zip(names, map(_api_value, row)))) + '\n' for row in batch
+        ).encode('utf-8')
+
+
+class _ZipSink:
+    """Write-only file object that hands ``ZipFile`` output back to a generator"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_zip(members, compression=zipfile.ZIP_DEFLATED):
+    """
+    Stream a ZIP archive built from ``members``.
+
+    ``members`` yields ``(name, chunks)`` pairs, where ``chunks`` is an
+    iterable of bytes. The archive is written without seeking (sizes go in
+    data descriptors), so nothing is buffered beyond the current chunk.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=compression) as archive:
+        for name, chunks in members:
+            with archive.open(name, 'w') as member:
+                for chunk in chunks:
+                    member.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+    # The last member's data descriptor and the central directory
+    yield sink.drain()
+
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Herd" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+# Control characters are not allowed in XML 1.0
+_XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    text = _XML_ILLEGAL.sub('', str(_cell(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return '<row>' + ''.join(_xlsx_cell(value) for value in values) + '</row>'
+
+
+def _xlsx_sheet(rows):
+    yield (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        + _xlsx_row(name for name, _ in EXPORT_COLUMNS)
+    ).encode('utf-8')
+    for batch in _batched(rows):
+        yield ''.join(_xlsx_row(row) for row in batch).encode('utf-8')
+    yield b'</sheetData></worksheet>'
+
+
+def stream_xlsx(rows):
+    """A single-sheet workbook with inline strings, written as it streams"""
+    members = [(name, [content.encode('utf-8')]) for name, content in XLSX_PARTS.items()]
+    members.append(('xl/worksheets/sheet1.xml', _xlsx_sheet(rows)))
+    return stream_zip(members)
+
+
+STREAMS = {
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+    'xlsx': stream_xlsx,
+}
@@ -0,0 +1,534 @@
+"""
+Bulk herd import and batch updates.
+
+Rows are validated with the ``AnimalCreateSerializer`` rules, parents are
+resolved by ``animal_id`` (within the batch first, then the existing herd)
+with one query, IDs are reserved a block per prefix, and everything is
+written with ``bulk_create`` in a single transaction. Nothing is written
+unless every row is valid; the report lists the problems per row.
+
+``update_animals()`` applies a batch of edits (a weighing or dipping
+day) the same way: validated together, one query for the animals and one
+for the parents they name, then a single ``bulk_update``.
+
+QR codes are not rendered here; ``AnimalViewSet.qr_code`` renders them on
+first request.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+
+from farm_management import search
+from sync import changelog
+
+from .cache import invalidate_herd_caches, invalidate_scans
+from .models import Animal, AnimalIdSequence, WeightRecord
+from .serializers import AnimalCreateSerializer, AnimalSerializer, WeightRecordSerializer
+
+
+PARENT_FIELDS = ('father', 'mother')
+
+BATCH_SIZE = 1000
+
+
+def _clean_row(row):
+    """Drop blank spreadsheet cells so model defaults apply"""
+    if not isinstance(row, dict):
+        return None
+    return {
+        key: value.strip() if isinstance(value, str) else value
+        for key, value in row.items()
+        if value is not None and value != ''
+    }
+
+
+def _resolve_parents(rows, validated):
+    """
+    Map every father/mother reference to an existing animal or a batch row.
+
+    Returns ``{(row_index, field): Animal or row_index}`` and a dict of
+    per-row errors.
+    """
+    batch_ids = {}
+    for index, row in enumerate(rows):
+        tag = row.get('animal_id') if row else None
+        if tag:
+            batch_ids.setdefault(str(tag), index)
+
+    references = {
+        str(row[field])
+        for index, row in enumerate(rows)
+        if index in validated
+        for field in PARENT_FIELDS
+        if row.get(field)
+    }
+    existing = {
+        animal.animal_id: animal
+        for animal in Animal.objects.filter(
+            animal_id__in=references - set(batch_ids)
+        ).only('id', 'animal_id', 'sex')
+    }
+
+    checker = AnimalCreateSerializer()
+    parents = {}
+    errors = {}
+    for index in validated:
+        for field in PARENT_FIELDS:
+            tag = rows[index].get(field)
+            if not tag:
+                continue
+            tag = str(tag)
+            if tag in batch_ids:
+                parent_index = batch_ids[tag]
+                if parent_index == index:
+                    errors.setdefault(index, {})[field] = ['An animal cannot be its own parent.']
+                    continue
+                if parent_index not in validated:
+                    errors.setdefault(index, {})[field] = [f'Parent "{tag}" is not valid in this batch.']
+                    continue
+                parents[(index, field)] = parent_index
+                candidate = Animal(sex=validated[parent_index]['sex'])
+            elif tag in existing:
+                candidate = parents[(index, field)] = existing[tag]
+            else:
+                errors.setdefault(index, {})[field] = [f'No animal with animal_id "{tag}".']
+                continue
+            validator = getattr(checker, f'validate_{field}')
+            try:
+                validator(candidate)
+            except serializers.ValidationError as exc:
+                errors.setdefault(index, {})[field] = exc.detail
+    return parents, errors
+
+
+def _check_explicit_ids(rows):
+    max_length = Animal._meta.get_field('animal_id').max_length
+    errors = {}
+    seen = {}
+    for index, row in enumerate(rows):
+        tag = row.get('animal_id') if row else None
+        if not tag:
+            continue
+        tag = str(tag)
+        if len(tag) > max_length:
+            errors[index] = {'animal_id': [f'Ensure this field has no more than {max_length} characters.']}
+        elif tag in seen:
+            errors[index] = {'animal_id': [f'Duplicate animal_id "{tag}" in this batch (row {seen[tag] + 1}).']}
+        else:
+            seen[tag] = index
+    taken = set(Animal.objects.filter(animal_id__in=list(seen)).values_list('animal_id', flat=True))
+    for tag in taken:
+        errors[seen[tag]] = {'animal_id': [f'Animal with animal_id "{tag}" already exists.']}
+    return errors
+
+
+def _generations(parents, validated):
+    """
+    Split batch rows into generations so parents are inserted before offspring.
+
+    Returns ``(generations, errors)``; rows whose parentage within the batch
+    is circular are reported as errors.
+    """
+    batch_parents = {}
+    for (index, field), parent in parents.items():
+        if isinstance(parent, int):
+            batch_parents.setdefault(index, []).append(parent)
+
+    depth = {}
+    errors = {}
+    for start in validated:
+        stack = [start]
+        visiting = set()
+        while stack:
+            index = stack[-1]
+            if index in depth:
+                stack.pop()
+                continue
+            visiting.add(index)
+            pending = [parent for parent in batch_parents.get(index, []) if parent not in depth]
+            cycle = [parent for parent in pending if parent in visiting]
+            if cycle:
+                for member in stack[stack.index(cycle[0]):]:
+                    errors[member] = {'non_field_errors': ['Circular parentage within this batch.']}
+                    depth[member] = 0
+                    visiting.discard(member)
+                stack = stack[:stack.index(cycle[0])]
+                continue
+            if pending:
+                stack.extend(pending)
+                continue
+            depth[index] = 1 + max((depth[parent] for parent in batch_parents.get(index, [])), default=-1)
+            visiting.discard(index)
+            stack.pop()
+
+    generations = {}
+    for index in validated:
+        generations.setdefault(depth[index], []).append(index)
+    return [generations[level] for level in sorted(generations)], errors
+
+
+def validate_rows(rows):
+    """
+    Validate every row.
+
+    Returns ``(rows, validated, parents, generations, errors)``: the cleaned
+    rows, validated data and parent references keyed by row index, the row
+    indexes grouped into insert order, and errors keyed by row index.
+    """
+    rows = [_clean_row(row) for row in rows]
+    serializer = AnimalCreateSerializer()
+    writable = set(serializer.fields) - set(PARENT_FIELDS)
+
+    validated = {}
+    errors = {}
+    for index, row in enumerate(rows):
+        if row is None:
+            errors[index] = {'non_field_errors': ['Expected an object.']}
+            continue
+        try:
+            validated[index] = serializer.run_validation(
+                {key: value for key, value in row.items() if key in writable}
+            )
+        except serializers.ValidationError as exc:
+            errors[index] = exc.detail
+
+    for index, row_errors in _check_explicit_ids(rows).items():
+        errors.setdefault(index, {}).update(row_errors)
+
+    parents, parent_errors = _resolve_parents(rows, validated)
+    for index, row_errors in parent_errors.items():
+        errors.setdefault(index, {}).update(row_errors)
+
+    generations, cycle_errors = _generations(parents, validated)
+    for index, row_errors in cycle_errors.items():
+        errors.setdefault(index, {}).update(row_errors)
+
+    return rows, validated, parents, generations, errors
+
+
+def import_animals(rows):
+    """
+    Validate and create a batch of animals.
+
+    Returns ``(report, ok)``. ``report['errors']`` holds one entry per
+    invalid row (1-based ``row`` numbers); when it is non-empty nothing is
+    written.
+    """
+    rows, validated, parents, generations, errors = validate_rows(rows)
+    report = {
+        'created': 0,
+        'errors': [
+            {'row': index + 1, 'errors': errors[index]}
+            for index in sorted(errors)
+        ],
+        'animals': [],
+    }
+    if errors or not rows:
+        return report, not errors
+
+    animals = [
+        Animal(animal_id=str(row['animal_id']) if row.get('animal_id') else '', **validated[index])
+        for index, row in enumerate(rows)
+    ]
+
+    with transaction.atomic():
+        by_prefix = {}
+        explicit = {}
+        for animal in animals:
+            if not animal.animal_id:
+                by_prefix.setdefault(animal.animal_id_prefix(), []).append(animal)
+            elif AnimalIdSequence.parse(animal.animal_id):
+                prefix, number = AnimalIdSequence.parse(animal.animal_id)
+                explicit[prefix] = max(explicit.get(prefix, 0), number)
+        # Generated IDs must not collide with tags carried in the file
+        for prefix, number in explicit.items():
+            AnimalIdSequence.advance_to(prefix, number)
+        for prefix, group in by_prefix.items():
+            for animal, animal_id in zip(group, Animal.reserve_animal_ids(prefix, len(group))):
+                animal.animal_id = animal_id
+
+        # Parents inside the batch are inserted a generation ahead, so every
+        # father/mother id is known when its offspring are written.
+        for generation in generations:
+            batch = []
+            for index in generation:
+                animal = animals[index]
+                for field in PARENT_FIELDS:
+                    parent = parents.get((index, field))
+                    if parent is not None:
+                        setattr(animal, field, animals[parent] if isinstance(parent, int) else parent)
+                batch.append(animal)
+            Animal.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+            if any(animal.pk is None for animal in batch):
+                # Backends that cannot return ids from a bulk insert
+                pks = dict(
+                    Animal.objects.filter(
+                        animal_id__in=[animal.animal_id for animal in batch]
+                    ).values_list('animal_id', 'id')
+                )
+                for animal in batch:
+                    animal.pk = pks[animal.animal_id]
+
+        # bulk_create skips the signals that keep the search index and the
+        # sync change log current
+        search.reindex(Animal, [animal.pk for animal in animals])
+        changelog.record(Animal, [animal.pk for animal in animals])
+
+        # Imported weights start each animal's weight history
+        now = timezone.now()
+        WeightRecord.objects.bulk_create(
+            [WeightRecord(animal=animal, weight=animal.weight, measured_at=now)
+             for animal in animals if animal.weight is not None],
+            batch_size=BATCH_SIZE,
+        )
+
+    invalidate_herd_caches()
+
+    report['created'] = len(animals)
+    report['animals'] = [
+        {'row': index + 1, 'id': animal.pk, 'animal_id': animal.animal_id}
+        for index, animal in enumerate(animals)
+    ]
+    return report, True
+
+
+def _resolve_animals(rows):
+    """Map each row's ``animal_id`` tag or ``animal`` pk to an animal pk, with one query"""
+    tags = {str(row['animal_id']) for row in rows if row and row.get('animal_id')}
+    pks = set()
+    for row in rows:
+        if row and not row.get('animal_id') and row.get('animal'):
+            try:
+                pks.add(int(row['animal']))
+            except (TypeError, ValueError):
+                pass
+    by_tag, by_pk = {}, set()
+    if tags or pks:
+        for pk, tag in Animal.objects.filter(Q(animal_id__in=tags) | Q(pk__in=pks)).values_list('id', 'animal_id'):
+            by_tag[tag] = pk
+            by_pk.add(pk)
+
+    resolved, errors = {}, {}
+    for index, row in enumerate(rows):
+        if not row:
+            continue
+        if row.get('animal_id'):
+            tag = str(row['animal_id'])
+            if tag in by_tag:
+                resolved[index] = by_tag[tag]
+            else:
+                errors[index] = {'animal_id': [f'No animal with animal_id "{tag}".']}
+        elif row.get('animal'):
+            try:
+                pk = int(row['animal'])
+            except (TypeError, ValueError):
+                pk = None
+            if pk in by_pk:
+                resolved[index] = pk
+            else:
+                errors[index] = {'animal': [f'No animal with id "{row["animal"]}".']}
+        else:
+            errors[index] = {'animal_id': ['Give the animal\'s animal_id (or its id as "animal").']}
+    return resolved, errors
+
+
+def import_weights(rows, measured_at=None, recorded_by=None):
+    """
+    Record a weighing session.
+
+    Each row names the animal by ``animal_id`` tag (or ``animal`` pk) and
+    gives its ``weight``; ``measured_at`` defaults to the session's time.
+    Returns ``(report, ok)`` like ``import_animals()``; nothing is written
+    unless every row is valid. ``Animal.weight`` is updated to the latest
+    reading of every animal weighed, in one statement.
+    """
+    rows = [_clean_row(row) for row in rows]
+    session_time = measured_at or timezone.now()
+    serializer = WeightRecordSerializer()
+    # Animals are resolved for the whole session at once, below
+    del serializer.fields['animal']
+
+    validated = {}
+    errors = {}
+    for index, row in enumerate(rows):
+        if row is None:
+            errors[index] = {'non_field_errors': ['Expected an object.']}
+            continue
+        data = {key: row[key] for key in ('weight', 'measured_at', 'notes') if key in row}
+        data.setdefault('measured_at', session_time)
+        try:
+            validated[index] = serializer.run_validation(data)
+        except serializers.ValidationError as exc:
+            errors[index] = exc.detail
+
+    animals, animal_errors = _resolve_animals(rows)
+    for index, row_errors in animal_errors.items():
+        errors.setdefault(index, {}).update(row_errors)
+
+    report = {
+        'created': 0,
+        'errors': [
+            {'row': index + 1, 'errors': errors[index]}
+            for index in sorted(errors)
+        ],
+    }
+    if errors or not rows:
+        return report, not errors
+
+    records = [
+        WeightRecord(animal_id=animals[index], recorded_by=recorded_by, **validated[index])
+        for index in range(len(rows))
+    ]
+    with transaction.atomic():
+        WeightRecord.objects.bulk_create(records, batch_size=BATCH_SIZE)
+        WeightRecord.sync_latest_weights(set(animals.values()))
+    invalidate_scans(Animal.objects.filter(pk__in=set(animals.values())).values_list('animal_id', flat=True))
+
+    report['created'] = len(records)
+    return report, True
+
+
+def _resolve_targets(rows):
+    """Load the animals named by each row's ``id`` or ``animal_id``, with one query"""
+    pks, tags = set(), set()
+    for row in rows:
+        if row is None:
+            continue
+        if row.get('id') is not None:
+            try:
+                pks.add(int(row['id']))
+            except (TypeError, ValueError):
+                pass
+        elif row.get('animal_id'):
+            tags.add(str(row['animal_id']))
+    by_pk, by_tag = {}, {}
+    if pks or tags:
+        for animal in Animal.objects.filter(Q(pk__in=pks) | Q(animal_id__in=tags)):
+            by_pk[animal.pk] = by_tag[animal.animal_id] = animal
+
+    targets, errors = {}, {}
+    seen = {}
+    for index, row in enumerate(rows):
+        if row is None:
+            continue
+        if row.get('id') is not None:
+            try:
+                animal = by_pk.get(int(row['id']))
+            except (TypeError, ValueError):
+                animal = None
+            if animal is None:
+                errors[index] = {'id': [f'No animal with id "{row["id"]}".']}
+                continue
+        elif row.get('animal_id'):
+            animal = by_tag.get(str(row['animal_id']))
+            if animal is None:
+                errors[index] = {'animal_id': [f'No animal with animal_id "{row["animal_id"]}".']}
+                continue
+        else:
+            errors[index] = {'id': ['Give the animal\'s id or animal_id.']}
+            continue
+        if animal.pk in seen:
+            errors[index] = {'non_field_errors': [f'This animal is already updated in row {seen[animal.pk] + 1}.']}
+            continue
+        seen[animal.pk] = index
+        targets[index] = animal
+    return targets, errors
+
+
+def update_animals(rows, recorded_by=None):
+    """
+    Validate and apply a batch of partial updates.
+
+    Each row names an animal by ``id`` (or ``animal_id``) and carries the
+    fields to change, as for ``PATCH``; ``father``/``mother`` are animal
+    ids. Returns ``(report, ok)`` like ``import_animals()``; nothing is
+    written unless every row is valid. A changed weight is also recorded
+    as a reading, as a single ``PATCH`` does.
+    """
+    rows = [row if isinstance(row, dict) else None for row in rows]
+    serializer = AnimalSerializer(partial=True)
+    writable = {name for name, field in serializer.fields.items() if not field.read_only} - set(PARENT_FIELDS)
+
+    targets, errors = _resolve_targets(rows)
+    for index, row in enumerate(rows):
+        if row is None:
+            errors[index] = {'non_field_errors': ['Expected an object.']}
+
+    validated = {}
+    for index in targets:
+        try:
+            validated[index] = dict(serializer.run_validation(
+                {key: value for key, value in rows[index].items() if key in writable}
+            ))
+        except serializers.ValidationError as exc:
+            errors[index] = exc.detail
+
+    # Every parent named in the batch, in one query
+    references = {}
+    for index in validated:
+        for field in PARENT_FIELDS:
+            if rows[index].get(field) is not None:
+                try:
+                    references[(index, field)] = int(rows[index][field])
+                except (TypeError, ValueError):
+                    errors.setdefault(index, {})[field] = ['Give the parent\'s id.']
+    parents = Animal.objects.only('id', 'animal_id', 'sex').in_bulk(set(references.values())) if references else {}
+    for (index, field), pk in references.items():
+        if pk == targets[index].pk:
+            errors.setdefault(index, {})[field] = ['An animal cannot be its own parent.']
+        elif pk not in parents:
+            errors.setdefault(index, {})[field] = [f'Invalid pk "{pk}" - object does not exist.']
+        else:
+            try:
+                validated[index][field] = getattr(serializer, f'validate_{field}')(parents[pk])
+            except serializers.ValidationError as exc:
+                errors.setdefault(index, {})[field] = exc.detail
+    for index in validated:
+        for field in PARENT_FIELDS:
+            if field in rows[index] and rows[index][field] is None:
+                validated[index][field] = None
+
+    report = {
+        'updated': 0,
+        'errors': [
+            {'row': index + 1, 'errors': errors[index]}
+            for index in sorted(errors)
+        ],
+        'animals': [],
+    }
+    if errors or not rows:
+        return report, not errors
+
+    now = timezone.now()
+    fields = {'updated_at'}
+    readings = []
+    for index, animal in targets.items():
+        changes = validated[index]
+        previous_weight = animal.weight
+        for field, value in changes.items():
+            setattr(animal, field, value)
+        reading = WeightRecord.reading_for(animal, previous_weight, recorded_by, now)
+        if reading is not None:
+            readings.append(reading)
+        fields.update(changes)
+        animal.updated_at = now
+        report['animals'].append({
+            'row': index + 1, 'id': animal.pk, 'animal_id': animal.animal_id, 'changed': sorted(changes),
+        })
+
+    animals = list(targets.values())
+    with transaction.atomic():
+        Animal.objects.bulk_update(animals, sorted(fields), batch_size=BATCH_SIZE)
+        WeightRecord.objects.bulk_create(readings, batch_size=BATCH_SIZE)
+        # bulk_update skips the signals behind the search index, the sync
+        # change log and the caches
+        if fields & set(search.indexed_fields(Animal)):
+            search.reindex(Animal, [animal.pk for animal in animals])
+        changelog.record(Animal, [animal.pk for animal in animals])
+
+    invalidate_herd_caches()
+    invalidate_scans([animal.animal_id for animal in animals])
+
+    report['updated'] = len(animals)
+    return report, True
@@ -0,0 +1,132 @@
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from animals.models import Animal
+from animals.views import AnimalViewSet
+
+
+# The animal list filters the frontend sends, alone and in the usual pairs
+FILTER_CASES = [
+    {'sex': 'Female'},
+    {'breed': 'Jersey'},
+    {'type': 'Goat'},
+    {'health_status': 'Sick'},
+    {'min_age': 10},
+    {'max_age': 2},
+    {'sex': 'Female', 'breed': 'Jersey'},
+    {'sex': 'Male', 'min_age': 3},
+    {'breed': 'Jersey', 'health_status': 'Sick'},
+    {'type': 'Goat', 'sex': 'Female'},
+]
+
+# Plan lines that mean every row is read or every match is sorted
+SQLITE_WARNINGS = ('USE TEMP B-TREE FOR ORDER BY',)
+POSTGRES_WARNINGS = ('Seq Scan on animals_animal', 'Sort  (')
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the animal list queries for common filters against a seeded herd'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=20000,
+            help='Add this many animals for the run (rolled back afterwards; default 20000)',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Fail if a filtered query scans the whole table or sorts every match',
+        )
+
+    def handle(self, *args, **options):
+        if options['seed'] < 0:
+            raise CommandError('--seed must not be negative.')
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    self._seed(options['seed'])
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')  # planner statistics for the seeded herd
+                warnings = self._run()
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        if not warnings:
+            self.stdout.write(self.style.SUCCESS('Every filtered query uses an index'))
+        elif options['check']:
+            raise CommandError(f'{len(warnings)} query plan(s) scan or sort the table:\n' + '\n'.join(warnings))
+        else:
+            self.stdout.write(self.style.WARNING(f'{len(warnings)} query plan(s) scan or sort the table'))
+
+    def _seed(self, count):
+        # A herd shaped like a real one: mostly cows, mostly healthy, a spread
+        # of ages, and parents recorded for some of the younger half
+        rng = random.Random(0)
+        breeds = [choice for choice, _ in Animal.BREED_CHOICES]
+        types = ['Cow'] * 6 + ['Goat', 'Goat', 'Sheep', 'Pig']
+        statuses = ['Healthy'] * 20 + [choice for choice, _ in Animal.HEALTH_STATUS_CHOICES[1:]]
+        tags = Animal.reserve_animal_ids('CFZ', count)
+        founders = tags[:count // 2]
+
+        def animals(tags, sires=(), dams=()):
+            for number, tag in enumerate(tags):
+                with_parents = sires and dams and number % 2
+                yield Animal(
+                    animal_id=tag, name=f'Plan {number}', sex=rng.choice(['Male', 'Female']),
+                    breed=rng.choice(breeds), type=rng.choice(types), health_status=rng.choice(statuses),
+                    year_of_birth=rng.randint(2008, 2025), notes='Query plan check',
+                    father_id=rng.choice(sires) if with_parents else None,
+                    mother_id=rng.choice(dams) if with_parents else None,
+                )
+
+        Animal.objects.bulk_create(animals(founders), batch_size=500)
+        parents = Animal.objects.filter(animal_id__in=founders)
+        sires = list(parents.filter(sex='Male').values_list('id', flat=True)[:200])
+        dams = list(parents.filter(sex='Female').values_list('id', flat=True)[:2000])
+        Animal.objects.bulk_create(animals(tags[len(founders):], sires, dams), batch_size=500)
+
+    def _run(self):
+        warnings = []
+        markers = SQLITE_WARNINGS if connection.vendor == 'sqlite' else POSTGRES_WARNINGS
+        for params in [{}] + FILTER_CASES:
+            label = '&'.join(f'{key}={value}' for key, value in params.items()) or '(no filters)'
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            for sql in self._list_queries(params):
+                plan = self._explain(sql)
+                self.stdout.write(f'  {sql[:100]}...')
+                for line in plan:
+                    self.stdout.write(f'    {line}')
+                if params and (any(marker in line for marker in markers for line in plan) or self._full_scan(plan)):
+                    warnings.append(f'{label}: {sql[:100]}...')
+        return warnings
+
+    def _list_queries(self, params):
+        """The SQL one list request runs: the ETag aggregate, the count and the page"""
+        view = AnimalViewSet(action_map={'get': 'list'}, action='list', format_kwarg=None, args=(), kwargs={})
+        view.request = view.initialize_request(APIRequestFactory().get('/', params))
+        with CaptureQueriesContext(connection) as captured:
+            view.get_validator()
+            view.paginate_queryset(view.filter_queryset(view.get_queryset()))
+        return [query['sql'] for query in captured.captured_queries]
+
+    def _explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+            return [str(row[-1]) for row in cursor.fetchall()]
+
+    def _full_scan(self, plan):
+        # SQLite: "SCAN animals_animal" with no index behind it
+        return connection.vendor == 'sqlite' and any(
+            line.startswith('SCAN animals_animal') and 'INDEX' not in line for line in plan
+        )
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ParseError
+
+from animals.importers import import_animals
+from animals.parsers import ROW_FORMATS, guess_row_format, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Import a herd from a CSV, JSON or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument(
+            '--format',
+            dest='row_format',
+            choices=ROW_FORMATS,
+            help='File format (guessed from the extension by default)',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        row_format = options['row_format'] or guess_row_format(path)
+
+        started = time.monotonic()
+        try:
+            with open(path, 'rb') as stream:
+                rows = read_rows(stream, row_format)
+        except OSError as exc:
+            raise CommandError(f'Could not read {path}: {exc}')
+        except ParseError as exc:
+            raise CommandError(str(exc.detail))
+
+        self.stdout.write(f'Importing {len(rows)} animals from {path}...')
+        report, ok = import_animals(rows)
+
+        if not ok:
+            for error in report['errors']:
+                self.stderr.write(f"Row {error['row']}: {error['errors']}")
+            raise CommandError(f"{len(report['errors'])} invalid rows; nothing was imported.")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"Imported {report['created']} animals in {elapsed:.1f}s")
+        )
@@ -0,0 +1,64 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from animals import qr
+from animals.models import Animal
+from animals.tags import TAG_FORMATS, stream_tags
+
+
+class Command(BaseCommand):
+    help = 'Write QR tags for the herd (or selected animals) as a label PDF or a ZIP of PNGs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='File to write (.pdf or .zip)')
+        parser.add_argument(
+            '--format',
+            dest='tag_format',
+            choices=TAG_FORMATS,
+            help='Output format (guessed from the extension by default)',
+        )
+        parser.add_argument('--ids', nargs='+', type=int, help='Only these animal ids')
+        parser.add_argument('--animal-ids', nargs='+', help='Only these tags, e.g. CMJ/001')
+        parser.add_argument('--type', choices=[choice for choice, _ in Animal.TYPE_CHOICES])
+        parser.add_argument('--sex', choices=[choice for choice, _ in Animal.SEX_CHOICES])
+        parser.add_argument('--breed', choices=[choice for choice, _ in Animal.BREED_CHOICES])
+        parser.add_argument('--size', type=int, help='PNG size in pixels, rounded down to one of qr.SIZES (ZIP only)')
+        parser.add_argument('--workers', type=int, help='Render processes (default: QR_RENDER_WORKERS)')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        tag_format = options['tag_format'] or os.path.splitext(output)[1].lstrip('.').lower()
+        if tag_format not in TAG_FORMATS:
+            raise CommandError(f'Cannot tell the format from "{output}"; pass --format {"|".join(TAG_FORMATS)}.')
+        size = options['size']
+        if size is not None and not qr.MIN_SIZE <= size <= qr.MAX_SIZE:
+            raise CommandError(f'--size must be between {qr.MIN_SIZE} and {qr.MAX_SIZE} pixels.')
+        size = qr.snap_size(size)
+
+        queryset = Animal.objects.select_related('father', 'mother').order_by('animal_id')
+        if options['ids']:
+            queryset = queryset.filter(pk__in=options['ids'])
+        if options['animal_ids']:
+            queryset = queryset.filter(animal_id__in=options['animal_ids'])
+        for field in ('type', 'sex', 'breed'):
+            if options[field]:
+                queryset = queryset.filter(**{field: options[field]})
+
+        count = queryset.count()
+        if not count:
+            raise CommandError('No animals match.')
+
+        started = time.monotonic()
+        self.stdout.write(f'Writing {count} QR tags to {output}...')
+        chunks = stream_tags(tag_format, queryset.iterator(chunk_size=500), size, count, options['workers'])
+        try:
+            with open(output, 'wb') as stream:
+                for chunk in chunks:
+                    stream.write(chunk)
+        except OSError as exc:
+            raise CommandError(f'Could not write {output}: {exc}')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} QR tags in {elapsed:.1f}s'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from animals import qr
+from animals.models import Animal
+
+
+class Command(BaseCommand):
+    help = "Delete cached QR images that no animal's current data produces"
+
+    def handle(self, *args, **options):
+        animals = Animal.objects.select_related('father', 'mother').iterator(chunk_size=500)
+        digests = {qr.payload_digest(qr.encode_payload(qr.qr_payload(animal))) for animal in animals}
+        removed = qr.prune_cache(digests)
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} cached QR images'))
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:07
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    """Start each prefix's sequence after the highest existing number"""
+    Animal = apps.get_model('animals', 'Animal')
+    AnimalIdSequence = apps.get_model('animals', 'AnimalIdSequence')
+    highest = {}
+    for animal_id in Animal.objects.values_list('animal_id', flat=True):
+        prefix, _, number = (animal_id or '').partition('/')
+        if prefix and number.isdigit():
+            highest[prefix] = max(highest.get(prefix, 0), int(number))
+    AnimalIdSequence.objects.bulk_create([
+        AnimalIdSequence(prefix=prefix, last_value=last_value)
+        for prefix, last_value in highest.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0002_animal_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnimalIdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=10, unique=True)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
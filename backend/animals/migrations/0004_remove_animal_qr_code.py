@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:08
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0003_animalidsequence'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='animal',
+            name='qr_code',
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0004_remove_animal_qr_code'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['-created_at', '-id'], name='animal_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from farm_management import search
+
+
+SEARCH_FIELDS = {'animal_id': 'A', 'name': 'A', 'notes': 'C'}
+
+
+def create_search_index(apps, schema_editor):
+    search.create_index(schema_editor, 'animals_animal', SEARCH_FIELDS)
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop_index(schema_editor, 'animals_animal')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0005_animal_animal_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
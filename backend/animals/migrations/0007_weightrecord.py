@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_weight_records(apps, schema_editor):
+    """Keep the weights recorded so far as each animal's first reading"""
+    Animal = apps.get_model('animals', 'Animal')
+    WeightRecord = apps.get_model('animals', 'WeightRecord')
+    WeightRecord.objects.bulk_create(
+        (
+            WeightRecord(animal_id=pk, weight=weight, measured_at=updated_at)
+            for pk, weight, updated_at in Animal.objects.filter(
+                weight__isnull=False
+            ).values_list('id', 'weight', 'updated_at').iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0006_animal_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeightRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.DecimalField(decimal_places=2, help_text='Weight in kg', max_digits=6)),
+                ('measured_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('notes', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('animal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weight_records', to='animals.animal')),
+                ('recorded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-measured_at'],
+                'indexes': [models.Index(fields=['animal', 'measured_at'], name='weight_animal_measured_idx')],
+            },
+        ),
+        migrations.RunPython(seed_weight_records, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,124 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:25
+
+import re
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Concat
+
+from farm_management import search
+
+
+# Frozen copies of animals.models as of this migration, so later changes to
+# the vocabulary cannot change what it did
+HEALTH_STATUS_CHOICES = ['Healthy', 'Sick', 'Under Treatment', 'Quarantine', 'Recovery']
+
+HEALTH_STATUS_LOOKUP = {
+    'well': 'Healthy',
+    'ok': 'Healthy',
+    'ill': 'Sick',
+    'treatment': 'Under Treatment',
+    'in treatment': 'Under Treatment',
+    'on treatment': 'Under Treatment',
+    'under_treatment': 'Under Treatment',
+    'treated': 'Under Treatment',
+    'quarantined': 'Quarantine',
+    'isolated': 'Quarantine',
+    'recovering': 'Recovery',
+    'recovered': 'Recovery',
+    **{value.lower(): value for value in HEALTH_STATUS_CHOICES},
+}
+
+# The fields of the search index (0006)
+SEARCH_FIELDS = ['animal_id', 'name', 'notes']
+
+
+def normalize_health_status(text):
+    """Split a free-text status into ``(status, detail)``; ``status`` is None if unknown"""
+    words = ' '.join((text or '').split())
+    lowered = words.lower()
+    # Longest first, so "under treatment" wins over "treatment"
+    for key in sorted(HEALTH_STATUS_LOOKUP, key=len, reverse=True):
+        if lowered == key or re.match(rf'{re.escape(key)}\b', lowered):
+            detail = words[len(key):].strip(' -:;,/()')
+            return HEALTH_STATUS_LOOKUP[key], detail
+    return None, words
+
+
+def normalize_health_statuses(apps, schema_editor):
+    """
+    Map free-text statuses onto the vocabulary.
+
+    "sick " becomes "Sick"; "Sick - mastitis" becomes "Sick" plus a health
+    event with the diagnosis "mastitis"; text that names no known status is
+    cleared and kept in the animal's notes.
+    """
+    Animal = apps.get_model('animals', 'Animal')
+    HealthEvent = apps.get_model('animals', 'HealthEvent')
+    raw_values = Animal.objects.exclude(health_status='').values_list('health_status', flat=True).distinct()
+    for raw in list(raw_values):
+        health_status, detail = normalize_health_status(raw)
+        animals = Animal.objects.filter(health_status=raw)
+        if health_status is None and not detail:
+            animals.update(health_status='')
+            continue
+        if health_status is None:
+            line = f'Health status: {raw}'
+            pks = list(animals.values_list('id', flat=True))
+            animals.update(health_status='', notes=Case(
+                When(notes='', then=Value(line)),
+                default=Concat(F('notes'), Value('\n' + line), output_field=models.TextField()),
+                output_field=models.TextField(),
+            ))
+            # The UPDATE skips the signal that keeps the search index current
+            search.reindex(Animal, pks, using=schema_editor.connection.alias, fields=SEARCH_FIELDS)
+            continue
+        if detail:
+            HealthEvent.objects.bulk_create(
+                (
+                    HealthEvent(animal_id=pk, status=health_status, diagnosis=detail[:200], occurred_on=updated_at.date())
+                    for pk, updated_at in animals.values_list('id', 'updated_at').iterator()
+                ),
+                batch_size=1000,
+            )
+        if health_status != raw:
+            animals.update(health_status=health_status)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0007_weightrecord'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HealthEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('Healthy', 'Healthy'), ('Sick', 'Sick'), ('Under Treatment', 'Under Treatment'), ('Quarantine', 'Quarantine'), ('Recovery', 'Recovery')], help_text='Status after this event', max_length=20)),
+                ('diagnosis', models.CharField(blank=True, max_length=200)),
+                ('treatment', models.CharField(blank=True, max_length=200)),
+                ('vet', models.CharField(blank=True, max_length=100)),
+                ('occurred_on', models.DateField(default=django.utils.timezone.localdate)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('animal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='health_events', to='animals.animal')),
+                ('recorded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-occurred_on', '-id'],
+                'indexes': [models.Index(fields=['animal', 'occurred_on'], name='health_animal_date_idx'), models.Index(fields=['occurred_on', 'status'], name='health_date_status_idx')],
+            },
+        ),
+        migrations.RunPython(normalize_health_statuses, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='animal',
+            name='health_status',
+            field=models.CharField(blank=True, choices=[('Healthy', 'Healthy'), ('Sick', 'Sick'), ('Under Treatment', 'Under Treatment'), ('Quarantine', 'Quarantine'), ('Recovery', 'Recovery')], db_index=True, default='Healthy', max_length=20),
+        ),
+    ]
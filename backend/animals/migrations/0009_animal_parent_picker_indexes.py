@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0008_healthevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['sex', 'type', 'animal_id'], name='animal_sex_type_tag_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['sex', 'type', 'name'], name='animal_sex_type_name_idx'),
+        ),
+    ]
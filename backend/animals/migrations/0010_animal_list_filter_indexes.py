@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0009_animal_parent_picker_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='animal',
+            name='father',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='offspring_as_father', to='animals.animal'),
+        ),
+        migrations.AlterField(
+            model_name='animal',
+            name='health_status',
+            field=models.CharField(blank=True, choices=[('Healthy', 'Healthy'), ('Sick', 'Sick'), ('Under Treatment', 'Under Treatment'), ('Quarantine', 'Quarantine'), ('Recovery', 'Recovery')], default='Healthy', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='animal',
+            name='mother',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='offspring_as_mother', to='animals.animal'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['sex', '-created_at', '-id'], name='animal_sex_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['breed', '-created_at', '-id'], name='animal_breed_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['type', '-created_at', '-id'], name='animal_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['health_status', '-created_at', '-id'], name='animal_health_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['updated_at'], name='animal_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(fields=['year_of_birth'], name='animal_year_of_birth_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(condition=models.Q(('father__isnull', False)), fields=['father'], name='animal_father_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='animal',
+            index=models.Index(condition=models.Q(('mother__isnull', False)), fields=['mother'], name='animal_mother_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:13
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('animals', '0010_animal_list_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='animal',
+            name='animal_sex_type_name_idx',
+        ),
+    ]
@@ -1,10 +1,96 @@
-import os
-import qrcode
-import json
-from io import BytesIO
-from django.db import models
-from django.core.files import File
-from django.core.files.uploadedfile import InMemoryUploadedFile
+import re
+from datetime import datetime
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, Exists, ExpressionWrapper, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from sync import changelog
+
+
+HEALTH_STATUS_CHOICES = [
+    ('Healthy', 'Healthy'),
+    ('Sick', 'Sick'),
+    ('Under Treatment', 'Under Treatment'),
+    ('Quarantine', 'Quarantine'),
+    ('Recovery', 'Recovery'),
+]
+
+# Spellings seen in free-text health_status values, lower-cased
+HEALTH_STATUS_ALIASES = {
+    'well': 'Healthy',
+    'ok': 'Healthy',
+    'ill': 'Sick',
+    'treatment': 'Under Treatment',
+    'in treatment': 'Under Treatment',
+    'on treatment': 'Under Treatment',
+    'under_treatment': 'Under Treatment',
+    'treated': 'Under Treatment',
+    'quarantined': 'Quarantine',
+    'isolated': 'Quarantine',
+    'recovering': 'Recovery',
+    'recovered': 'Recovery',
+}
+
+_HEALTH_STATUS_LOOKUP = {
+    **HEALTH_STATUS_ALIASES,
+    **{value.lower(): value for value, _ in HEALTH_STATUS_CHOICES},
+}
+
+
+def normalize_health_status(text):
+    """
+    Split a free-text status into ``(status, detail)``.
+
+    ``"sick "`` gives ``('Sick', '')`` and ``"Sick - mastitis"`` gives
+    ``('Sick', 'mastitis')``; ``status`` is ``None`` when the text does not
+    start with a known status or alias.
+    """
+    words = ' '.join((text or '').split())
+    lowered = words.lower()
+    # Longest first, so "under treatment" wins over "treatment"
+    for key in sorted(_HEALTH_STATUS_LOOKUP, key=len, reverse=True):
+        if lowered == key or re.match(rf'{re.escape(key)}\b', lowered):
+            detail = words[len(key):].strip(' -:;,/()')
+            return _HEALTH_STATUS_LOOKUP[key], detail
+    return None, words
+
+
+class AnimalQuerySet(models.QuerySet):
+    def with_summary(self, fields=None):
+        """
+        Annotate age, offspring_count and parent names in SQL.
+
+        Serializers read these instead of issuing a COUNT and two parent
+        lookups per row, and they can be used for filtering and ordering.
+        ``fields`` limits the annotations (and so the subqueries and parent
+        joins) to the names given.
+        """
+        annotations = {
+            'age': lambda: ExpressionWrapper(Value(datetime.now().year) - F('year_of_birth'), output_field=IntegerField()),
+            'offspring_count': lambda: Case(
+                When(sex='Female', then=self._offspring_subquery('mother')),
+                default=self._offspring_subquery('father'),
+                output_field=IntegerField(),
+            ),
+            'father_name': lambda: F('father__name'),
+            'mother_name': lambda: F('mother__name'),
+        }
+        return self.annotate(**{
+            name: build() for name, build in annotations.items() if fields is None or name in fields
+        })
+
+    def _offspring_subquery(self, parent_field):
+        counts = (
+            Animal.objects.filter(**{parent_field: OuterRef('pk')})
+            .order_by()
+            .values(parent_field)
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
+        return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
 
 
 class Animal(models.Model):
@@ -16,6 +102,24 @@ class Animal(models.Model):
         ('Dog', 'Dog'),
     ]
 
+    SPECIES_CODES = {
+        'Cow': 'C',
+        'Goat': 'G',
+        'Sheep': 'S',
+        'Pig': 'P',
+        'Dog': 'D',
+    }
+
+    # Youngest age (in years, from year_of_birth) at which an animal is
+    # offered as a parent
+    MIN_BREEDING_AGE = {
+        'Cow': 2,
+        'Goat': 1,
+        'Sheep': 1,
+        'Pig': 1,
+        'Dog': 1,
+    }
+
     type = models.CharField(max_length=10, choices=TYPE_CHOICES, default='Cow')
     SEX_CHOICES = [
         ('Male', 'Male'),
@@ -32,22 +136,52 @@ class Animal(models.Model):
         ('Crossbreed', 'Crossbreed'),
     ]
 
+    HEALTH_STATUS_CHOICES = HEALTH_STATUS_CHOICES
+
     animal_id = models.CharField(max_length=20, unique=True, blank=True)
     name = models.CharField(max_length=100)
     sex = models.CharField(max_length=6, choices=SEX_CHOICES)
     breed = models.CharField(max_length=20, choices=BREED_CHOICES)
     year_of_birth = models.IntegerField()
-    father = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='offspring_as_father')
-    mother = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='offspring_as_mother')
+    # Indexed by partial indexes in Meta; most animals have no recorded parents
+    father = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='offspring_as_father', db_index=False,
+    )
+    mother = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='offspring_as_mother', db_index=False,
+    )
     weight = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True, help_text="Weight in kg")
-    health_status = models.CharField(max_length=50, blank=True, default="Healthy")
+    health_status = models.CharField(
+        max_length=20, choices=HEALTH_STATUS_CHOICES, blank=True, default="Healthy",
+    )
     notes = models.TextField(blank=True)
-    qr_code = models.ImageField(upload_to='qr_codes/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AnimalQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination: WHERE (created_at, id) < (...) ORDER BY created_at DESC, id DESC
+            models.Index(fields=['-created_at', '-id'], name='animal_created_id_idx'),
+            # Parent picker: WHERE sex = ... AND type = ... ORDER BY animal_id
+            models.Index(fields=['sex', 'type', 'animal_id'], name='animal_sex_type_tag_idx'),
+            # List filters: one equality filter followed by the default ordering,
+            # so a page stops after page_size rows instead of sorting every match
+            # (see ./manage.py explain_animals)
+            models.Index(fields=['sex', '-created_at', '-id'], name='animal_sex_created_idx'),
+            models.Index(fields=['breed', '-created_at', '-id'], name='animal_breed_created_idx'),
+            models.Index(fields=['type', '-created_at', '-id'], name='animal_type_created_idx'),
+            models.Index(fields=['health_status', '-created_at', '-id'], name='animal_health_created_idx'),
+            # The list ETag: COUNT(*), MAX(updated_at) over the herd from the index alone
+            models.Index(fields=['updated_at'], name='animal_updated_idx'),
+            # min_age / max_age and cohorts
+            models.Index(fields=['year_of_birth'], name='animal_year_of_birth_idx'),
+            # Offspring counts and descendants: WHERE father_id = ... / mother_id = ...
+            models.Index(fields=['father'], name='animal_father_idx', condition=Q(father__isnull=False)),
+            models.Index(fields=['mother'], name='animal_mother_idx', condition=Q(mother__isnull=False)),
+        ]
 
     def __str__(self):
         return f"{self.animal_id} - {self.name}"
@@ -57,86 +191,218 @@ class Animal(models.Model):
             self.animal_id = self.generate_animal_id()
         
         super().save(*args, **kwargs)
-        
-        if not self.qr_code:
-            self.generate_qr_code()
-            super().save(update_fields=['qr_code'])
 
-    def generate_animal_id(self):
+    def animal_id_prefix(self):
         # Format: [Species][Sex][Breed]/[Number]
-        # C = Cow, M/F = Male/Female, J = Jersey (first letter of breed), 001 = sequence
-        species = 'C'  # Cow
+        # C = Cow (from type), M/F = Male/Female, J = Jersey (first letter of breed), 001 = sequence
+        species = self.SPECIES_CODES.get(self.type, self.type[0])
         sex_code = self.sex[0]  # M or F
         breed_code = self.breed[0]  # First letter of breed
-        
-        # Get the next sequence number for this combination
-        prefix = f"{species}{sex_code}{breed_code}"
-        last_animal = Animal.objects.filter(
-            animal_id__startswith=prefix
-        ).order_by('-animal_id').first()
-        
-        if last_animal and last_animal.animal_id:
-            try:
-                last_number = int(last_animal.animal_id.split('/')[1])
-                next_number = last_number + 1
-            except (IndexError, ValueError):
-                next_number = 1
-        else:
-            next_number = 1
-        
-        return f"{prefix}/{next_number:03d}"
-
-    def generate_qr_code(self):
-        if self.animal_id:
-            # Data to encode in QR code
-            qr_data = {
-                'animal_id': self.animal_id,
-                'name': self.name,
-                'sex': self.sex,
-                'breed': self.breed,
-                'year_of_birth': self.year_of_birth,
-                'father_id': self.father.animal_id if self.father else None,
-                'mother_id': self.mother.animal_id if self.mother else None,
-                'weight': str(self.weight) if self.weight else None,
-                'health_status': self.health_status,
-                'notes': self.notes,
-                'farm': 'Sidai Enkop Ranch - Isinya, Kitengela',
-                'type': self.type,
-            }
-            # Create QR code
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(json.dumps(qr_data))
-            qr.make(fit=True)
-            # Create QR code image
-            qr_img = qr.make_image(fill_color="black", back_color="white")
-            # Save to BytesIO
-            buffer = BytesIO()
-            qr_img.save(buffer, format='PNG')
-            buffer.seek(0)
-            
-            # Create Django file
-            filename = f'qr_{self.animal_id.replace("/", "_")}.png'
-            qr_file = InMemoryUploadedFile(
-                buffer, None, filename, 'image/png',
-                buffer.getvalue().__len__(), None
-            )
-            
-            self.qr_code.save(filename, qr_file, save=False)
+        return f"{species}{sex_code}{breed_code}"
+
+    @classmethod
+    def reserve_animal_ids(cls, prefix, count):
+        """Return ``count`` consecutive new IDs for ``prefix`` from its sequence"""
+        first = AnimalIdSequence.reserve(prefix, count)
+        return [f"{prefix}/{number:03d}" for number in range(first, first + count)]
+
+    def generate_animal_id(self):
+        return self.reserve_animal_ids(self.animal_id_prefix(), 1)[0]
+
+    # The properties below fall back to Python (and queries) when the
+    # instance was not loaded through AnimalQuerySet.with_summary(); the
+    # setters receive the SQL annotations.
 
     @property
     def age(self):
-        from datetime import datetime
+        if '_age' in self.__dict__:
+            return self._age
         current_year = datetime.now().year
         return current_year - self.year_of_birth
 
+    @age.setter
+    def age(self, value):
+        self._age = value
+
     @property
     def offspring_count(self):
+        if '_offspring_count' in self.__dict__:
+            return self._offspring_count
         if self.sex == 'Female':
             return self.offspring_as_mother.count()
         else:
             return self.offspring_as_father.count()
+
+    @offspring_count.setter
+    def offspring_count(self, value):
+        self._offspring_count = value
+
+    @property
+    def father_name(self):
+        if '_father_name' in self.__dict__:
+            return self._father_name
+        return self.father.name if self.father_id else None
+
+    @father_name.setter
+    def father_name(self, value):
+        self._father_name = value
+
+    @property
+    def mother_name(self):
+        if '_mother_name' in self.__dict__:
+            return self._mother_name
+        return self.mother.name if self.mother_id else None
+
+    @mother_name.setter
+    def mother_name(self, value):
+        self._mother_name = value
+
+
+class AnimalIdSequence(models.Model):
+    """Last number handed out for each animal_id prefix (e.g. CFJ)"""
+
+    prefix = models.CharField(max_length=10, unique=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.prefix}/{self.last_value:03d}"
+
+    @staticmethod
+    def parse(animal_id):
+        """Split ``CFJ/012`` into ``('CFJ', 12)``; ``None`` for other formats"""
+        prefix, _, number = (animal_id or '').partition('/')
+        if prefix and number.isdigit():
+            return prefix, int(number)
+        return None
+
+    @classmethod
+    def highest_existing(cls, prefix):
+        """Highest number already used by animals with this prefix (numeric, not lexical)"""
+        numbers = [
+            parsed[1]
+            for parsed in map(cls.parse, Animal.objects.filter(
+                animal_id__startswith=f"{prefix}/"
+            ).values_list('animal_id', flat=True))
+            if parsed and parsed[0] == prefix
+        ]
+        return max(numbers, default=0)
+
+    @classmethod
+    def reserve(cls, prefix, count=1):
+        """
+        Reserve ``count`` consecutive numbers for ``prefix`` and return the first.
+
+        The increment is a single ``UPDATE ... SET last_value = last_value + n``,
+        so concurrent creates serialise on the sequence row instead of racing
+        on a scan of the animals table.
+        """
+        with transaction.atomic():
+            updated = cls.objects.filter(prefix=prefix).update(last_value=F('last_value') + count)
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(prefix=prefix, last_value=cls.highest_existing(prefix) + count)
+                except IntegrityError:
+                    # Another request created the sequence first
+                    cls.objects.filter(prefix=prefix).update(last_value=F('last_value') + count)
+            last_value = cls.objects.values_list('last_value', flat=True).get(prefix=prefix)
+        return last_value - count + 1
+
+    @classmethod
+    def advance_to(cls, prefix, number):
+        """Make sure future reservations start after an explicitly assigned number"""
+        with transaction.atomic():
+            # A new prefix starts from whatever animals already use it
+            sequence, created = cls.objects.select_for_update().get_or_create(
+                prefix=prefix, defaults={'last_value': lambda: max(cls.highest_existing(prefix), number)},
+            )
+            if not created and sequence.last_value < number:
+                cls.objects.filter(pk=sequence.pk).update(last_value=number)
+
+
+class WeightRecord(models.Model):
+    """One reading from the scale; ``Animal.weight`` mirrors the latest"""
+
+    animal = models.ForeignKey(Animal, on_delete=models.CASCADE, related_name='weight_records')
+    weight = models.DecimalField(max_digits=6, decimal_places=2, help_text="Weight in kg")
+    measured_at = models.DateTimeField(default=timezone.now)
+    recorded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    notes = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-measured_at']
+        indexes = [
+            models.Index(fields=['animal', 'measured_at'], name='weight_animal_measured_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.animal_id} - {self.weight} kg at {self.measured_at:%Y-%m-%d}"
+
+    @classmethod
+    def reading_for(cls, animal, previous_weight, recorded_by=None, measured_at=None):
+        """
+        The unsaved reading for a save that set ``animal.weight`` (from
+        ``previous_weight``), or ``None`` when the weight did not change.
+
+        Every path that writes ``Animal.weight`` directly records it through
+        here, so the history stays complete.
+        """
+        if animal.weight is None or animal.weight == previous_weight:
+            return None
+        return cls(
+            animal=animal, weight=animal.weight, recorded_by=recorded_by,
+            measured_at=measured_at or timezone.now(),
+        )
+
+    @classmethod
+    def sync_latest_weights(cls, animal_ids):
+        """Copy each animal's latest reading to ``Animal.weight`` in one UPDATE"""
+        animal_ids = list(animal_ids)
+        latest = cls.objects.filter(animal=OuterRef('pk')).order_by('-measured_at', '-id').values('weight')[:1]
+        updated = Animal.objects.filter(pk__in=animal_ids).update(
+            weight=Subquery(latest),
+            updated_at=timezone.now(),
+        )
+        # The UPDATE bypasses the post_save that logs changes for sync
+        changelog.record(Animal, animal_ids)
+        return updated
+
+
+class HealthEvent(models.Model):
+    """A diagnosis or treatment; ``Animal.health_status`` mirrors the latest event's status"""
+
+    animal = models.ForeignKey(Animal, on_delete=models.CASCADE, related_name='health_events')
+    status = models.CharField(max_length=20, choices=HEALTH_STATUS_CHOICES, help_text="Status after this event")
+    diagnosis = models.CharField(max_length=200, blank=True)
+    treatment = models.CharField(max_length=200, blank=True)
+    vet = models.CharField(max_length=100, blank=True)
+    occurred_on = models.DateField(default=timezone.localdate)
+    recorded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-occurred_on', '-id']
+        indexes = [
+            # An animal's history, and its latest event
+            models.Index(fields=['animal', 'occurred_on'], name='health_animal_date_idx'),
+            # Incidence reports: a date range, optionally one status
+            models.Index(fields=['occurred_on', 'status'], name='health_date_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.animal_id} - {self.status} on {self.occurred_on:%Y-%m-%d}"
+
+    @classmethod
+    def sync_latest_statuses(cls, animal_ids):
+        """Copy each animal's latest event status to ``Animal.health_status`` in one UPDATE"""
+        animal_ids = list(animal_ids)
+        latest = cls.objects.filter(animal=OuterRef('pk')).order_by('-occurred_on', '-id').values('status')[:1]
+        # Animals whose last event was deleted keep their current status
+        updated = Animal.objects.filter(pk__in=animal_ids).filter(Exists(latest)).update(
+            health_status=Subquery(latest),
+            updated_at=timezone.now(),
+        )
+        changelog.record(Animal, animal_ids)
+        return updated
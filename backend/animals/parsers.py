@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+ROW_FORMATS = ('csv', 'json', 'ndjson')
+
+
+def _text_stream(stream, encoding='utf-8-sig'):
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    # Request bodies and uploads are not always io objects; the BOM-aware
+    # codec copes with spreadsheets saved as "CSV UTF-8".
+    try:
+        return io.StringIO(stream.read().decode(encoding), newline='')
+    except UnicodeDecodeError as exc:
+        raise ParseError(f'File is not valid UTF-8 - {exc}')
+
+
+def parse_csv(stream):
+    """Read a spreadsheet export; the header row names the fields"""
+    reader = csv.DictReader(_text_stream(stream))
+    return [
+        {key.strip(): value.strip() for key, value in row.items() if key and value is not None}
+        for row in reader
+    ]
+
+
+def parse_ndjson(stream):
+    """Read one JSON object per line, skipping blank lines"""
+    rows = []
+    for number, line in enumerate(_text_stream(stream), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            rows.append(json.loads(line))
+        except ValueError as exc:
+            raise ParseError(f'Line {number}: {exc}')
+    return rows
+
+
+def parse_json(stream, key='animals'):
+    """Read a JSON list of objects, or an object with a ``key`` list"""
+    try:
+        data = json.load(_text_stream(stream))
+    except ValueError as exc:
+        raise ParseError(f'JSON parse error - {exc}')
+    if isinstance(data, dict):
+        data = data.get(key)
+    if not isinstance(data, list):
+        raise ParseError(f'Expected a list of {key}.')
+    return data
+
+
+def read_rows(stream, row_format, key='animals'):
+    """Rows from a CSV, JSON or NDJSON stream; ``key`` names the list in a JSON object"""
+    if row_format == 'json':
+        return parse_json(stream, key)
+    parsers = {'csv': parse_csv, 'ndjson': parse_ndjson}
+    if row_format not in parsers:
+        raise ParseError(f'Unsupported format "{row_format}". Use one of: {", ".join(ROW_FORMATS)}.')
+    return parsers[row_format](stream)
+
+
+def guess_row_format(filename, content_type=''):
+    """Pick csv/json/ndjson from a file name or content type"""
+    name = (filename or '').lower()
+    if name.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl')) or 'ndjson' in content_type:
+        return 'ndjson'
+    return 'json'
+
+
+class CSVParser(BaseParser):
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return parse_csv(stream)
+
+
+class NDJSONParser(BaseParser):
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return parse_ndjson(stream)
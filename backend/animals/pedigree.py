@@ -0,0 +1,347 @@
+"""
+Pedigree traversal and inbreeding coefficients.
+
+Ancestors and descendants are fetched with a single recursive CTE over the
+``father``/``mother`` self-references, so walking any number of generations
+costs one round-trip. Inbreeding coefficients are computed in bulk from one
+columnar fetch of the herd pedigree.
+
+Relationships between animals (for mate selection) come from the additive
+relationship matrix in factored form, ``A = T D T'``: ``T`` is implied by
+the parent links and is applied a generation at a time with NumPy, so only
+the columns that are asked for are ever built.
+"""
+import hashlib
+import heapq
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connection
+
+from .cache import herd_cache_timeout
+from .models import Animal
+
+
+MAX_PEDIGREE_DEPTH = 32
+
+# Most sires listed for one female
+MAX_MATES = 1000
+
+PEDIGREE_COLUMNS = [
+    'id', 'animal_id', 'name', 'sex', 'breed', 'type', 'year_of_birth',
+    'father_id', 'mother_id',
+]
+
+ANCESTORS_SQL = """
+WITH RECURSIVE lineage(id, generation) AS (
+    SELECT id, 0 FROM {table} WHERE id = %s
+    UNION
+    SELECT parent.id, lineage.generation + 1
+    FROM lineage
+    JOIN {table} child ON child.id = lineage.id
+    JOIN {table} parent ON parent.id IN (child.father_id, child.mother_id)
+    WHERE lineage.generation < %s
+)
+SELECT {columns}, g.generation
+FROM (SELECT id, MIN(generation) AS generation FROM lineage GROUP BY id) g
+JOIN {table} a ON a.id = g.id
+ORDER BY g.generation, a.animal_id
+"""
+
+DESCENDANTS_SQL = """
+WITH RECURSIVE lineage(id, generation) AS (
+    SELECT id, 0 FROM {table} WHERE id = %s
+    UNION
+    SELECT child.id, lineage.generation + 1
+    FROM lineage
+    JOIN {table} child ON lineage.id IN (child.father_id, child.mother_id)
+    WHERE lineage.generation < %s
+)
+SELECT {columns}, g.generation
+FROM (SELECT id, MIN(generation) AS generation FROM lineage GROUP BY id) g
+JOIN {table} a ON a.id = g.id
+ORDER BY g.generation, a.animal_id
+"""
+
+
+def _run_lineage_query(sql, animal_pk, depth):
+    qn = connection.ops.quote_name
+    query = sql.format(
+        table=qn(Animal._meta.db_table),
+        columns=', '.join(f'a.{qn(column)}' for column in PEDIGREE_COLUMNS),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(query, [animal_pk, depth])
+        rows = cursor.fetchall()
+    names = PEDIGREE_COLUMNS + ['generation']
+    return [dict(zip(names, row)) for row in rows]
+
+
+def ancestors(animal_pk, depth):
+    """
+    Return the animal and its ancestors up to ``depth`` generations back.
+
+    Each row carries the parent ids, so the client can rebuild the tree.
+    An ancestor reachable through several paths is listed once, at its
+    closest generation.
+    """
+    return _run_lineage_query(ANCESTORS_SQL, animal_pk, depth)
+
+
+def descendants(animal_pk, depth):
+    """Return the animal and its descendants up to ``depth`` generations down."""
+    return _run_lineage_query(DESCENDANTS_SQL, animal_pk, depth)
+
+
+RELATIONSHIP_CACHE_PREFIX = 'animals:relationships:'
+
+# Columns of A built at once; bounds memory to herd size x this many floats
+RELATIONSHIP_BLOCK_SIZE = 256
+
+
+def herd_pedigree():
+    """Fetch ``{id: (father_id, mother_id)}`` for the whole herd in one query."""
+    return {
+        pk: (father_id, mother_id)
+        for pk, father_id, mother_id in Animal.objects.order_by().values_list('id', 'father_id', 'mother_id')
+    }
+
+
+def pedigree_fingerprint(pedigree):
+    """A digest that changes whenever an animal or a parent link is added, removed or changed"""
+    return hashlib.sha1(repr(sorted(pedigree.items())).encode()).hexdigest()
+
+
+def topological_order(pedigree):
+    """
+    Order animal ids so that parents always come before their offspring.
+
+    Parents missing from ``pedigree`` are treated as unknown. A parent link
+    that would close a cycle (bad data) is ignored rather than looping.
+    Returns ``(order, parents)`` where ``parents`` holds the sanitised links.
+    """
+    order = []
+    parents = {}
+    state = {}  # 1 = in progress, 2 = done
+    for root in pedigree:
+        if root in state:
+            continue
+        stack = [(root, False)]
+        while stack:
+            pk, expanded = stack.pop()
+            if expanded:
+                state[pk] = 2
+                order.append(pk)
+                continue
+            if pk in state:
+                continue
+            state[pk] = 1
+            stack.append((pk, True))
+            links = []
+            for parent in pedigree[pk]:
+                if parent is None or parent not in pedigree or state.get(parent) == 1:
+                    links.append(None)
+                    continue
+                links.append(parent)
+                if parent not in state:
+                    stack.append((parent, False))
+            parents[pk] = tuple(links)
+    return order, parents
+
+
+def inbreeding_coefficients(pedigree):
+    """
+    Compute Wright's inbreeding coefficient for every animal in ``pedigree``.
+
+    Uses the Meuwissen & Luo (1992) algorithm, which only visits each
+    animal's own ancestors, so a herd of a few thousand head with deep
+    pedigrees is handled in one pass without building the relationship
+    matrix.
+    """
+    order, parents = topological_order(pedigree)
+    index = {pk: position + 1 for position, pk in enumerate(order)}
+
+    count = len(order)
+    sire = [0] * (count + 1)
+    dam = [0] * (count + 1)
+    for pk, position in index.items():
+        father, mother = parents[pk]
+        sire[position] = index[father] if father is not None else 0
+        dam[position] = index[mother] if mother is not None else 0
+
+    F = [0.0] * (count + 1)
+    F[0] = -1.0
+    D = [0.0] * (count + 1)
+    for i in range(1, count + 1):
+        s, d = sire[i], dam[i]
+        D[i] = 0.5 - 0.25 * (F[s] + F[d])
+        if s == 0 or d == 0:
+            F[i] = 0.0
+            continue
+        if i > 1 and s == sire[i - 1] and d == dam[i - 1]:
+            F[i] = F[i - 1]
+            continue
+
+        contributions = {i: 1.0}
+        heap = [-i]
+        total = 0.0
+        while heap:
+            j = -heapq.heappop(heap)
+            weight = contributions.pop(j)
+            for parent in (sire[j], dam[j]):
+                if parent:
+                    if parent not in contributions:
+                        contributions[parent] = 0.0
+                        heapq.heappush(heap, -parent)
+                    contributions[parent] += 0.5 * weight
+            total += weight * weight * D[j]
+        F[i] = total - 1.0
+
+    return {pk: F[position] for pk, position in index.items()}
+
+
+def _contributions(sire, dam, generations, columns, last):
+    """
+    Backward pass of ``T'``: add each animal's row of ``columns`` at half
+    weight to its parents, offspring first, over ``generations[:last + 1]``.
+    """
+    for start, stop in reversed(generations[:last + 1]):
+        stop = min(stop, len(columns))
+        if stop <= start:
+            continue
+        half = 0.5 * columns[start:stop]
+        np.add.at(columns, sire[start:stop], half)
+        np.add.at(columns, dam[start:stop], half)
+    columns[0] = 0.0
+    return columns
+
+
+def relationship_factor(pedigree, block_size=RELATIONSHIP_BLOCK_SIZE):
+    """
+    The additive relationship matrix of ``pedigree`` in factored form.
+
+    Returns a dict over animal positions ordered by generation, with
+    position 0 standing for an unknown parent: ``ids`` and ``index`` map
+    positions to animals and back, ``sire``/``dam`` hold parent positions,
+    ``d`` the Mendelian sampling variances and ``inbreeding`` the
+    coefficients; ``generations`` lists the ``(start, stop)`` position
+    range of each generation. Parents always sit in an earlier generation.
+
+    Inbreeding is worked out a generation at a time: ``F = diag(A) - 1``
+    and ``diag(A) = sum(T[i, j]^2 * d[j])`` over the ancestors ``j``, which
+    all come before the current generation.
+    """
+    order, parents = topological_order(pedigree)
+    depth = {}
+    for pk in order:
+        depth[pk] = 1 + max((depth[parent] for parent in parents[pk] if parent is not None), default=0)
+    order.sort(key=depth.get)
+    index = {pk: position + 1 for position, pk in enumerate(order)}
+
+    count = len(order)
+    sire = np.zeros(count + 1, dtype=np.int64)
+    dam = np.zeros(count + 1, dtype=np.int64)
+    for pk, position in index.items():
+        father, mother = parents[pk]
+        sire[position] = index[father] if father is not None else 0
+        dam[position] = index[mother] if mother is not None else 0
+
+    depths = np.array([0] + [depth[pk] for pk in order])
+    starts = np.flatnonzero(np.diff(depths)) + 1
+    generations = list(zip(starts.tolist(), np.r_[starts[1:], count + 1].tolist()))
+
+    # Unknown parents count as F = -1, as in inbreeding_coefficients()
+    inbreeding = np.zeros(count + 1)
+    inbreeding[0] = -1.0
+    d = np.zeros(count + 1)
+    for generation, (start, stop) in enumerate(generations):
+        d[start:stop] = 0.5 - 0.25 * (inbreeding[sire[start:stop]] + inbreeding[dam[start:stop]])
+        if not generation:
+            continue  # founders
+        for block_start in range(start, stop, block_size):
+            block_stop = min(block_start + block_size, stop)
+            width = block_stop - block_start
+            columns = np.zeros((block_stop, width))
+            columns[np.arange(block_start, block_stop), np.arange(width)] = 1.0
+            _contributions(sire, dam, generations, columns, generation)
+            inbreeding[block_start:block_stop] = (columns * columns * d[:block_stop, np.newaxis]).sum(axis=0) - 1.0
+    inbreeding[0] = 0.0
+    d[0] = 0.0
+
+    return {
+        'ids': np.array(order, dtype=np.int64),
+        'index': index,
+        'sire': sire,
+        'dam': dam,
+        'd': d,
+        'inbreeding': inbreeding,
+        'generations': generations,
+    }
+
+
+def cached_relationship_factor(pedigree=None):
+    """``relationship_factor()`` of the herd, cached until the pedigree changes"""
+    if pedigree is None:
+        pedigree = herd_pedigree()
+    key = RELATIONSHIP_CACHE_PREFIX + pedigree_fingerprint(pedigree)
+    factor = cache.get(key)
+    if factor is None:
+        factor = relationship_factor(pedigree)
+        cache.set(key, factor, herd_cache_timeout())
+    return factor
+
+
+def inbreeding_coefficient(animal_pk):
+    """
+    Inbreeding coefficient of one animal over the whole herd pedigree.
+
+    Not from an ``ancestors()`` result: a pedigree cut off at a depth
+    misses the common ancestors beyond it.
+    """
+    factor = cached_relationship_factor()
+    return float(factor['inbreeding'][factor['index'][animal_pk]])
+
+
+def relationship_columns(factor, pks):
+    """
+    Columns of A for the animals ``pks``: an array of shape ``(herd + 1, len(pks))``.
+
+    Row ``factor['index'][pk]`` holds that animal's relationship to each of
+    ``pks``; row 0 is zero. Computed as ``T (D (T' E))`` with two passes over
+    the generations rather than by building A.
+    """
+    sire, dam, generations = factor['sire'], factor['dam'], factor['generations']
+    columns = np.zeros((len(sire), len(pks)))
+    columns[[factor['index'][pk] for pk in pks], np.arange(len(pks))] = 1.0
+
+    _contributions(sire, dam, generations, columns, len(generations) - 1)
+    columns *= factor['d'][:, np.newaxis]
+    # T (...): parents first
+    for start, stop in generations:
+        columns[start:stop] += 0.5 * (columns[sire[start:stop]] + columns[dam[start:stop]])
+    return columns
+
+
+def relationships(factor, row_pks, column_pks, block_size=RELATIONSHIP_BLOCK_SIZE):
+    """The block of A for ``row_pks`` x ``column_pks``, built a block of columns at a time"""
+    rows = [factor['index'][pk] for pk in row_pks]
+    # A is symmetric: build columns for whichever side is shorter
+    if len(column_pks) > len(row_pks):
+        return relationships(factor, column_pks, row_pks, block_size).T
+    block = np.empty((len(row_pks), len(column_pks)))
+    for start in range(0, len(column_pks), block_size):
+        chunk = column_pks[start:start + block_size]
+        block[:, start:start + len(chunk)] = relationship_columns(factor, chunk)[rows]
+    return block
+
+
+def rank_mates(factor, dam_pks, sire_pks):
+    """
+    Expected inbreeding of offspring (half the sire-dam relationship) for
+    every pairing; returns ``(expected, order)`` where ``order[i]`` lists
+    sire positions for ``dam_pks[i]``, least related first.
+    """
+    if not dam_pks or not sire_pks:
+        return np.zeros((len(dam_pks), len(sire_pks))), np.zeros((len(dam_pks), len(sire_pks)), dtype=np.int64)
+    expected = 0.5 * relationships(factor, list(dam_pks), list(sire_pks))
+    return expected, np.argsort(expected, axis=1, kind='stable')
@@ -0,0 +1,200 @@
+"""
+On-demand QR code images for animals.
+
+Images are content-addressed: the cache key is a hash of the exact payload
+encoded in the QR code, so an animal is only re-rendered after a change to
+the data it carries, and an unchanged payload always yields the same ETag.
+Rendered files are kept on disk under ``settings.QR_CACHE_ROOT``.
+
+Requested sizes are rounded down to one of ``SIZES``, so stepping through
+``?size=`` cannot fill the disk; ``prune_cache()`` (the ``prune_qr_cache``
+command) removes the images of payloads no animal carries any more.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from io import BytesIO
+
+import qrcode
+import qrcode.image.svg
+from django.conf import settings
+
+
+FARM_NAME = 'Sidai Enkop Ranch - Isinya, Kitengela'
+
+IMAGE_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+DEFAULT_BOX_SIZE = 10
+BORDER = 4
+MIN_SIZE = 64
+MAX_SIZE = 2048
+
+# The sizes actually rendered and cached
+SIZES = (64, 128, 256, 512, 1024, 2048)
+
+# Temporary files younger than this may still be being written
+STALE_TEMP_SECONDS = 60 * 60
+
+
+def qr_payload(animal):
+    """The data encoded in an animal's QR code"""
+    return {
+        'animal_id': animal.animal_id,
+        'name': animal.name,
+        'sex': animal.sex,
+        'breed': animal.breed,
+        'year_of_birth': animal.year_of_birth,
+        'father_id': animal.father.animal_id if animal.father else None,
+        'mother_id': animal.mother.animal_id if animal.mother else None,
+        'weight': str(animal.weight) if animal.weight else None,
+        'health_status': animal.health_status,
+        'notes': animal.notes,
+        'farm': FARM_NAME,
+        'type': animal.type,
+    }
+
+
+def encode_payload(payload):
+    return json.dumps(payload)
+
+
+def payload_digest(data):
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def _build(data):
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=DEFAULT_BOX_SIZE,
+        border=BORDER,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr
+
+
+def _fit_box_size(qr, size):
+    """Largest module size that keeps the image within ``size`` pixels"""
+    if size is None:
+        return DEFAULT_BOX_SIZE
+    return max(1, size // (qr.modules_count + 2 * BORDER))
+
+
+def render(data, image_format='png', size=None):
+    """Render encoded QR ``data`` to PNG or SVG bytes; picklable for worker pools"""
+    qr = _build(data)
+    qr.box_size = _fit_box_size(qr, size)
+    buffer = BytesIO()
+    if image_format == 'svg':
+        qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def render_modules(data):
+    """
+    The QR code as a 1-bit bitmap, one pixel per module (border included).
+
+    Returns ``(width, rows)`` where ``rows`` is packed MSB-first with dark
+    modules as 0, the layout of a PDF ``/DeviceGray`` 1-bit image. Picklable
+    for worker pools.
+    """
+    matrix = _build(data).get_matrix()
+    width = len(matrix)
+    stride = (width + 7) // 8
+    rows = bytearray()
+    for line in matrix:
+        packed = bytearray(stride)
+        for column, dark in enumerate(line):
+            if not dark:
+                packed[column // 8] |= 0x80 >> (column % 8)
+        rows += packed
+    return width, bytes(rows)
+
+
+def snap_size(size):
+    """The largest of ``SIZES`` within ``size`` pixels (``None`` stays the default)"""
+    if size is None:
+        return None
+    return max((bucket for bucket in SIZES if bucket <= size), default=SIZES[0])
+
+
+def cache_root():
+    return getattr(settings, 'QR_CACHE_ROOT', os.path.join(settings.BASE_DIR, 'qr_cache'))
+
+
+def cache_path(digest, image_format, size):
+    return os.path.join(cache_root(), digest[:2], f'{digest}-{size or "default"}.{image_format}')
+
+
+def etag(digest, image_format, size):
+    return f'"{digest}-{size or "default"}-{image_format}"'
+
+
+def read_cached(digest, image_format='png', size=None):
+    """The cached image, or None"""
+    try:
+        with open(cache_path(digest, image_format, size), 'rb') as cached:
+            return cached.read()
+    except FileNotFoundError:
+        return None
+
+
+def store(content, digest, image_format='png', size=None):
+    path = cache_path(digest, image_format, size)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename, so a concurrent reader never sees a partial file
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as temp:
+        temp.write(content)
+    os.replace(temp_path, path)
+
+
+def cached_image(data, digest, image_format='png', size=None):
+    """Return the rendered image, rendering and storing it on a cache miss"""
+    content = read_cached(digest, image_format, size)
+    if content is None:
+        content = render(data, image_format, size)
+        store(content, digest, image_format, size)
+    return content
+
+
+def prune_cache(digests):
+    """
+    Delete cached images whose payload digest is not in ``digests``, or whose
+    size is not one of ``SIZES``. Returns how many files were removed.
+    """
+    names = {
+        f'{digest}-{size or "default"}.{image_format}'
+        for digest in digests for size in (None, *SIZES) for image_format in IMAGE_FORMATS
+    }
+    removed = 0
+    for directory, _, files in os.walk(cache_root()):
+        for name in files:
+            if name in names:
+                continue
+            path = os.path.join(directory, name)
+            if name.startswith('tmp'):
+                # store() may still be writing it
+                try:
+                    if time.time() - os.path.getmtime(path) < STALE_TEMP_SECONDS:
+                        continue
+                except FileNotFoundError:
+                    continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            removed += 1
+    return removed
+
+
+def filename(animal, image_format='png'):
+    return f'qr_{animal.animal_id.replace("/", "_")}.{image_format}'
@@ -0,0 +1,41 @@
+from rest_framework.renderers import JSONRenderer
+
+
+class ExportRenderer(JSONRenderer):
+    """
+    Selects an export format through ``?format=`` or ``Accept``.
+
+    Exports are streamed by the view and never pass through the renderer;
+    only error responses (403, 404, ...) are rendered here, as JSON.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return super().render(data, 'application/json', renderer_context)
+
+
+class CSVExportRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONExportRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class XLSXExportRenderer(ExportRenderer):
+    media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    format = 'xlsx'
+
+
+class PDFTagRenderer(ExportRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+
+
+class ZIPTagRenderer(ExportRenderer):
+    media_type = 'application/zip'
+    format = 'zip'
@@ -1,29 +1,47 @@
 from rest_framework import serializers
-from .models import Animal
+from rest_framework.reverse import reverse
+from django.utils import timezone
+
+from .models import Animal, HealthEvent, WeightRecord, normalize_health_status
+
+
+class HealthStatusField(serializers.ChoiceField):
+    """A ``HEALTH_STATUS_CHOICES`` value; case, spacing and common aliases are normalised"""
+
+    def __init__(self, **kwargs):
+        super().__init__(Animal.HEALTH_STATUS_CHOICES, **kwargs)
+
+    def to_internal_value(self, data):
+        if data == '' and self.allow_blank:
+            return ''
+        status, detail = normalize_health_status(str(data))
+        if status is None or detail:
+            self.fail('invalid_choice', input=data)
+        return status
 
 
 class AnimalSerializer(serializers.ModelSerializer):
     age = serializers.ReadOnlyField()
     offspring_count = serializers.ReadOnlyField()
-    father_name = serializers.CharField(source='father.name', read_only=True)
-    mother_name = serializers.CharField(source='mother.name', read_only=True)
+    father_name = serializers.ReadOnlyField()
+    mother_name = serializers.ReadOnlyField()
     qr_code_url = serializers.SerializerMethodField()
+    health_status = HealthStatusField(required=False, allow_blank=True)
 
     class Meta:
         model = Animal
         fields = [
             'id', 'animal_id', 'type', 'name', 'sex', 'breed', 'year_of_birth',
             'father', 'mother', 'father_name', 'mother_name', 'weight',
-            'health_status', 'notes', 'qr_code', 'qr_code_url', 'age',
+            'health_status', 'notes', 'qr_code_url', 'age',
             'offspring_count', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'animal_id', 'qr_code', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'animal_id', 'created_at', 'updated_at']
 
     def get_qr_code_url(self, obj):
-        if obj.qr_code:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.qr_code.url)
+        request = self.context.get('request')
+        if request and obj.pk:
+            return reverse('animals:animal-qr-code', args=[obj.pk], request=request)
         return None
 
     def validate_father(self, value):
@@ -47,6 +65,8 @@ class AnimalSerializer(serializers.ModelSerializer):
 
 
 class AnimalCreateSerializer(serializers.ModelSerializer):
+    health_status = HealthStatusField(required=False, allow_blank=True)
+
     class Meta:
         model = Animal
         fields = [
@@ -76,8 +96,8 @@ class AnimalCreateSerializer(serializers.ModelSerializer):
 
 class AnimalListSerializer(serializers.ModelSerializer):
     age = serializers.ReadOnlyField()
-    father_name = serializers.CharField(source='father.name', read_only=True)
-    mother_name = serializers.CharField(source='mother.name', read_only=True)
+    father_name = serializers.ReadOnlyField()
+    mother_name = serializers.ReadOnlyField()
 
     class Meta:
         model = Animal
@@ -86,3 +106,37 @@ class AnimalListSerializer(serializers.ModelSerializer):
             'father_name', 'mother_name', 'weight', 'health_status',
             'age', 'created_at'
         ]
+
+
+class WeightRecordSerializer(serializers.ModelSerializer):
+    animal_tag = serializers.ReadOnlyField(source='animal.animal_id')
+    recorded_by = serializers.ReadOnlyField(source='recorded_by.username')
+
+    class Meta:
+        model = WeightRecord
+        fields = ['id', 'animal', 'animal_tag', 'weight', 'measured_at', 'recorded_by', 'notes', 'created_at']
+        read_only_fields = ['id', 'created_at']
+
+    def validate_weight(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Weight must be positive.")
+        return value
+
+
+class HealthEventSerializer(serializers.ModelSerializer):
+    animal_tag = serializers.ReadOnlyField(source='animal.animal_id')
+    status = HealthStatusField()
+    recorded_by = serializers.ReadOnlyField(source='recorded_by.username')
+
+    class Meta:
+        model = HealthEvent
+        fields = [
+            'id', 'animal', 'animal_tag', 'status', 'diagnosis', 'treatment', 'vet',
+            'occurred_on', 'recorded_by', 'notes', 'created_at'
+        ]
+        read_only_fields = ['id', 'created_at']
+
+    def validate_occurred_on(self, value):
+        if value > timezone.localdate():
+            raise serializers.ValidationError("Date cannot be in the future.")
+        return value
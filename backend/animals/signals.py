@@ -0,0 +1,49 @@
+from django.db.models import Q, QuerySet
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from sync import changelog
+from .cache import invalidate_herd_caches, invalidate_scans
+from .models import Animal, HealthEvent, WeightRecord
+
+
+@receiver(post_save, sender=Animal)
+@receiver(post_delete, sender=Animal)
+def invalidate_animal_caches(sender, instance, **kwargs):
+    """Invalidate cached herd results whenever an animal changes"""
+    invalidate_herd_caches()
+    invalidate_scans([instance.animal_id])
+
+
+@receiver(pre_delete, sender=Animal)
+def log_orphaned_offspring(sender, instance, **kwargs):
+    """Deleting a parent clears father/mother on its offspring without saving them"""
+    offspring = Animal.objects.filter(Q(father=instance) | Q(mother=instance)).values_list('pk', flat=True)
+    changelog.record(Animal, offspring)
+
+
+def _cascaded_from_animal(origin):
+    """Whether a deletion started at an Animal (or a queryset of them)"""
+    return isinstance(origin, Animal) or (isinstance(origin, QuerySet) and origin.model is Animal)
+
+
+@receiver(post_save, sender=WeightRecord)
+@receiver(post_delete, sender=WeightRecord)
+def sync_latest_weight(sender, instance, origin=None, **kwargs):
+    """Keep Animal.weight equal to the latest reading"""
+    if _cascaded_from_animal(origin):
+        # The animal goes too; nothing to resync
+        return
+    WeightRecord.sync_latest_weights([instance.animal_id])
+    invalidate_scans([instance.animal.animal_id])
+
+
+@receiver(post_save, sender=HealthEvent)
+@receiver(post_delete, sender=HealthEvent)
+def sync_latest_health_status(sender, instance, origin=None, **kwargs):
+    """Keep Animal.health_status equal to the latest event's status"""
+    if _cascaded_from_animal(origin):
+        return
+    HealthEvent.sync_latest_statuses([instance.animal_id])
+    # The UPDATE bypasses Animal's post_save
+    invalidate_herd_caches()
+    invalidate_scans([instance.animal.animal_id])
@@ -0,0 +1,231 @@
+"""
+Printable QR tag sheets: a ZIP of PNG images or a multi-page label PDF.
+
+Animals are read in batches and their QR codes rendered across a process
+pool, a batch at a time, as the response is consumed. The output is
+produced a file (ZIP) or a page (PDF) at a time, so nothing is buffered
+beyond the current batch.
+"""
+import multiprocessing
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+
+from django.conf import settings
+
+from . import qr
+from .exporters import stream_zip
+
+
+TAG_FORMATS = {
+    'zip': 'application/zip',
+    'pdf': 'application/pdf',
+}
+
+BATCH_SIZE = 64
+
+# Starting spawned workers takes about a second; below this many animals
+# rendering in-process (~15ms per code) is quicker
+INLINE_RENDER_LIMIT = 64
+
+# A4 portrait, in points
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+PAGE_MARGIN = 36
+LABEL_COLUMNS = 3
+LABEL_ROWS = 4
+LABELS_PER_PAGE = LABEL_COLUMNS * LABEL_ROWS
+CAPTION_HEIGHT = 30
+
+
+def _batches(iterable, size=BATCH_SIZE):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _pool(count, workers):
+    if workers is None:
+        workers = getattr(settings, 'QR_RENDER_WORKERS', 1)
+    if workers < 2 or (count is not None and count < INLINE_RENDER_LIMIT):
+        return nullcontext(None)
+    # Spawned rather than forked: the parent is a (possibly threaded) web
+    # worker holding database connections.
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def _map(pool, function, *iterables):
+    if pool is None:
+        return map(function, *iterables)
+    return pool.map(function, *iterables)
+
+
+def png_images(animals, size=None, count=None, workers=None):
+    """
+    Yield ``(animal, png)`` for ``animals``, reusing the ``qr_code`` image cache.
+
+    ``count`` (when known) lets small runs skip the process pool.
+    """
+    with _pool(count, workers) as pool:
+        for batch in _batches(animals):
+            payloads = [qr.encode_payload(qr.qr_payload(animal)) for animal in batch]
+            digests = [qr.payload_digest(data) for data in payloads]
+            images = [qr.read_cached(digest, 'png', size) for digest in digests]
+            missing = [index for index, image in enumerate(images) if image is None]
+            rendered = _map(pool, qr.render, [payloads[index] for index in missing],
+                            ['png'] * len(missing), [size] * len(missing))
+            for index, image in zip(missing, rendered):
+                qr.store(image, digests[index], 'png', size)
+                images[index] = image
+            yield from zip(batch, images)
+
+
+def stream_png_zip(animals, size=None, count=None, workers=None):
+    members = (
+        (qr.filename(animal, 'png'), [image])
+        for animal, image in png_images(animals, size, count, workers)
+    )
+    # PNG data is already compressed
+    return stream_zip(members, compression=zipfile.ZIP_STORED)
+
+
+def _pdf_text(text):
+    """A PDF string literal in WinAnsiEncoding"""
+    raw = text.encode('cp1252', errors='replace')
+    return b'(' + raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def _truncate(text, limit=32):
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+
+class _PDFWriter:
+    """Writes numbered objects and remembers their offsets for the xref table"""
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets = {}
+        self.next_number = 1
+
+    def reserve(self):
+        number = self.next_number
+        self.next_number += 1
+        return number
+
+    def header(self):
+        return self._emit(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def obj(self, number, body, stream=None):
+        self.offsets[number] = self.offset
+        chunk = b'%d 0 obj\n' % number + body
+        if stream is not None:
+            chunk += b'\nstream\n' + stream + b'\nendstream'
+        return self._emit(chunk + b'\nendobj\n')
+
+    def trailer(self, root):
+        xref_offset = self.offset
+        size = self.next_number
+        lines = [b'xref\n0 %d\n' % size, b'0000000000 65535 f \n']
+        lines += [b'%010d 00000 n \n' % self.offsets[number] for number in range(1, size)]
+        lines.append(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, root, xref_offset))
+        return self._emit(b''.join(lines))
+
+    def _emit(self, data):
+        self.offset += len(data)
+        return data
+
+
+def _label_page(writer, labels, pages_number, fonts):
+    """Objects for one page of labels; returns ``(page_number, chunks)``"""
+    cell_width = (PAGE_WIDTH - 2 * PAGE_MARGIN) / LABEL_COLUMNS
+    cell_height = (PAGE_HEIGHT - 2 * PAGE_MARGIN) / LABEL_ROWS
+    side = min(cell_width, cell_height - CAPTION_HEIGHT) - 12
+
+    chunks = []
+    images = []
+    content = [b'0.8 G 0.5 w']
+    for position, (animal, (width, bits)) in enumerate(labels):
+        column, row = position % LABEL_COLUMNS, position // LABEL_COLUMNS
+        left = PAGE_MARGIN + column * cell_width
+        bottom = PAGE_HEIGHT - PAGE_MARGIN - (row + 1) * cell_height
+        image_number = writer.reserve()
+        name = b'/Im%d' % position
+        images.append(b'%s %d 0 R' % (name, image_number))
+        chunks.append(writer.obj(
+            image_number,
+            b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray '
+            b'/BitsPerComponent 1 /Interpolate false /Filter /FlateDecode /Length %d >>'
+            % (width, width, len(bits)),
+            bits,
+        ))
+        image_left = left + (cell_width - side) / 2
+        image_bottom = bottom + CAPTION_HEIGHT + 6
+        caption_x = left + 8
+        content += [
+            b'%.2f %.2f %.2f %.2f re S' % (left, bottom, cell_width, cell_height),
+            b'q %.2f 0 0 %.2f %.2f %.2f cm %s Do Q' % (side, side, image_left, image_bottom, name),
+            b'BT /F2 10 Tf %.2f %.2f Td %s Tj ET' % (caption_x, bottom + 18, _pdf_text(animal.animal_id)),
+            b'BT /F1 9 Tf %.2f %.2f Td %s Tj ET' % (caption_x, bottom + 6, _pdf_text(_truncate(animal.name))),
+        ]
+    content_data = zlib.compress(b'\n'.join(content))
+    content_number = writer.reserve()
+    chunks.append(writer.obj(
+        content_number, b'<< /Filter /FlateDecode /Length %d >>' % len(content_data), content_data,
+    ))
+    page_number = writer.reserve()
+    chunks.append(writer.obj(
+        page_number,
+        b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R '
+        b'/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> /XObject << %s >> >> >>'
+        % (pages_number, PAGE_WIDTH, PAGE_HEIGHT, content_number, fonts[0], fonts[1], b' '.join(images)),
+    ))
+    return page_number, chunks
+
+
+def _module_bitmaps(animals, count, workers):
+    with _pool(count, workers) as pool:
+        for batch in _batches(animals, LABELS_PER_PAGE * 4):
+            payloads = [qr.encode_payload(qr.qr_payload(animal)) for animal in batch]
+            for animal, (width, rows) in zip(batch, _map(pool, qr.render_modules, payloads)):
+                yield animal, (width, zlib.compress(rows))
+
+
+def stream_label_pdf(animals, count=None, workers=None):
+    """A4 sheets of labels: the QR code, tag and name, with cut lines"""
+    writer = _PDFWriter()
+    catalog = writer.reserve()
+    pages_number = writer.reserve()
+    fonts = (writer.reserve(), writer.reserve())
+
+    yield writer.header()
+    yield writer.obj(catalog, b'<< /Type /Catalog /Pages %d 0 R >>' % pages_number)
+    for number, font in zip(fonts, (b'Helvetica', b'Helvetica-Bold')):
+        yield writer.obj(number, b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % font)
+
+    pages = []
+    for labels in _batches(_module_bitmaps(animals, count, workers), LABELS_PER_PAGE):
+        page_number, chunks = _label_page(writer, labels, pages_number, fonts)
+        pages.append(page_number)
+        yield b''.join(chunks)
+
+    if not pages:
+        # A PDF needs at least one page
+        page_number, chunks = _label_page(writer, [], pages_number, fonts)
+        pages.append(page_number)
+        yield b''.join(chunks)
+
+    kids = b' '.join(b'%d 0 R' % number for number in pages)
+    yield writer.obj(pages_number, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(pages)))
+    yield writer.trailer(catalog)
+
+
+def stream_tags(tag_format, animals, size=None, count=None, workers=None):
+    """Byte chunks of a ZIP of PNGs (``zip``) or a label PDF (``pdf``)"""
+    if tag_format == 'pdf':
+        return stream_label_pdf(animals, count, workers)
+    return stream_png_zip(animals, size, count, workers)
@@ -0,0 +1,743 @@
+import base64
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core import checks
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from farm_management import search
+from farm_management.representations import ValuesRepresentation
+
+from . import pedigree, qr
+from .importers import import_animals
+from .models import Animal, AnimalIdSequence, HealthEvent, WeightRecord
+from .serializers import AnimalListSerializer
+
+
+class AnimalQueryCountTests(APITestCase):
+    """
+    Every action costs a fixed number of queries, however many animals
+    are on the page. A failure here usually means a serializer field went
+    back to a per-row lookup. List and detail GETs start with one
+    aggregate for their ETag (see ConditionalGetMixin); writes end with
+    a DELETE and an INSERT into the sync change log.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('manager', password='pw-123456')
+        user.userprofile.role = 'admin'
+        user.userprofile.save()
+        cls.user_id = user.pk
+
+    def setUp(self):
+        cache.clear()
+        self.qr_cache_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.qr_cache_root, ignore_errors=True)
+        # The profile is loaded with the user, so permission checks are free
+        self.client.force_authenticate(User.objects.select_related('userprofile').get(pk=self.user_id))
+
+    def make_herd(self, families):
+        sire = Animal.objects.create(name='Sire', sex='Male', breed='Zebu', year_of_birth=2015)
+        dam = Animal.objects.create(name='Dam', sex='Female', breed='Zebu', year_of_birth=2016)
+        for number in range(families):
+            Animal.objects.create(
+                name=f'Calf {number}', sex='Female' if number % 2 else 'Male', breed='Zebu',
+                year_of_birth=2020, father=sire, mother=dam,
+            )
+        return sire, dam
+
+    def assert_queries(self, expected, method, url, data=None, **kwargs):
+        with override_settings(QR_CACHE_ROOT=self.qr_cache_root):
+            with self.assertNumQueries(expected):
+                response = getattr(self.client, method)(url, data, **kwargs)
+        self.assertLess(response.status_code, 400, getattr(response, 'data', None))
+        return response
+
+    def test_list(self):
+        self.make_herd(3)
+        self.assert_queries(3, 'get', reverse('animals:animal-list'))
+        self.make_herd(15)
+        response = self.assert_queries(3, 'get', reverse('animals:animal-list'))
+        self.assertEqual(response.data['count'], 22)
+        self.assertEqual(response.data['results'][-1]['father_name'], 'Sire')
+
+    def test_list_ordering_and_min_offspring(self):
+        sire, dam = self.make_herd(4)
+        other = Animal.objects.create(name='Other Sire', sex='Male', breed='Zebu', year_of_birth=2014)
+        Animal.objects.create(name='Half Sib', sex='Male', breed='Zebu', year_of_birth=2021, father=other, mother=dam)
+        response = self.assert_queries(
+            3, 'get', reverse('animals:animal-list'), {'ordering': '-offspring_count', 'min_offspring': 2}
+        )
+        self.assertEqual([row['id'] for row in response.data['results']], [dam.pk, sire.pk])
+        response = self.assert_queries(3, 'get', reverse('animals:animal-list'), {'ordering': 'age'})
+        self.assertEqual(response.data['results'][-1]['id'], other.pk)
+
+    def test_sparse_fields(self):
+        self.make_herd(3)
+        response = self.assert_queries(3, 'get', reverse('animals:animal-list'), {'fields': 'id,animal_id,name'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'animal_id', 'name'})
+        sire = Animal.objects.get(name='Sire')
+        response = self.assert_queries(
+            2, 'get', reverse('animals:animal-detail', args=[sire.pk]), {'omit': 'notes,qr_code_url'}
+        )
+        self.assertNotIn('notes', response.data)
+        self.assertEqual(response.data['offspring_count'], 3)
+
+    def test_retrieve(self):
+        sire, dam = self.make_herd(10)
+        response = self.assert_queries(2, 'get', reverse('animals:animal-detail', args=[sire.pk]))
+        self.assertEqual(response.data['offspring_count'], 10)
+        response = self.assert_queries(2, 'get', reverse('animals:animal-detail', args=[dam.pk]))
+        self.assertEqual(response.data['offspring_count'], 10)
+        self.assertEqual(response.data['age'], sire.age - 1)
+
+    def test_conditional_get(self):
+        sire, dam = self.make_herd(3)
+        for url in (reverse('animals:animal-list'), reverse('animals:animal-detail', args=[sire.pk])):
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+        # A new calf changes the sire's offspring count
+        Animal.objects.create(name='Late Calf', sex='Male', breed='Zebu', year_of_birth=2023, father=sire)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['offspring_count'], 4)
+
+    def test_create(self):
+        sire, dam = self.make_herd(2)
+        data = {
+            'name': 'Newborn', 'sex': 'Female', 'breed': 'Zebu', 'year_of_birth': 2024,
+            'father': sire.pk, 'mother': dam.pk,
+        }
+        # Parent lookups, ID allocation (in a savepoint), insert, the SQLite
+        # search index refresh and the annotated reload
+        response = self.assert_queries(12, 'post', reverse('animals:animal-list'), data, format='json')
+        self.assertEqual(response.data['mother_name'], 'Dam')
+        self.assertEqual(response.data['offspring_count'], 0)
+
+    def test_update(self):
+        sire, dam = self.make_herd(2)
+        other = Animal.objects.create(name='Other Sire', sex='Male', breed='Zebu', year_of_birth=2014)
+        calf = Animal.objects.filter(father=sire).first()
+        response = self.assert_queries(
+            8, 'patch', reverse('animals:animal-detail', args=[calf.pk]), {'father': other.pk}, format='json'
+        )
+        self.assertEqual(response.data['father_name'], 'Other Sire')
+
+    def test_destroy(self):
+        counts = []
+        for readings in (1, 5):
+            calf = Animal.objects.create(name='Calf', sex='Female', breed='Zebu', year_of_birth=2024)
+            for day in range(readings):
+                WeightRecord.objects.create(animal=calf, weight=40 + day)
+                HealthEvent.objects.create(animal=calf, status='Sick')
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.delete(reverse('animals:animal-detail', args=[calf.pk]))
+            self.assertEqual(response.status_code, 204)
+            counts.append(len(queries))
+        # Cascaded readings and events are not resynced one by one
+        self.assertEqual(counts[0], counts[1], counts)
+
+    def test_statistics(self):
+        self.make_herd(5)
+        self.assert_queries(1, 'get', reverse('animals:animal-statistics'))
+        self.assert_queries(0, 'get', reverse('animals:animal-statistics'))
+
+    def test_health_status_filter(self):
+        sire, dam = self.make_herd(4)
+        Animal.objects.filter(father=sire).update(health_status='Sick')
+        response = self.assert_queries(3, 'get', reverse('animals:animal-list'), {'health_status': 'sick '})
+        self.assertEqual(response.data['count'], 4)
+
+    def test_health_incidence(self):
+        sire, dam = self.make_herd(4)
+        for calf in Animal.objects.filter(father=sire):
+            HealthEvent.objects.create(animal=calf, status='Sick', diagnosis='Mastitis')
+        for period in ('week', 'month'):
+            response = self.assert_queries(1, 'get', reverse('animals:healthevent-incidence'), {'period': period})
+            self.assertEqual(response.data['periods'][0]['by_status']['Sick'], {'events': 4, 'animals': 4})
+
+    def test_parents(self):
+        sire, dam = self.make_herd(5)
+        Animal.objects.create(name='Kid', sex='Male', breed='Zebu', year_of_birth=timezone.now().year)
+        response = self.assert_queries(1, 'get', reverse('animals:animal-parents'))
+        self.assertNotIn('Kid', [parent['name'] for parent in response.data['fathers']])
+        response = self.assert_queries(0, 'get', reverse('animals:animal-parents'), {'q': 'da'})
+        self.assertEqual(response.data, {
+            'fathers': [],
+            'mothers': [{'id': dam.pk, 'animal_id': dam.animal_id, 'name': 'Dam', 'type': 'Cow'}],
+        })
+        self.assert_queries(1, 'get', reverse('animals:animal-parents'), {'type': 'Goat'})
+
+    def test_pedigree_and_descendants(self):
+        sire, dam = self.make_herd(5)
+        calf = Animal.objects.filter(father=sire).first()
+        # The lineage, plus the herd pedigree behind the inbreeding coefficient
+        self.assert_queries(3, 'get', reverse('animals:animal-pedigree', args=[calf.pk]))
+        self.assert_queries(2, 'get', reverse('animals:animal-descendants', args=[sire.pk]))
+
+    def test_inbreeding(self):
+        self.make_herd(3)
+        self.assert_queries(2, 'get', reverse('animals:animal-inbreeding'))
+        self.make_herd(10)
+        self.assert_queries(2, 'get', reverse('animals:animal-inbreeding'))
+
+    def test_mates_and_breeding_plan(self):
+        sire, dam = self.make_herd(6)
+        son = Animal.objects.filter(father=sire, sex='Male').first()
+        response = self.assert_queries(3, 'get', reverse('animals:animal-mates', args=[dam.pk]))
+        # Her own son is the closest relative
+        self.assertEqual(response.data['sires'][-1]['id'], son.pk)
+        self.assertEqual(response.data['sires'][-1]['expected_inbreeding'], 0.25)
+        self.assert_queries(3, 'get', reverse('animals:animal-breeding-plan'))
+        self.make_herd(10)
+        self.assert_queries(3, 'get', reverse('animals:animal-breeding-plan'), {'limit': 2})
+
+    def test_qr_code(self):
+        sire, dam = self.make_herd(1)
+        calf = Animal.objects.filter(father=sire).first()
+        self.assert_queries(1, 'get', reverse('animals:animal-qr-code', args=[calf.pk]))
+
+    def test_scan(self):
+        sire, dam = self.make_herd(2)
+        url = reverse('animals:animal-scan', args=[dam.animal_id])
+        response = self.assert_queries(1, 'get', url)
+        self.assertEqual(response.data['name'], 'Dam')
+        self.assert_queries(0, 'get', url)
+        HealthEvent.objects.create(animal=dam, status='Sick')
+        response = self.assert_queries(1, 'get', url)
+        self.assertEqual(response.data['health_status'], 'Sick')
+
+        tags = [dam.animal_id, sire.animal_id, 'CFZ/999']
+        response = self.assert_queries(1, 'post', reverse('animals:animal-scan-batch'), {'animal_ids': tags}, format='json')
+        self.assertEqual([animal['name'] for animal in response.data['animals']], ['Dam', 'Sire'])
+        self.assertEqual(response.data['missing'], ['CFZ/999'])
+        self.assertEqual(self.client.get(reverse('animals:animal-scan', args=['CFZ/999'])).status_code, 404)
+
+    def test_bulk(self):
+        sire, dam = self.make_herd(1)
+        rows = [
+            {'name': f'Import {number}', 'sex': 'Female', 'breed': 'Zebu', 'year_of_birth': 2022,
+             'father': sire.animal_id, 'mother': dam.animal_id}
+            for number in range(60)
+        ]
+        # Kept under SQLite's 999 parameter limit, so each batch is one INSERT
+        self.assert_queries(12, 'post', reverse('animals:animal-bulk'), rows[:5], format='json')
+        response = self.assert_queries(12, 'post', reverse('animals:animal-bulk'), rows, format='json')
+        self.assertEqual(response.data['created'], 60)
+
+    def test_batch(self):
+        sire, dam = self.make_herd(4)
+        herder = User.objects.create_user('herder', password='pw-123456')
+        herder.userprofile.role = 'farm_worker'
+        herder.userprofile.save()
+        self.client.force_authenticate(User.objects.select_related('userprofile').get(pk=herder.pk))
+        calves = list(Animal.objects.filter(father=sire).order_by('pk'))
+        rows = [
+            {'animal_id': calf.animal_id, 'weight': '120.50', 'health_status': 'sick', 'mother': dam.pk}
+            for calf in calves
+        ]
+        rows.append({'id': calves[0].pk, 'mother': sire.pk})
+        response = self.client.patch(reverse('animals:animal-batch'), rows, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [5])
+
+        rows[-1] = {'id': dam.pk, 'father': None, 'notes': 'Dipped'}
+        # Animals, parents, then in a savepoint: UPDATE, weight readings,
+        # search index (2) and change log (2)
+        response = self.assert_queries(10, 'patch', reverse('animals:animal-batch'), rows, format='json')
+        self.assertEqual(response.data['updated'], 5)
+        self.assertEqual(set(Animal.objects.filter(father=sire).values_list('health_status', 'weight')), {('Sick', 120.5)})
+        self.assertEqual(WeightRecord.objects.filter(animal__in=calves).count(), 4)
+        self.assertEqual(Animal.objects.get(pk=dam.pk).notes, 'Dipped')
+
+    def test_export(self):
+        self.make_herd(3)
+        for export_format in ('csv', 'ndjson', 'xlsx'):
+            with self.assertNumQueries(1):
+                response = self.client.get(reverse('animals:animal-export'), {'format': export_format})
+                content = b''.join(response.streaming_content)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(content)
+
+    def test_tags(self):
+        self.make_herd(3)
+        for tag_format in ('pdf', 'zip'):
+            with override_settings(QR_CACHE_ROOT=self.qr_cache_root, QR_RENDER_WORKERS=0):
+                with self.assertNumQueries(2):
+                    response = self.client.get(reverse('animals:animal-tags'), {'format': tag_format})
+                    content = b''.join(response.streaming_content)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(content)
+
+
+class ValuesListTests(APITestCase):
+    """The .values() list path must render exactly what AnimalListSerializer does"""
+
+    def test_matches_serializer(self):
+        sire = Animal.objects.create(name='Sire', sex='Male', breed='Brown_Swiss', year_of_birth=2015, weight='512.5')
+        Animal.objects.create(name='Dam', sex='Female', breed='Zebu', year_of_birth=2016, health_status='')
+        Animal.objects.create(
+            name='Calf "Ä"', sex='Female', breed='Zebu', type='Goat', year_of_birth=2022, father=sire, weight='31.04',
+            health_status='Under Treatment', notes='Line one\nline two',
+        )
+        queryset = Animal.objects.with_summary().order_by('-created_at', '-id')
+        representation = ValuesRepresentation.compile(AnimalListSerializer(), queryset)
+        self.assertIsNotNone(representation)
+
+        expected = JSONRenderer().render(AnimalListSerializer(queryset, many=True).data)
+        actual = JSONRenderer().render(representation.rows(queryset.values(*representation.columns)))
+        self.assertEqual(actual, expected)
+
+
+class AnimalIdTests(APITestCase):
+    def import_ids(self, rows):
+        report, ok = import_animals([{'name': 'Imported', 'sex': 'Female', 'breed': 'Zebu', 'year_of_birth': 2020, **row} for row in rows])
+        self.assertTrue(ok, report['errors'])
+        return [animal['animal_id'] for animal in report['animals']]
+
+    def test_explicit_id_in_new_prefix(self):
+        self.assertEqual(self.import_ids([{'animal_id': 'CFZ/001'}, {}]), ['CFZ/001', 'CFZ/002'])
+        self.assertEqual(Animal.objects.create(name='Later', sex='Female', breed='Zebu', year_of_birth=2021).animal_id, 'CFZ/003')
+
+    def test_numbers_above_999(self):
+        Animal.objects.create(name='Old', sex='Female', breed='Zebu', year_of_birth=2012, animal_id='CFZ/999')
+        self.assertEqual(self.import_ids([{'animal_id': 'CFZ/1200'}, {}]), ['CFZ/1200', 'CFZ/1201'])
+        # Numeric, not lexical: CFZ/1201 is higher than CFZ/999
+        self.assertEqual(AnimalIdSequence.highest_existing('CFZ'), 1201)
+
+    def test_species_prefix(self):
+        Animal.objects.create(name='Nanny', sex='Female', breed='Zebu', type='Goat', year_of_birth=2019, animal_id='GFZ/004')
+        # Generated tags start after every tag carried in the file
+        self.assertEqual(self.import_ids([{'type': 'Goat'}, {'type': 'Goat', 'animal_id': 'GFZ/010'}, {'type': 'Goat'}]),
+                         ['GFZ/011', 'GFZ/010', 'GFZ/012'])
+
+
+class PedigreeTests(APITestCase):
+    """Wright's coefficients for textbook matings, from every path that reports them"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('manager', password='pw-123456')
+        user.userprofile.role = 'admin'
+        user.userprofile.save()
+        cls.user_id = user.pk
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(User.objects.select_related('userprofile').get(pk=self.user_id))
+
+    def animal(self, name, sex, father=None, mother=None):
+        return Animal.objects.create(
+            name=name, sex=sex, breed='Zebu', year_of_birth=2015, father=father, mother=mother,
+        )
+
+    def assert_inbreeding(self, animal, expected):
+        response = self.client.get(reverse('animals:animal-pedigree', args=[animal.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertAlmostEqual(response.data['inbreeding_coefficient'], expected)
+        response = self.client.get(reverse('animals:animal-inbreeding'))
+        coefficients = {row['id']: row['inbreeding_coefficient'] for row in response.data}
+        self.assertAlmostEqual(coefficients[animal.pk], expected)
+
+    def test_full_sib_mating(self):
+        sire, dam = self.animal('Sire', 'Male'), self.animal('Dam', 'Female')
+        brother = self.animal('Brother', 'Male', sire, dam)
+        sister = self.animal('Sister', 'Female', sire, dam)
+        calf = self.animal('Calf', 'Female', brother, sister)
+        self.assert_inbreeding(brother, 0.0)
+        self.assert_inbreeding(calf, 0.25)
+        # The common ancestors are two generations back; ?depth= only trims the tree
+        response = self.client.get(reverse('animals:animal-pedigree', args=[calf.pk]), {'depth': 1})
+        self.assertEqual(len(response.data['ancestors']), 3)
+        self.assertEqual(response.data['inbreeding_coefficient'], 0.25)
+
+        response = self.client.get(reverse('animals:animal-mates', args=[sister.pk]))
+        expected = {row['id']: row['expected_inbreeding'] for row in response.data['sires']}
+        self.assertEqual(expected, {sire.pk: 0.25, brother.pk: 0.25})
+
+        # Half the relationship of Brother and Calf, 1/2 (1 + 1/2)
+        backcross = self.animal('Backcross', 'Male', brother, calf)
+        self.assert_inbreeding(backcross, 0.375)
+
+    def test_half_sib_mating(self):
+        sire = self.animal('Sire', 'Male')
+        son = self.animal('Son', 'Male', sire, self.animal('Dam 1', 'Female'))
+        daughter = self.animal('Daughter', 'Female', sire, self.animal('Dam 2', 'Female'))
+        calf = self.animal('Calf', 'Male', son, daughter)
+        self.assert_inbreeding(calf, 0.125)
+
+        coefficients = pedigree.inbreeding_coefficients(pedigree.herd_pedigree())
+        self.assertAlmostEqual(coefficients[calf.pk], 0.125)
+        self.assertEqual({pk for pk, f in coefficients.items() if f}, {calf.pk})
+
+
+class KeysetPaginationTests(APITestCase):
+    """?cursor= pages of the animal list (ordered by -created_at, -id)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('manager', password='pw-123456')
+        user.userprofile.role = 'admin'
+        user.userprofile.save()
+        cls.user_id = user.pk
+        cls.animals = [
+            Animal.objects.create(name=f'Animal {number}', sex='Female', breed='Zebu', year_of_birth=2010 + number)
+            for number in range(7)
+        ]
+        # Three animals share a timestamp (split across pages of two); the id breaks the tie
+        start = timezone.now()
+        for offset, animal in zip([0, 1, 1, 1, 2, 3, 4], cls.animals):
+            Animal.objects.filter(pk=animal.pk).update(created_at=start + timedelta(minutes=offset))
+        cls.expected = [animal.pk for animal in reversed(cls.animals)]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(User.objects.select_related('userprofile').get(pk=self.user_id))
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertNotIn('count', response.data)
+        return response.data
+
+    def walk(self, params):
+        """Follow ``next`` from the first page, then ``previous`` back again"""
+        pages = [self.get(reverse('animals:animal-list'), {'cursor': '', 'page_size': 2, **params})]
+        while pages[-1]['next']:
+            pages.append(self.get(pages[-1]['next']))
+        self.assertIsNone(pages[0]['previous'])
+        backwards = [pages[-1]]
+        while backwards[-1]['previous']:
+            backwards.append(self.get(backwards[-1]['previous']))
+        ids = [[row['id'] for row in page['results']] for page in pages]
+        self.assertEqual([[row['id'] for row in page['results']] for page in reversed(backwards)], ids)
+        return [pk for page in ids for pk in page]
+
+    def test_round_trip_with_ties(self):
+        self.assertEqual(self.walk({}), self.expected)
+
+    def test_ordering_is_ignored(self):
+        self.assertEqual(self.walk({'ordering': 'name'}), self.expected)
+        # Page numbers still honour it
+        response = self.client.get(reverse('animals:animal-list'), {'ordering': 'year_of_birth', 'page_size': 2})
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual([row['id'] for row in response.data['results']], [animal.pk for animal in self.animals[:2]])
+
+    def test_rows_inserted_meanwhile(self):
+        first = self.get(reverse('animals:animal-list'), {'cursor': '', 'page_size': 2})
+        Animal.objects.create(name='Newborn', sex='Male', breed='Zebu', year_of_birth=2024)
+        second = self.get(first['next'])
+        self.assertEqual([row['id'] for row in second['results']], self.expected[2:4])
+
+    def test_garbage_cursor(self):
+        def encode(raw):
+            return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+        for cursor in ['%%%', 'w6k', encode('[1, 2]'), encode('{"p": [1]}'),
+                       encode('{"p": ["yesterday", 1]}'), encode('{"p": [{}, []]}')]:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse('animals:animal-list'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+
+
+class SearchTests(APITestCase):
+    """?search= against the FTS5 shadow table the test database uses"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('manager', password='pw-123456')
+        user.userprofile.role = 'admin'
+        user.userprofile.save()
+        cls.user_id = user.pk
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(User.objects.select_related('userprofile').get(pk=self.user_id))
+
+    def animal(self, name, **fields):
+        return Animal.objects.create(name=name, sex='Female', breed='Zebu', year_of_birth=2020, **fields)
+
+    def search(self, text, **params):
+        response = self.client.get(reverse('animals:animal-list'), {'search': text, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['id'] for row in response.data['results']]
+
+    def matches(self, text):
+        return sorted(search.search(Animal.objects.all(), text)[0].values_list('id', flat=True))
+
+    def test_prefix_terms(self):
+        tagged = self.animal('Tagged', animal_id='CMJ/012')
+        other = self.animal('Other', animal_id='CMJ/120')
+        self.assertEqual(self.search('CMJ/01'), [tagged.pk])
+        self.assertEqual(sorted(self.search('cmj')), sorted([tagged.pk, other.pk]))
+        vaccinated = self.animal('Nuru', notes='Vaccinated against anthrax')
+        self.assertEqual(self.search('vacc'), [vaccinated.pk])
+
+    def test_terms_are_anded(self):
+        both = self.animal('Nuru', notes='Lame, treated')
+        self.animal('Nuru Two', notes='Healthy')
+        self.animal('Zawadi', notes='Lame')
+        self.assertEqual(self.search('nuru lame'), [both.pk])
+        self.assertEqual(self.search('nuru lame zebra'), [])
+
+    def test_relevance_and_explicit_ordering(self):
+        # A name match (weight A) outranks a mention in the notes (weight C)
+        mentioned = self.animal('Baraka', notes='Twin of zawadi')
+        named = self.animal('Zawadi')
+        self.assertEqual(self.search('zawadi'), [named.pk, mentioned.pk])
+        self.assertEqual(self.search('zawadi', ordering='name'), [mentioned.pk, named.pk])
+
+    def test_shadow_table_follows_writes(self):
+        animal = self.animal('Nuru')
+        self.assertEqual(self.matches('nuru'), [animal.pk])
+        animal.name = 'Imani'
+        animal.save()
+        self.assertEqual(self.matches('nuru'), [])
+        self.assertEqual(self.matches('imani'), [animal.pk])
+        animal.delete()
+        self.assertEqual(self.matches('imani'), [])
+
+        report, ok = import_animals([
+            {'name': 'Imported', 'sex': 'Female', 'breed': 'Zebu', 'year_of_birth': 2020} for _ in range(3)
+        ])
+        self.assertTrue(ok, report['errors'])
+        imported = sorted(row['id'] for row in report['animals'])
+        self.assertEqual(self.matches('imported'), imported)
+
+        # QuerySet.update() skips the signals until reindex() catches up
+        Animal.objects.filter(pk__in=imported[:2]).update(name='Renamed')
+        self.assertEqual(self.matches('renamed'), [])
+        search.reindex(Animal, imported[:2])
+        self.assertEqual(self.matches('renamed'), imported[:2])
+        Animal.objects.update(notes='Dipped')
+        search.reindex(Animal)
+        self.assertEqual(self.matches('dipped'), imported)
+
+
+class ExportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('accountant', password='pw-123456')
+        user.userprofile.role = 'farm_accountant'
+        user.userprofile.save()
+        cls.user_id = user.pk
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(User.objects.select_related('userprofile').get(pk=self.user_id))
+
+    def export(self, export_format):
+        response = self.client.get(reverse('animals:animal-export'), {'format': export_format})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_timestamps_match_the_api(self):
+        animal = Animal.objects.create(name='Nuru', sex='Female', breed='Zebu', year_of_birth=2020, weight='-1')
+        api = self.client.get(reverse('animals:animal-detail', args=[animal.pk])).data
+        row = next(csv.DictReader(io.StringIO(self.export('csv'))))
+        self.assertEqual((row['created_at'], row['updated_at']), (api['created_at'], api['updated_at']))
+        # Numbers are never escaped
+        self.assertEqual(row['weight'], '-1.00')
+        line = json.loads(self.export('ndjson'))
+        self.assertEqual((line['created_at'], line['updated_at']), (api['created_at'], api['updated_at']))
+
+    def test_formulas_are_escaped(self):
+        notes = ['=HYPERLINK("http://example.com")', '+1', '-2+3', '@SUM(A1)', 'Healthy = yes']
+        for note in notes:
+            Animal.objects.create(name=note, sex='Female', breed='Zebu', year_of_birth=2020, notes=note)
+        rows = {row['notes']: row['name'] for row in csv.DictReader(io.StringIO(self.export('csv')))}
+        self.assertEqual(rows, {
+            "'=HYPERLINK(\"http://example.com\")": "'=HYPERLINK(\"http://example.com\")",
+            "'+1": "'+1", "'-2+3": "'-2+3", "'@SUM(A1)": "'@SUM(A1)", 'Healthy = yes': 'Healthy = yes',
+        })
+
+
+class QRCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('manager', password='pw-123456')
+        user.userprofile.role = 'admin'
+        user.userprofile.save()
+        cls.user_id = user.pk
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(User.objects.select_related('userprofile').get(pk=self.user_id))
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        overrides = override_settings(QR_CACHE_ROOT=root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.root = root
+
+    def cached_files(self):
+        return sorted(name for _, _, files in os.walk(self.root) for name in files)
+
+    def get(self, animal, **params):
+        response = self.client.get(reverse('animals:animal-qr-code', args=[animal.pk]), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_sizes_are_bucketed(self):
+        animal = Animal.objects.create(name='Nuru', sex='Female', breed='Zebu', year_of_birth=2020)
+        etags = {self.get(animal, size=size)['ETag'] for size in range(256, 512, 16)}
+        self.assertEqual(len(etags), 1)
+        self.get(animal, size=2048)
+        self.assertEqual(len(self.cached_files()), 2)
+        self.assertEqual(qr.snap_size(64), 64)
+        self.assertEqual(qr.snap_size(1000), 512)
+
+    def test_prune(self):
+        animal = Animal.objects.create(name='Nuru', sex='Female', breed='Zebu', year_of_birth=2020)
+        self.get(animal)
+        self.get(animal, image_format='svg', size=128)
+        kept = self.cached_files()
+        animal.name = 'Imani'
+        animal.save()
+        self.get(animal)
+        # Left over from before sizes were bucketed
+        qr.store(b'png', qr.payload_digest(qr.encode_payload(qr.qr_payload(animal))), 'png', 300)
+        self.assertEqual(len(self.cached_files()), 4)
+
+        call_command('prune_qr_cache', stdout=io.StringIO())
+        files = self.cached_files()
+        self.assertEqual(len(files), 1)
+        self.assertFalse(set(files) & set(kept))
+        self.assertEqual(self.get(animal)['ETag'].strip('"').rsplit('-', 2)[0], files[0].split('-')[0])
+
+
+class CacheCheckTests(SimpleTestCase):
+    def warnings(self):
+        return [message.id for message in checks.run_checks(tags=[checks.Tags.caches], include_deployment_checks=True)]
+
+    def test_per_process_cache(self):
+        self.assertIn('animals.W001', self.warnings())
+        shared = {'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379',
+        }}
+        with override_settings(CACHES=shared):
+            self.assertNotIn('animals.W001', self.warnings())
+
+
+class WeightHistoryTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('manager', password='pw-123456')
+        user.userprofile.role = 'admin'
+        user.userprofile.save()
+        cls.user_id = user.pk
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(User.objects.select_related('userprofile').get(pk=self.user_id))
+
+    def test_bad_params(self):
+        for name, params in (
+            ('animals:weightrecord-list', {'cohort': 'abc'}),
+            ('animals:weightrecord-percentiles', {'cohort': 'abc'}),
+            ('animals:weightrecord-adg', {'since': '2024-13-45'}),
+            ('animals:weightrecord-list', {'until': 'yesterday'}),
+            ('animals:healthevent-list', {'cohort': 'abc'}),
+            ('animals:healthevent-incidence', {'cohort': '19x'}),
+        ):
+            response = self.client.get(reverse(name), params)
+            self.assertEqual(response.status_code, 400, (name, params))
+            self.assertEqual(list(response.data), list(params))
+
+    def weigh(self, animal, *readings):
+        start = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        return [
+            WeightRecord.objects.create(animal=animal, weight=weight, measured_at=start + timedelta(days=day))
+            for day, weight in readings
+        ]
+
+    def test_latest_weight_is_mirrored(self):
+        calf = Animal.objects.create(name='Calf', sex='Female', breed='Zebu', year_of_birth=2024)
+        first, latest = self.weigh(calf, (0, 40), (30, 52))
+        calf.refresh_from_db()
+        self.assertEqual(calf.weight, Decimal('52.00'))
+
+        self.weigh(calf, (-30, 31))  # a late entry of an older reading
+        calf.refresh_from_db()
+        self.assertEqual(calf.weight, Decimal('52.00'))
+
+        latest.delete()
+        calf.refresh_from_db()
+        self.assertEqual(calf.weight, Decimal('40.00'))
+
+    def test_bulk(self):
+        calf = Animal.objects.create(name='Calf', sex='Female', breed='Zebu', year_of_birth=2024)
+        url = reverse('animals:weightrecord-bulk')
+        response = self.client.post(url, [
+            {'animal_id': calf.animal_id, 'weight': '61.5', 'measured_at': '2025-03-01T08:00:00Z'},
+            {'animal': calf.pk, 'weight': '64'},
+        ], format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'], 2)
+        calf.refresh_from_db()
+        self.assertEqual(calf.weight, Decimal('64.00'))  # the session time is now
+
+        response = self.client.post(url, [{'animal_id': calf.animal_id, 'weight': '70'}, {'animal_id': 'XXX/001'}],
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2])
+        self.assertEqual(calf.weight_records.count(), 2)
+
+    def test_adg(self):
+        steer = Animal.objects.create(name='Steer', sex='Male', breed='Zebu', year_of_birth=2023)
+        heifer = Animal.objects.create(name='Heifer', sex='Female', breed='Zebu', year_of_birth=2023)
+        self.weigh(steer, (0, 100), (10, 112), (20, 120))  # least-squares slope 1.0
+        self.weigh(heifer, (0, 50), (10, 55))
+
+        response = self.client.get(reverse('animals:weightrecord-adg'))
+        self.assertEqual(response.status_code, 200)
+        by_animal = {row['animal']: row for row in response.data['animals']}
+        self.assertEqual(by_animal[steer.pk]['adg'], 1.0)
+        self.assertEqual(by_animal[steer.pk]['records'], 3)
+        self.assertEqual(by_animal[steer.pk]['days'], 20.0)
+        self.assertEqual((by_animal[steer.pk]['first_weight'], by_animal[steer.pk]['last_weight']), (100.0, 120.0))
+        self.assertEqual(by_animal[heifer.pk]['adg'], 0.5)
+        self.assertEqual(response.data['herd']['count'], 2)
+        self.assertEqual(response.data['herd']['mean'], 0.75)
+
+        # ?until= keeps the first two readings: (112 - 100) / 10
+        response = self.client.get(reverse('animals:weightrecord-adg'), {'until': '2025-01-11T00:00:00Z', 'sex': 'Male'})
+        self.assertEqual([row['adg'] for row in response.data['animals']], [1.2])
+
+    def test_percentiles(self):
+        for weight, breed in ((100, 'Zebu'), (200, 'Zebu'), (300, 'Zebu'), (400, 'Boran')):
+            Animal.objects.create(name='Cow', sex='Female', breed=breed, year_of_birth=2020, weight=weight)
+        response = self.client.get(reverse('animals:weightrecord-percentiles'), {'group_by': 'breed'})
+        self.assertEqual(response.status_code, 200)
+        groups = {group['group']: group for group in response.data['groups']}
+        self.assertEqual(groups['Boran']['count'], 1)
+        zebu = groups['Zebu']
+        self.assertEqual((zebu['count'], zebu['mean'], zebu['p10'], zebu['p50'], zebu['p90']), (3, 200.0, 120.0, 200.0, 280.0))
+
+        response = self.client.get(reverse('animals:weightrecord-percentiles'), {'group_by': 'cohort', 'cohort': 2020})
+        self.assertEqual([(group['group'], group['count']) for group in response.data['groups']], [(2020, 4)])
+
+    def test_growth_curve(self):
+        calf = Animal.objects.create(name='Calf', sex='Female', breed='Zebu', year_of_birth=2024)
+        self.weigh(calf, (0, 40), (10, 45))
+        response = self.client.get(reverse('animals:weightrecord-growth-curve'), {'animal': calf.pk})
+        self.assertEqual(response.data['adg'], 0.5)
+        self.assertEqual([point['weight'] for point in response.data['points']], [40.0, 45.0])
@@ -4,6 +4,8 @@ from . import views
 
 router = DefaultRouter()
 router.register(r'animals', views.AnimalViewSet)
+router.register(r'weights', views.WeightRecordViewSet)
+router.register(r'health-events', views.HealthEventViewSet)
 
 app_name = 'animals'
 
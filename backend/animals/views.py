@@ -1,29 +1,88 @@
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import HttpResponse, Http404
-from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
-from .models import Animal
-from .serializers import AnimalSerializer, AnimalCreateSerializer, AnimalListSerializer
+from farm_management.conditional import ConditionalGetMixin
+from farm_management.fieldsets import SparseFieldsetMixin
+from farm_management.representations import ValuesListMixin
+from farm_management.search import FullTextSearchFilter
+
+from . import analytics, exporters, pedigree, qr, tags
+from .cache import PARENTS_CACHE_KEY, SCAN_CACHE_KEY, STATISTICS_CACHE_KEY, herd_cache_timeout
+from .importers import import_animals, import_weights, update_animals
+from .parsers import CSVParser, NDJSONParser, guess_row_format, read_rows
+from .renderers import (
+    CSVExportRenderer,
+    NDJSONExportRenderer,
+    PDFTagRenderer,
+    XLSXExportRenderer,
+    ZIPTagRenderer,
+)
+from .models import Animal, HealthEvent, WeightRecord, normalize_health_status
+from .serializers import (
+    AnimalSerializer,
+    AnimalCreateSerializer,
+    AnimalListSerializer,
+    HealthEventSerializer,
+    WeightRecordSerializer,
+)
 from permissions.permissions import (
-    CanManageAnimals, 
-    CanViewReports, 
-    IsAdminUser,
-    IsAdminOrFarmWorker
+    CanExportData,
+    CanManageAnimals,
+    CanViewReports,
+    HasCapability,
 )
 
 
-class AnimalViewSet(viewsets.ModelViewSet):
+def _health_status_param(value, name):
+    """The canonical status for a query parameter (``sick`` -> ``Sick``)"""
+    health_status, detail = normalize_health_status(value)
+    if health_status is None or detail:
+        choices = ', '.join(choice for choice, _ in Animal.HEALTH_STATUS_CHOICES)
+        raise ValidationError({name: f'Choose one of: {choices}.'})
+    return health_status
+
+
+def _group_filters(params, prefix=''):
+    """Filter kwargs for the ?breed=/?type=/?sex=/?cohort= group of animals (analytics)"""
+    filters = {}
+    for param, field in (('breed', 'breed'), ('type', 'type'), ('sex', 'sex')):
+        if params.get(param):
+            filters[f'{prefix}{field}'] = params[param]
+    if params.get('cohort'):
+        try:
+            filters[f'{prefix}year_of_birth'] = int(params['cohort'])
+        except ValueError:
+            raise ValidationError({'cohort': 'Must be a year of birth.'})
+    return filters
+
+
+class AnimalViewSet(ConditionalGetMixin, SparseFieldsetMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Animal.objects.all()
     permission_classes = [CanManageAnimals]  # Custom permission class
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['sex', 'breed', 'health_status', 'year_of_birth']
-    search_fields = ['animal_id', 'name', 'notes']
-    ordering_fields = ['created_at', 'animal_id', 'name', 'year_of_birth']
+    # ?search= runs against the full-text index (see AnimalsConfig.ready)
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
+    # health_status is filtered in get_queryset, which normalises the value
+    filterset_fields = ['sex', 'breed', 'year_of_birth']
+    ordering_fields = ['created_at', 'animal_id', 'name', 'year_of_birth', 'age', 'offspring_count']
     ordering = ['-created_at']
+    cursor_ordering = ('-created_at', '-id')
+    # qr_code_url only needs the primary key
+    sparse_field_sources = {'qr_code_url': []}
+    # What a QR scan returns
+    scan_fields = ('id', 'animal_id', 'name', 'type', 'sex', 'breed', 'year_of_birth', 'health_status', 'weight')
+    max_scan_batch = 500
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -33,21 +92,29 @@ class AnimalViewSet(viewsets.ModelViewSet):
         return AnimalSerializer
 
     def get_queryset(self):
-        queryset = Animal.objects.all()
+        # Age, offspring count and parent names come from SQL annotations so
+        # serializing a page does not cost extra queries per animal.
+        queryset = Animal.objects.with_summary(self._summary_fields())
+        if self.action in ('qr_code', 'tags'):
+            queryset = queryset.select_related('father', 'mother')
         
         # Custom filtering
         sex = self.request.query_params.get('sex', None)
         breed = self.request.query_params.get('breed', None)
+        type_ = self.request.query_params.get('type', None)
         min_age = self.request.query_params.get('min_age', None)
         max_age = self.request.query_params.get('max_age', None)
+        min_offspring = self.request.query_params.get('min_offspring', None)
         health_status = self.request.query_params.get('health_status', None)
         
         if sex:
             queryset = queryset.filter(sex=sex)
         if breed:
             queryset = queryset.filter(breed=breed)
+        if type_:
+            queryset = queryset.filter(type=type_)
         if health_status:
-            queryset = queryset.filter(health_status__icontains=health_status)
+            queryset = queryset.filter(health_status=_health_status_param(health_status, 'health_status'))
         
         # Age filtering (calculated field)
         if min_age or max_age:
@@ -61,78 +128,714 @@ class AnimalViewSet(viewsets.ModelViewSet):
             if max_age:
                 min_birth_year = current_year - int(max_age)
                 queryset = queryset.filter(year_of_birth__gte=min_birth_year)
+
+        if min_offspring:
+            try:
+                min_offspring = int(min_offspring)
+            except ValueError:
+                raise ValidationError({'min_offspring': 'Must be a whole number.'})
+            queryset = queryset.filter(offspring_count__gte=min_offspring)
         
         return queryset
 
+    def _summary_fields(self):
+        """The with_summary() annotations this request needs; None for all"""
+        fields = self.sparse_fields()
+        if fields is None:
+            return None
+        needed = set(fields)
+        if self.request.query_params.get('min_offspring'):
+            needed.add('offspring_count')
+        needed.update(name.strip().lstrip('-') for name in self.request.query_params.get('ordering', '').split(','))
+        return needed
+
+    def get_validator_queryset(self):
+        # Rows carry other animals' data (parent names, offspring counts), so
+        # any change in the herd invalidates every list and detail
+        return Animal.objects.all()
+
+    def get_validator_salt(self):
+        # age is computed from the current year
+        from datetime import datetime
+        return datetime.now().year
+
+    def perform_update(self, serializer):
+        previous_weight = serializer.instance.weight
+        super().perform_update(serializer)
+        reading = WeightRecord.reading_for(serializer.instance, previous_weight, self.request.user)
+        if reading is not None:
+            reading.save()
+        # Reload so the response carries fresh annotations (e.g. a new
+        # parent's name) rather than the values read before the update
+        serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
+
     @action(detail=True, methods=['get'])
     def qr_code(self, request, pk=None):
-        """Download QR code image for an animal"""
+        """
+        Download the QR code image for an animal.
+
+        ?image_format=png|svg and ?size=<pixels> (rounded down to one of
+        qr.SIZES) pick the variant. Images are rendered on first request and
+        cached by payload hash; clients sending If-None-Match get 304 while
+        the animal's data is unchanged.
+        """
+        animal = self.get_object()
+
+        image_format = request.query_params.get('image_format', 'png')
+        if image_format not in qr.IMAGE_FORMATS:
+            raise ValidationError({'image_format': f'Choose one of: {", ".join(qr.IMAGE_FORMATS)}.'})
+        size = self._qr_size_param()
+
+        data = qr.encode_payload(qr.qr_payload(animal))
+        digest = qr.payload_digest(data)
+        etag = qr.etag(digest, image_format, size)
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(
+                qr.cached_image(data, digest, image_format, size),
+                content_type=qr.IMAGE_FORMATS[image_format],
+            )
+            response['Content-Disposition'] = f'attachment; filename="{qr.filename(animal, image_format)}"'
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def _qr_size_param(self):
+        size = self.request.query_params.get('size')
+        if size is None:
+            return None
         try:
-            animal = self.get_object()
-            if animal.qr_code:
-                response = HttpResponse(animal.qr_code.read(), content_type='image/png')
-                response['Content-Disposition'] = f'attachment; filename="qr_{animal.animal_id.replace("/", "_")}.png"'
-                return response
-            else:
-                return Response({'error': 'QR code not available'}, status=status.HTTP_404_NOT_FOUND)
-        except Animal.DoesNotExist:
-            raise Http404
+            size = int(size)
+        except ValueError:
+            raise ValidationError({'size': 'Size must be a whole number of pixels.'})
+        if not qr.MIN_SIZE <= size <= qr.MAX_SIZE:
+            raise ValidationError({'size': f'Size must be between {qr.MIN_SIZE} and {qr.MAX_SIZE} pixels.'})
+        return qr.snap_size(size)
+
+    @action(detail=False, methods=['get'], permission_classes=[HasCapability('tags.use')],
+            renderer_classes=[PDFTagRenderer, ZIPTagRenderer])
+    def tags(self, request):
+        """
+        Stream printable QR tags for the (filtered) herd, or for ?ids=1,2,3.
+
+        ?format=pdf gives A4 label sheets, ?format=zip one PNG per animal
+        (sized with ?size= as for qr_code).
+        """
+        tag_format = request.accepted_renderer.format
+        size = self._qr_size_param()
+        queryset = self.filter_queryset(self.get_queryset())
+        ids = request.query_params.get('ids')
+        if ids:
+            try:
+                ids = [int(pk) for pk in ids.split(',') if pk.strip()]
+            except ValueError:
+                raise ValidationError({'ids': 'Give animal ids as a comma-separated list of numbers.'})
+            queryset = queryset.filter(pk__in=ids)
+
+        response = StreamingHttpResponse(
+            tags.stream_tags(tag_format, queryset.iterator(chunk_size=tags.BATCH_SIZE), size, queryset.count()),
+            content_type=request.accepted_renderer.media_type,
+        )
+        filename = f'qr-tags-{timezone.localdate().isoformat()}.{tag_format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False, methods=['get'], permission_classes=[HasCapability('tags.use')],
+            url_path=r'scan/(?P<animal_id>.+)')
+    def scan(self, request, animal_id=None):
+        """Look up a scanned tag by animal_id (e.g. scan/CFJ/012/)"""
+        found = self._scan([animal_id])
+        if not found:
+            return Response({'error': 'No animal with this animal_id.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(found[animal_id])
+
+    @action(detail=False, methods=['post'], url_path='scan', permission_classes=[HasCapability('tags.use')])
+    def scan_batch(self, request):
+        """Look up a pen's worth of scanned tags: {"animal_ids": [...]}"""
+        animal_ids = request.data.get('animal_ids') if isinstance(request.data, dict) else None
+        if not isinstance(animal_ids, list) or not all(isinstance(tag, str) for tag in animal_ids):
+            raise ValidationError({'animal_ids': 'Give a list of animal_id tags.'})
+        if len(animal_ids) > self.max_scan_batch:
+            raise ValidationError({'animal_ids': f'At most {self.max_scan_batch} tags per request.'})
+        animal_ids = list(dict.fromkeys(animal_ids))
+        found = self._scan(animal_ids)
+        return Response({
+            'animals': [found[tag] for tag in animal_ids if tag in found],
+            'missing': [tag for tag in animal_ids if tag not in found],
+        })
+
+    def _scan(self, animal_ids):
+        """Scan results by tag, from the cache where possible; tags not found are left out"""
+        keys = {tag: SCAN_CACHE_KEY.format(tag) for tag in animal_ids}
+        cached = cache.get_many(keys.values())
+        found = {tag: cached[key] for tag, key in keys.items() if key in cached}
+        missing = [tag for tag in animal_ids if tag not in found]
+        if missing:
+            loaded = {}
+            for row in Animal.objects.filter(animal_id__in=missing).values(*self.scan_fields):
+                if row['weight'] is not None:
+                    row['weight'] = str(row['weight'])
+                loaded[row['animal_id']] = row
+            # Signals drop an entry when its animal, weight or health status changes
+            cache.set_many({keys[tag]: row for tag, row in loaded.items()}, herd_cache_timeout())
+            found.update(loaded)
+        return found
 
     @action(detail=False, methods=['get'], permission_classes=[CanViewReports])
     def statistics(self, request):
         """Get animal statistics"""
-        total_animals = Animal.objects.count()
-        
+        stats = cache.get(STATISTICS_CACHE_KEY)
+        if stats is None:
+            stats = self._build_statistics()
+            cache.set(STATISTICS_CACHE_KEY, stats, herd_cache_timeout())
+        return Response(stats)
+
+    def _build_statistics(self):
+        # One grouped query; the handful of (sex, breed, type, health) groups
+        # (health_status is normalised, so these are a few dozen at most)
+        # are folded in Python instead of issuing a COUNT per category.
+        groups = (
+            Animal.objects.order_by()
+            .values('sex', 'breed', 'type', 'health_status')
+            .annotate(count=Count('id'), birth_years=Sum('year_of_birth'))
+        )
+
+        total_animals = 0
+        total_birth_years = 0
+        by_sex = {'male': 0, 'female': 0}
+        by_breed = {}
+        by_type = {}
+        by_health_status = {}
+        for group in groups:
+            count = group['count']
+            total_animals += count
+            total_birth_years += group['birth_years']
+            if group['sex'] in ('Male', 'Female'):
+                by_sex[group['sex'].lower()] += count
+            by_breed[group['breed']] = by_breed.get(group['breed'], 0) + count
+            by_type[group['type']] = by_type.get(group['type'], 0) + count
+            if group['health_status']:
+                by_health_status[group['health_status']] = by_health_status.get(group['health_status'], 0) + count
+
         stats = {
             'total_animals': total_animals,
-            'by_sex': {
-                'male': Animal.objects.filter(sex='Male').count(),
-                'female': Animal.objects.filter(sex='Female').count(),
+            'by_sex': by_sex,
+            # Keep the BREED_CHOICES / TYPE_CHOICES order
+            'by_breed': {breed: by_breed[breed] for breed, _ in Animal.BREED_CHOICES if breed in by_breed},
+            'by_type': {type_: by_type[type_] for type_, _ in Animal.TYPE_CHOICES if type_ in by_type},
+            'by_health_status': {
+                health: by_health_status[health]
+                for health, _ in Animal.HEALTH_STATUS_CHOICES if health in by_health_status
             },
-            'by_breed': {},
-            'by_health_status': {},
             'average_age': 0
         }
-        
-        # Breed statistics
-        for choice in Animal.BREED_CHOICES:
-            breed = choice[0]
-            count = Animal.objects.filter(breed=breed).count()
-            if count > 0:
-                stats['by_breed'][breed] = count
-        
-        # Health status statistics
-        health_statuses = Animal.objects.values_list('health_status', flat=True).distinct()
-        for status_name in health_statuses:
-            if status_name:
-                stats['by_health_status'][status_name] = Animal.objects.filter(health_status=status_name).count()
-        
-        # Average age calculation
+
         if total_animals > 0:
             from datetime import datetime
             current_year = datetime.now().year
-            animals = Animal.objects.all()
-            total_age = sum(current_year - animal.year_of_birth for animal in animals)
+            total_age = current_year * total_animals - total_birth_years
             stats['average_age'] = round(total_age / total_animals, 1)
-        
-        return Response(stats)
 
-    @action(detail=False, methods=['get'], permission_classes=[IsAdminOrFarmWorker])
-    def parents(self, request):
-        """Get list of potential parents (for creating new animals)"""
-        males = Animal.objects.filter(sex='Male').values('id', 'animal_id', 'name')
-        females = Animal.objects.filter(sex='Female').values('id', 'animal_id', 'name')
-        
+        return stats
+
+    def _depth_param(self, default=5):
+        raw = self.request.query_params.get('depth', default)
+        try:
+            depth = int(raw)
+        except (TypeError, ValueError):
+            raise ValidationError({'depth': 'Depth must be a whole number.'})
+        if not 1 <= depth <= pedigree.MAX_PEDIGREE_DEPTH:
+            raise ValidationError({'depth': f'Depth must be between 1 and {pedigree.MAX_PEDIGREE_DEPTH}.'})
+        return depth
+
+    @action(detail=True, methods=['get'])
+    def pedigree(self, request, pk=None):
+        """Get the ancestors of an animal up to ?depth= generations back"""
+        animal = self.get_object()
+        depth = self._depth_param()
+        rows = pedigree.ancestors(animal.pk, depth)
+        return Response({
+            'id': animal.pk,
+            'animal_id': animal.animal_id,
+            'depth': depth,
+            'inbreeding_coefficient': round(pedigree.inbreeding_coefficient(animal.pk), 6),
+            'ancestors': rows,
+        })
+
+    @action(detail=True, methods=['get'])
+    def descendants(self, request, pk=None):
+        """Get the descendants of an animal up to ?depth= generations down"""
+        animal = self.get_object()
+        depth = self._depth_param()
         return Response({
-            'fathers': list(males),
-            'mothers': list(females)
+            'id': animal.pk,
+            'animal_id': animal.animal_id,
+            'depth': depth,
+            'descendants': pedigree.descendants(animal.pk, depth),
         })
 
+    @action(detail=False, methods=['get'], permission_classes=[CanViewReports])
+    def inbreeding(self, request):
+        """Get Wright's inbreeding coefficient for every (filtered) animal"""
+        factor = pedigree.cached_relationship_factor()
+        coefficients = dict(zip(factor['ids'].tolist(), factor['inbreeding'][1:].tolist()))
+        animals = self.filter_queryset(self.get_queryset()).values_list('id', 'animal_id')
+        return Response([
+            {
+                'id': pk,
+                'animal_id': animal_id,
+                'inbreeding_coefficient': round(coefficients.get(pk, 0.0), 6),
+            }
+            for pk, animal_id in animals
+        ])
+
+    def _limit_param(self, default=5, maximum=100):
+        raw = self.request.query_params.get('limit', default)
+        if raw is None:
+            return None
+        try:
+            limit = int(raw)
+        except (TypeError, ValueError):
+            raise ValidationError({'limit': 'Limit must be a whole number.'})
+        if not 1 <= limit <= maximum:
+            raise ValidationError({'limit': f'Limit must be between 1 and {maximum}.'})
+        return limit
+
+    def _rank_sires(self, females, limit):
+        """
+        Candidate sires of the same type for each female, least related first.
+
+        ``females`` is a list of ``(id, animal_id, name, type)``; returns one
+        dict per female with its ``limit`` best matches.
+        """
+        sires = list(
+            Animal.objects.filter(sex='Male', type__in={female[3] for female in females})
+            .order_by('animal_id')
+            .values_list('id', 'animal_id', 'name', 'breed', 'type')
+        )
+        factor = pedigree.cached_relationship_factor()
+        plan = []
+        for type_ in sorted({female[3] for female in females}):
+            dams = [female for female in females if female[3] == type_]
+            candidates = [sire for sire in sires if sire[4] == type_]
+            expected, order = pedigree.rank_mates(factor, [dam[0] for dam in dams], [sire[0] for sire in candidates])
+            for row, dam in enumerate(dams):
+                plan.append({
+                    'id': dam[0],
+                    'animal_id': dam[1],
+                    'name': dam[2],
+                    'sires': [
+                        {
+                            'id': candidates[column][0],
+                            'animal_id': candidates[column][1],
+                            'name': candidates[column][2],
+                            'breed': candidates[column][3],
+                            'expected_inbreeding': round(float(expected[row, column]), 6),
+                        }
+                        for column in order[row, :limit].tolist()
+                    ],
+                })
+        return plan
+
+    @action(detail=True, methods=['get'], permission_classes=[HasCapability('breeding.view')])
+    def mates(self, request, pk=None):
+        """
+        Rank candidate sires for a female by the expected inbreeding of the
+        offspring (?limit=, default all); candidates are males of her type.
+        """
+        animal = self.get_object()
+        if animal.sex != 'Female':
+            raise ValidationError({'animal': 'Mates are ranked for females.'})
+        limit = self._limit_param(default=pedigree.MAX_MATES, maximum=pedigree.MAX_MATES)
+        return Response(self._rank_sires([(animal.pk, animal.animal_id, animal.name, animal.type)], limit)[0])
+
+    @action(detail=False, methods=['get'], permission_classes=[HasCapability('breeding.view')])
+    def breeding_plan(self, request):
+        """The ?limit= (default 5) least related sires for every (filtered) female"""
+        limit = self._limit_param()
+        females = list(
+            self.filter_queryset(self.get_queryset()).filter(sex='Female')
+            .order_by('animal_id')
+            .values_list('id', 'animal_id', 'name', 'type')
+        )
+        return Response(self._rank_sires(females, limit))
+
+    @action(detail=False, methods=['get'], permission_classes=[HasCapability('breeding.view')])
+    def parents(self, request):
+        """
+        Get potential parents (for the animal form): males and females old
+        enough to breed.
+
+        ?type= keeps one animal type; ?q= keeps animals whose tag or name
+        starts with it, at most ?limit= (default 20 with ?q=) of each sex.
+        """
+        type_ = request.query_params.get('type') or None
+        if type_ is not None and type_ not in Animal.SPECIES_CODES:
+            raise ValidationError({'type': f'Choose one of: {", ".join(Animal.SPECIES_CODES)}.'})
+        query = request.query_params.get('q', '').strip().lower()
+        limit = self._limit_param(default=20 if query else None, maximum=500)
+
+        current_year = timezone.now().year
+        parents = {'fathers': [], 'mothers': []}
+        for candidate in self._parent_candidates(type_):
+            if current_year - candidate['year_of_birth'] < Animal.MIN_BREEDING_AGE.get(candidate['type'], 1):
+                continue
+            if query and not (
+                candidate['animal_id'].lower().startswith(query) or candidate['name'].lower().startswith(query)
+            ):
+                continue
+            group = parents['fathers' if candidate['sex'] == 'Male' else 'mothers']
+            if limit is None or len(group) < limit:
+                group.append({key: candidate[key] for key in ('id', 'animal_id', 'name', 'type')})
+        return Response(parents)
+
+    def _parent_candidates(self, type_=None):
+        """
+        Every animal of ``type_`` (all types for None), cached until the herd
+        changes (in other workers, with a per-process cache, for up to
+        ``HERD_CACHE_TIMEOUT``).
+        """
+        key = PARENTS_CACHE_KEY.format(type_ or 'all')
+        candidates = cache.get(key)
+        if candidates is None:
+            queryset = Animal.objects.filter(sex__in=['Male', 'Female'])
+            if type_:
+                queryset = queryset.filter(type=type_)
+            candidates = list(
+                queryset.order_by('sex', 'animal_id')
+                .values('id', 'animal_id', 'name', 'sex', 'type', 'year_of_birth')
+            )
+            cache.set(key, candidates, herd_cache_timeout())
+        return candidates
+
+    @action(detail=False, methods=['post'], url_path='bulk',
+            parser_classes=[JSONParser, NDJSONParser, CSVParser, MultiPartParser])
+    def bulk(self, request):
+        """Import a whole herd from CSV, JSON or NDJSON (body or uploaded ``file``)"""
+        upload = request.FILES.get('file')
+        if upload is not None:
+            rows = read_rows(upload, guess_row_format(upload.name, upload.content_type))
+        elif isinstance(request.data, list):
+            rows = request.data
+        elif isinstance(request.data, dict) and isinstance(request.data.get('animals'), list):
+            rows = request.data['animals']
+        else:
+            raise ParseError('Send a list of animals, an "animals" list, or a "file" upload.')
+
+        report, ok = import_animals(rows)
+        return Response(report, status=status.HTTP_201_CREATED if ok else status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['patch'], url_path='batch', parser_classes=[JSONParser])
+    def batch(self, request):
+        """
+        Update many animals at once (a weighing or dipping day).
+
+        Send a list (or an "animals" list) of ``{"id" or "animal_id", ...fields}``;
+        nothing is changed unless every item is valid.
+        """
+        if isinstance(request.data, list):
+            rows = request.data
+        elif isinstance(request.data, dict) and isinstance(request.data.get('animals'), list):
+            rows = request.data['animals']
+        else:
+            raise ParseError('Send a list of updates or an "animals" list.')
+
+        report, ok = update_animals(rows, request.user)
+        return Response(report, status=status.HTTP_200_OK if ok else status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['get'], permission_classes=[CanExportData],
+            renderer_classes=[CSVExportRenderer, NDJSONExportRenderer, XLSXExportRenderer])
+    def export(self, request):
+        """
+        Stream the (filtered) herd as ?format=csv|ndjson|xlsx.
+
+        Takes the same filters, search and ordering as the list.
+        """
+        export_format = request.accepted_renderer.format
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            exporters.STREAMS[export_format](exporters.export_rows(queryset)),
+            content_type=request.accepted_renderer.media_type,
+        )
+        filename = f'herd-{timezone.localdate().isoformat()}.{export_format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         animal = serializer.save()
+        reading = WeightRecord.reading_for(animal, None, request.user)
+        if reading is not None:
+            reading.save()
+        animal = Animal.objects.with_summary().get(pk=animal.pk)
         
         # Return full animal data
         response_serializer = AnimalSerializer(animal, context={'request': request})
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+
+
+class WeightRecordViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
+    """Weight history; the analytics actions summarise it for reports"""
+
+    queryset = WeightRecord.objects.select_related('animal', 'recorded_by')
+    serializer_class = WeightRecordSerializer
+    permission_classes = [HasCapability('records.manage')]
+
+    def _datetime_param(self, name):
+        raw = self.request.query_params.get(name)
+        if not raw:
+            return None
+        try:
+            value = parse_datetime(raw) or (parse_datetime(f'{raw}T00:00:00') if len(raw) == 10 else None)
+        except ValueError:
+            # Well formed but out of range (2024-13-45)
+            value = None
+        if value is None:
+            raise ValidationError({name: 'Use an ISO 8601 date or date-time.'})
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+    def get_queryset(self):
+        queryset = WeightRecord.objects.select_related('animal', 'recorded_by')
+
+        animal = self.request.query_params.get('animal', None)
+        since = self._datetime_param('since')
+        until = self._datetime_param('until')
+
+        if animal:
+            try:
+                queryset = queryset.filter(animal_id=int(animal))
+            except ValueError:
+                raise ValidationError({'animal': 'Must be an animal id.'})
+        if since:
+            queryset = queryset.filter(measured_at__gte=since)
+        if until:
+            queryset = queryset.filter(measured_at__lte=until)
+
+        # Restrict to a group of animals (analytics)
+        return queryset.filter(**_group_filters(self.request.query_params, 'animal__'))
+
+    def perform_create(self, serializer):
+        serializer.save(recorded_by=self.request.user)
+
+    @action(detail=False, methods=['post'], url_path='bulk',
+            parser_classes=[JSONParser, NDJSONParser, CSVParser, MultiPartParser])
+    def bulk(self, request):
+        """
+        Record a weighing session from CSV, JSON or NDJSON (body or uploaded ``file``).
+
+        Rows carry ``animal_id`` (or ``animal``), ``weight`` and optionally
+        ``measured_at``/``notes``; ``?measured_at=`` sets the session time.
+        """
+        upload = request.FILES.get('file')
+        if upload is not None:
+            rows = read_rows(upload, guess_row_format(upload.name, upload.content_type))
+        elif isinstance(request.data, list):
+            rows = request.data
+        elif isinstance(request.data, dict) and isinstance(request.data.get('records'), list):
+            rows = request.data['records']
+        else:
+            raise ParseError('Send a list of readings, a "records" list, or a "file" upload.')
+
+        report, ok = import_weights(rows, self._datetime_param('measured_at'), request.user)
+        return Response(report, status=status.HTTP_201_CREATED if ok else status.HTTP_400_BAD_REQUEST)
+
+    def _gains(self):
+        animals, days, weights = analytics.load_records(self.get_queryset())
+        return analytics.daily_gain(animals, days, weights)
+
+    @staticmethod
+    def _round(value, digits=3):
+        return None if value is None or value != value else round(float(value), digits)
+
+    @action(detail=False, methods=['get'], permission_classes=[CanViewReports])
+    def adg(self, request):
+        """Average daily gain (kg/day) per animal and for the herd, over ?since=/?until="""
+        gains = self._gains()
+        tags = dict(Animal.objects.filter(pk__in=gains['animal'].tolist()).values_list('id', 'animal_id'))
+        return Response({
+            'herd': {
+                key: self._round(value) if key != 'count' else value
+                for key, value in analytics.summarize(gains['adg']).items()
+            },
+            'animals': [
+                {
+                    'animal': int(pk),
+                    'animal_id': tags.get(int(pk)),
+                    'records': int(records),
+                    'first_weight': self._round(first_weight, 2),
+                    'last_weight': self._round(last_weight, 2),
+                    'days': self._round(last_day - first_day, 1),
+                    'adg': self._round(adg),
+                }
+                for pk, records, first_day, last_day, first_weight, last_weight, adg in zip(
+                    gains['animal'], gains['records'], gains['first_day'], gains['last_day'],
+                    gains['first_weight'], gains['last_weight'], gains['adg'],
+                )
+            ],
+        })
+
+    @action(detail=False, methods=['get'], permission_classes=[CanViewReports])
+    def growth_curve(self, request):
+        """
+        Weight against age.
+
+        With ?animal= the animal's readings; otherwise the (filtered) group's
+        readings binned by age (?bin_days=, default a month) with percentiles.
+        """
+        records = self.get_queryset()
+        if request.query_params.get('animal'):
+            animals, days, weights = analytics.load_records(records)
+            gains = analytics.daily_gain(animals, days, weights)
+            return Response({
+                'animal': int(request.query_params['animal']),
+                'adg': self._round(gains['adg'][0]) if len(gains['adg']) else None,
+                'points': [
+                    {'measured_at': analytics.day_to_datetime(day), 'weight': self._round(weight, 2)}
+                    for day, weight in zip(days, weights)
+                ],
+            })
+
+        try:
+            bin_days = float(request.query_params.get('bin_days', analytics.DAYS_PER_MONTH))
+        except ValueError:
+            raise ValidationError({'bin_days': 'Must be a number of days.'})
+        if bin_days < 1:
+            raise ValidationError({'bin_days': 'Must be at least 1 day.'})
+
+        animals, days, weights = analytics.load_records(records)
+        births = {
+            pk: analytics.birth_day(year)
+            for pk, year in Animal.objects.filter(pk__in=set(animals.tolist())).values_list('id', 'year_of_birth')
+        }
+        curve = analytics.growth_curve(animals, days, weights, births, bin_days)
+        return Response([
+            {key: self._round(value, 2) if key not in ('age_days', 'count') else value for key, value in point.items()}
+            for point in curve
+        ])
+
+    @action(detail=False, methods=['get'], permission_classes=[CanViewReports])
+    def percentiles(self, request):
+        """
+        Percentiles of the latest weight (?metric=weight) or of ADG (?metric=adg)
+        per ?group_by=breed|cohort|type.
+        """
+        group_fields = {'breed': 'breed', 'cohort': 'year_of_birth', 'type': 'type'}
+        group_by = request.query_params.get('group_by', 'breed')
+        metric = request.query_params.get('metric', 'weight')
+        if group_by not in group_fields:
+            raise ValidationError({'group_by': f'Choose one of: {", ".join(group_fields)}.'})
+        if metric not in ('weight', 'adg'):
+            raise ValidationError({'metric': 'Choose one of: weight, adg.'})
+
+        if metric == 'adg':
+            gains = self._gains()
+            groups = dict(
+                Animal.objects.filter(pk__in=gains['animal'].tolist()).values_list('id', group_fields[group_by])
+            )
+            keys = [groups[pk] for pk in gains['animal'].tolist()]
+            values = gains['adg']
+        else:
+            # Animal.weight mirrors the latest reading
+            animals = Animal.objects.filter(weight__isnull=False, **_group_filters(request.query_params))
+            rows = list(animals.values_list(group_fields[group_by], 'weight'))
+            keys = [key for key, _ in rows]
+            values = [weight for _, weight in rows]
+
+        digits = 3 if metric == 'adg' else 2
+        return Response({
+            'metric': metric,
+            'group_by': group_by,
+            'groups': [
+                dict({'group': key}, **{
+                    name: self._round(value, digits) if name != 'count' else value
+                    for name, value in summary.items()
+                })
+                for key, summary in analytics.group_summaries(keys, values)
+            ],
+        })
+
+
+class HealthEventViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
+    """Diagnoses and treatments; ``incidence`` counts them per week or month"""
+
+    queryset = HealthEvent.objects.select_related('animal', 'recorded_by')
+    serializer_class = HealthEventSerializer
+    permission_classes = [HasCapability('records.manage')]
+
+    INCIDENCE_PERIODS = {
+        'week': TruncWeek,
+        'month': TruncMonth,
+    }
+
+    def _date_param(self, name):
+        raw = self.request.query_params.get(name)
+        if not raw:
+            return None
+        try:
+            value = parse_date(raw)
+        except ValueError:
+            value = None
+        if value is None:
+            raise ValidationError({name: 'Use an ISO 8601 date (YYYY-MM-DD).'})
+        return value
+
+    def get_queryset(self):
+        queryset = HealthEvent.objects.select_related('animal', 'recorded_by')
+
+        animal = self.request.query_params.get('animal', None)
+        health_status = self.request.query_params.get('status', None)
+        diagnosis = self.request.query_params.get('diagnosis', None)
+        since = self._date_param('since')
+        until = self._date_param('until')
+
+        if animal:
+            try:
+                queryset = queryset.filter(animal_id=int(animal))
+            except ValueError:
+                raise ValidationError({'animal': 'Must be an animal id.'})
+        if health_status:
+            queryset = queryset.filter(status=_health_status_param(health_status, 'status'))
+        if diagnosis:
+            queryset = queryset.filter(diagnosis__icontains=diagnosis)
+        if since:
+            queryset = queryset.filter(occurred_on__gte=since)
+        if until:
+            queryset = queryset.filter(occurred_on__lte=until)
+
+        return queryset.filter(**_group_filters(self.request.query_params, 'animal__'))
+
+    def perform_create(self, serializer):
+        serializer.save(recorded_by=self.request.user)
+
+    @action(detail=False, methods=['get'], permission_classes=[CanViewReports])
+    def incidence(self, request):
+        """
+        Events per ?period=week|month (default week), split by status.
+
+        Takes the list filters (?since=, ?status=, ?breed=, ...) and runs as
+        one grouped query. ``animals`` counts distinct animals per status.
+        """
+        period = request.query_params.get('period', 'week')
+        if period not in self.INCIDENCE_PERIODS:
+            raise ValidationError({'period': f'Choose one of: {", ".join(self.INCIDENCE_PERIODS)}.'})
+
+        groups = (
+            self.get_queryset()
+            .order_by()
+            .annotate(period_start=self.INCIDENCE_PERIODS[period]('occurred_on'))
+            .values('period_start', 'status')
+            .annotate(events=Count('id'), animals=Count('animal', distinct=True))
+            .order_by('period_start', 'status')
+        )
+
+        periods = []
+        for group in groups:
+            if not periods or periods[-1]['period_start'] != group['period_start']:
+                periods.append({'period_start': group['period_start'], 'events': 0, 'by_status': {}})
+            periods[-1]['events'] += group['events']
+            periods[-1]['by_status'][group['status']] = {'events': group['events'], 'animals': group['animals']}
+        return Response({'period': period, 'periods': periods})
@@ -0,0 +1,78 @@
+"""
+Conditional GET for list and detail endpoints.
+
+The validator is one aggregate query, ``COUNT(*)`` and ``MAX(updated_at)``,
+so a client whose copy is still current gets ``304 Not Modified`` before
+anything is fetched or serialised. The count catches deletions, which
+leave no newer ``updated_at`` behind.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """
+    ETag (and, for details, Last-Modified) support for a ``ModelViewSet``.
+
+    Lists are validated against the filtered queryset and details against
+    their row; override ``get_validator_queryset()`` when a response also
+    depends on other rows. The ETag covers the full URL (filters, page,
+    cursor) and the negotiated media type.
+    """
+
+    last_modified_field = 'updated_at'
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
+
+    def get_validator_queryset(self):
+        """Rows whose changes should change the response"""
+        if self.action == 'list':
+            return self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return self.get_queryset().filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+    def get_validator_salt(self):
+        """Anything else the response depends on (e.g. the current year)"""
+        return ''
+
+    def get_validator(self):
+        """``(count, last_modified)`` of ``get_validator_queryset()``, in one query"""
+        aggregates = self.get_validator_queryset().order_by().aggregate(
+            count=Count('pk'),
+            last_modified=Max(self.last_modified_field),
+        )
+        return aggregates['count'], aggregates['last_modified']
+
+    def _conditional(self, view, request, *args, **kwargs):
+        count, last_modified = self.get_validator()
+        if self.action != 'list' and not count:
+            return view(request, *args, **kwargs)  # the usual 404
+
+        validator = '|'.join(str(part) for part in (
+            request.build_absolute_uri(),
+            request.accepted_media_type,
+            count,
+            last_modified.isoformat() if last_modified else '',
+            self.get_validator_salt(),
+        ))
+        etag = f'W/"{hashlib.sha256(validator.encode("utf-8")).hexdigest()[:32]}"'
+        # If-Modified-Since alone cannot see a deleted row, so lists only
+        # offer the ETag
+        timestamp = int(last_modified.timestamp()) if last_modified and self.action != 'list' else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,132 @@
+"""
+Sparse fieldsets: ``?fields=id,animal_id,name`` or ``?omit=notes``.
+
+Unrequested fields are dropped from the serializer and, where the field
+maps onto a model column, from the ``SELECT`` through ``.only()``. Views
+whose querysets add joins or annotations can read ``sparse_fields()`` to
+leave out the ones nobody asked for.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+class SparseFieldsetMixin:
+    """
+    ``?fields=`` / ``?omit=`` support for a ``GenericAPIView``.
+
+    Applies to ``sparse_actions`` only, so writes always load and return
+    the full object. ``sparse_field_sources`` lists the columns a computed
+    field needs (e.g. ``{'qr_code_url': ['id']}``); without an entry a
+    computed field loads every column.
+    """
+
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+    sparse_actions = ('list', 'retrieve')
+    sparse_field_sources = {}
+
+    def _field_list(self, param):
+        raw = self.request.query_params.get(param, '')
+        return [name.strip() for name in raw.split(',') if name.strip()]
+
+    def sparse_fields(self):
+        """Names of the serializer fields to return, in serializer order; ``None`` for all"""
+        if '_sparse_fields' in self.__dict__:
+            return self._sparse_fields
+        self._sparse_fields = None
+        if getattr(self, 'action', None) not in self.sparse_actions or self.request is None:
+            return None
+        requested = self._field_list(self.fields_query_param)
+        omitted = self._field_list(self.omit_query_param)
+        if not requested and not omitted:
+            return None
+
+        available = list(self._all_serializer_fields())
+        for param, names in ((self.fields_query_param, requested), (self.omit_query_param, omitted)):
+            unknown = [name for name in names if name not in available]
+            if unknown:
+                raise ValidationError({
+                    param: f'Unknown field(s): {", ".join(unknown)}. Choose from: {", ".join(available)}.'
+                })
+        self._sparse_fields = [
+            name for name in available
+            if (not requested or name in requested) and name not in omitted
+        ]
+        return self._sparse_fields
+
+    def _all_serializer_fields(self):
+        if '_serializer_fields' not in self.__dict__:
+            self._serializer_fields = self.get_serializer_class()(context=self.get_serializer_context()).fields
+        return self._serializer_fields
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        keep = self.sparse_fields()
+        if keep is not None:
+            fields = getattr(serializer, 'child', serializer).fields
+            for name in list(fields):
+                if name not in keep:
+                    fields.pop(name)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        keep = self.sparse_fields()
+        if keep is None:
+            return queryset
+        columns = self._sparse_columns(queryset, keep)
+        if columns is None:
+            return queryset
+        select_related = queryset.query.select_related
+        if isinstance(select_related, dict):
+            # Drop the joins no requested field reads
+            joined = {column.split('__')[0] for column in columns if '__' in column}
+            relations = [
+                relation for relation in _select_related_paths(select_related)
+                if relation.split('__')[0] in joined
+            ]
+            queryset = queryset.select_related(None)
+            if relations:
+                queryset = queryset.select_related(*relations)
+        return queryset.only(*columns)
+
+    def _sparse_columns(self, queryset, keep):
+        """Columns for ``.only()``, or ``None`` when a field's needs are unknown"""
+        opts = queryset.model._meta
+        fields = self._all_serializer_fields()
+        select_related = queryset.query.select_related
+        columns = {opts.pk.name}
+        # Keyset pagination reads the cursor position off each row
+        columns.update(name.lstrip('-') for name in getattr(self, 'cursor_ordering', None) or ())
+        for name in keep:
+            if name in self.sparse_field_sources:
+                columns.update(self.sparse_field_sources[name])
+                continue
+            field = fields[name]
+            if isinstance(field, serializers.SerializerMethodField) or field.source == '*':
+                return None
+            path = field.source_attrs
+            if path[0] in queryset.query.annotations:
+                continue
+            try:
+                model_field = opts.get_field(path[0])
+            except FieldDoesNotExist:
+                return None  # a property; it may read any column
+            if not model_field.concrete:
+                return None
+            if len(path) > 1 and isinstance(select_related, dict) and path[0] in select_related:
+                columns.add('__'.join(path))
+            else:
+                columns.add(path[0])
+        return columns
+
+
+def _select_related_paths(tree, prefix=''):
+    """``{'animal': {'father': {}}}`` -> ``['animal__father']``"""
+    paths = []
+    for name, children in tree.items():
+        path = f'{prefix}{name}'
+        nested = _select_related_paths(children, f'{path}__')
+        paths.extend(nested or [path])
+    return paths
@@ -0,0 +1,132 @@
+import base64
+import json
+from functools import reduce
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page numbers by default, keyset (cursor) pages on request.
+
+    Views that set ``cursor_ordering`` (a unique ordering such as
+    ``('-created_at', '-id')``) switch to keyset mode when the request
+    carries ``?cursor=`` (empty for the first page). Keyset pages are
+    fetched with ``WHERE (created_at, id) < (...)`` instead of ``COUNT(*)``
+    plus ``OFFSET``, so deep pages cost the same as the first one and do
+    not shift while rows are being inserted. ``?ordering=`` is ignored in
+    keyset mode.
+    """
+
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.ordering = getattr(view, 'cursor_ordering', None)
+        self.keyset = bool(self.ordering) and self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        ordering = [self._flip(field) for field in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self._after(position, ordering))
+            except (DjangoValidationError, ValueError, TypeError):
+                # Decodes, but holds values the ordering columns cannot take
+                raise NotFound('Invalid cursor')
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.first_position = self._position(rows[0]) if rows else position
+        self.last_position = self._position(rows[-1]) if rows else position
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return self._link(self.last_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous:
+            return None
+        return self._link(self.first_position, reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            cursor = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            position, reverse = cursor['p'], bool(cursor.get('r'))
+        except (ValueError, TypeError, KeyError, UnicodeEncodeError):
+            raise NotFound('Invalid cursor')
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound('Invalid cursor')
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        cursor = {'p': position}
+        if reverse:
+            cursor['r'] = 1
+        raw = json.dumps(cursor, separators=(',', ':'), default=str)
+        return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii').rstrip('=')
+
+    def _link(self, position, reverse):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
+
+    def _position(self, row):
+        position = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            value = row[name] if isinstance(row, dict) else getattr(row, name)
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return position
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _after(position, ordering):
+        """Rows strictly after ``position`` in ``ordering`` (a row-value comparison)"""
+        clauses = []
+        for depth, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {other.lstrip('-'): value for other, value in zip(ordering[:depth], position)}
+            clauses.append(Q(**equal, **{f'{name}__{lookup}': position[depth]}))
+        return reduce(lambda left, right: left | right, clauses)
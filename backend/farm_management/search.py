@@ -0,0 +1,226 @@
+"""
+Full-text search for models registered with ``register()``.
+
+PostgreSQL keeps a generated ``search_vector`` tsvector column with a GIN
+index on the model's table; it is maintained by the database itself.
+SQLite (development) keeps an FTS5 shadow table, ``<table>_fts``, whose
+rowid is the model's primary key. It is updated from ``post_save`` /
+``post_delete`` signals, so code that writes with ``bulk_create`` or
+``QuerySet.update()`` must call ``reindex()`` afterwards.
+
+Other databases fall back to ``icontains`` lookups.
+
+Each whitespace-separated search term matches as a prefix phrase:
+``CMJ/01`` finds ``CMJ/012`` and ``vacc`` finds "vaccinated". All terms
+must match; results are ordered by relevance unless ``?ordering=`` is given.
+"""
+import re
+from functools import reduce
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+
+SEARCH_CONFIG = 'simple'
+
+VECTOR_COLUMN = 'search_vector'
+
+# ts_rank's default weights for A/B/C/D, reused as bm25 column weights
+WEIGHTS = {'A': 1.0, 'B': 0.4, 'C': 0.2, 'D': 0.1}
+
+_registry = {}
+
+
+def register(model, fields):
+    """
+    Index ``fields`` of ``model``; ``fields`` maps a field name to its weight (A-D).
+
+    Call from ``AppConfig.ready()``. The index itself is created by a
+    migration using ``create_index()`` with the same fields.
+    """
+    _registry[model] = dict(fields)
+    post_save.connect(_index_instance, sender=model, dispatch_uid=f'search-index-{model._meta.label}')
+    post_delete.connect(_unindex_instance, sender=model, dispatch_uid=f'search-unindex-{model._meta.label}')
+
+
+def indexed_fields(model):
+    """Names of the fields ``model`` is searched on"""
+    return list(_registry[model])
+
+
+def fts_table(table):
+    return f'{table}_fts'
+
+
+def _quote(connection, name):
+    return connection.ops.quote_name(name)
+
+
+def create_index(schema_editor, table, fields):
+    """Create the search index for ``table``; used by migrations"""
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        document = ' || '.join(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', translate(coalesce({_quote(connection, field)}, ''), '/', ' ')), '{weight}')"
+            for field, weight in fields.items()
+        )
+        schema_editor.execute(
+            f'ALTER TABLE {_quote(connection, table)} ADD COLUMN {VECTOR_COLUMN} tsvector '
+            f'GENERATED ALWAYS AS ({document}) STORED'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX {_quote(connection, table + "_search_idx")} '
+            f'ON {_quote(connection, table)} USING GIN ({VECTOR_COLUMN})'
+        )
+    elif connection.vendor == 'sqlite':
+        columns = ', '.join(_quote(connection, field) for field in fields)
+        schema_editor.execute(f'CREATE VIRTUAL TABLE {_quote(connection, fts_table(table))} USING fts5({columns})')
+        schema_editor.execute(
+            f'INSERT INTO {_quote(connection, fts_table(table))} (rowid, {columns}) '
+            f'SELECT id, {columns} FROM {_quote(connection, table)}'
+        )
+
+
+def drop_index(schema_editor, table):
+    """Reverse of ``create_index()``"""
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(f'ALTER TABLE {_quote(connection, table)} DROP COLUMN {VECTOR_COLUMN}')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {_quote(connection, fts_table(table))}')
+
+
+def reindex(model, pks=None, using='default', fields=None):
+    """
+    Refresh the SQLite shadow table for ``pks`` (or every row); a no-op elsewhere.
+
+    Migrations pass the indexed ``fields``, as their historical models
+    are not registered.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    table = model._meta.db_table
+    fts = _quote(connection, fts_table(table))
+    columns = ', '.join(_quote(connection, field) for field in (fields or _registry[model]))
+    with connection.cursor() as cursor:
+        if pks is None:
+            cursor.execute(f'DELETE FROM {fts}')
+            cursor.execute(f'INSERT INTO {fts} (rowid, {columns}) SELECT id, {columns} FROM {_quote(connection, table)}')
+            return
+        pks = list(pks)
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(pks), 500):
+            chunk = pks[start:start + 500]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'DELETE FROM {fts} WHERE rowid IN ({placeholders})', chunk)
+            cursor.execute(
+                f'INSERT INTO {fts} (rowid, {columns}) SELECT id, {columns} '
+                f'FROM {_quote(connection, table)} WHERE id IN ({placeholders})',
+                chunk,
+            )
+
+
+def _index_instance(sender, instance, using, **kwargs):
+    reindex(sender, [instance.pk], using=using)
+
+
+def _unindex_instance(sender, instance, using, **kwargs):
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {_quote(connection, fts_table(sender._meta.db_table))} WHERE rowid = %s',
+            [instance.pk],
+        )
+
+
+def parse_terms(text):
+    """Split a search string into terms, each a list of word tokens"""
+    terms = (re.findall(r'\w+', term.lower()) for term in text.split())
+    return [tokens for tokens in terms if tokens]
+
+
+def _tsquery(terms):
+    # Tokens of one term must be adjacent; the last one matches as a prefix
+    return ' & '.join(
+        ' <-> '.join(tokens[:-1] + [f'{tokens[-1]}:*'])
+        for tokens in terms
+    )
+
+
+def _fts5_query(terms):
+    return ' '.join('"{}"*'.format(' '.join(tokens)) for tokens in terms)
+
+
+def search(queryset, text):
+    """
+    Filter ``queryset`` to rows matching ``text``.
+
+    Returns ``(queryset, ranked)``; when ``ranked`` is true the rows carry a
+    ``search_rank`` annotation (higher is better).
+    """
+    terms = parse_terms(text)
+    if not terms:
+        return queryset, False
+    model = queryset.model
+    fields = _registry[model]
+    connection = connections[queryset.db]
+    table = _quote(connection, model._meta.db_table)
+
+    if connection.vendor == 'postgresql':
+        query = f"to_tsquery('{SEARCH_CONFIG}', %s)"
+        params = [_tsquery(terms)]
+        queryset = queryset.filter(
+            RawSQL(f'{table}.{VECTOR_COLUMN} @@ {query}', params, output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f'ts_rank({table}.{VECTOR_COLUMN}, {query})', params, output_field=FloatField())
+        )
+        return queryset, True
+
+    if connection.vendor == 'sqlite':
+        fts = _quote(connection, fts_table(model._meta.db_table))
+        params = [_fts5_query(terms)]
+        weights = ', '.join(str(WEIGHTS[weight]) for weight in fields.values())
+        queryset = queryset.filter(
+            RawSQL(f'{table}.id IN (SELECT rowid FROM {fts} WHERE {fts} MATCH %s)', params, output_field=BooleanField())
+        ).annotate(
+            # bm25() is lower-is-better
+            search_rank=RawSQL(
+                f'(SELECT -bm25({fts}, {weights}) FROM {fts} WHERE {fts} MATCH %s AND rowid = {table}.id)',
+                params,
+                output_field=FloatField(),
+            )
+        )
+        return queryset, True
+
+    for tokens in terms:
+        text = ' '.join(tokens)
+        queryset = queryset.filter(
+            reduce(lambda left, right: left | right, (Q(**{f'{field}__icontains': text}) for field in fields))
+        )
+    return queryset, False
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    ``?search=`` over the model's full-text index.
+
+    List it after ``OrderingFilter``: matches are ordered by relevance
+    unless the request asks for an explicit ``?ordering=``.
+    """
+
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '')
+        queryset, ranked = search(queryset, text)
+        if ranked and not request.query_params.get(api_settings.ORDERING_PARAM):
+            ordering = queryset.query.order_by or queryset.model._meta.ordering
+            queryset = queryset.order_by('-search_rank', *ordering)
+        return queryset
@@ -30,6 +30,7 @@ INSTALLED_APPS = [
     'farm_management',
     'gallery',
     'news',
+    'sync',
 ]
 
 MIDDLEWARE = [
@@ -112,13 +113,24 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Rendered QR code images, keyed by payload hash. Kept outside MEDIA_ROOT
+# because the payload includes private notes; served by the qr_code endpoint.
+QR_CACHE_ROOT = config('QR_CACHE_ROOT', default=str(BASE_DIR / 'qr_cache'))
+
+# Worker processes for rendering bulk QR tag sheets (0 renders in-process)
+QR_RENDER_WORKERS = config('QR_RENDER_WORKERS', default=min(4, os.cpu_count() or 1), cast=int)
+
+# Worker processes for hashing passwords in bulk staff imports (0 hashes in-process)
+PASSWORD_HASH_WORKERS = config('PASSWORD_HASH_WORKERS', default=min(4, os.cpu_count() or 1), cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # TokenAuthentication with the token, user and profile cached
+        'accounts.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -127,10 +139,35 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'farm_management.pagination.KeysetPagination',
     'PAGE_SIZE': 20
 }
 
+# Cache
+# Locmem is per-process; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. Redis or Memcached) when running several workers.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='sidai-enkop'),
+    }
+}
+
+# Seconds herd-wide results (statistics, parent picker lists, QR scans) stay
+# cached; they are also invalidated whenever an animal is saved or deleted,
+# but with locmem only in the worker that saved it, so the default is short
+# there (check --deploy).
+HERD_CACHE_TIMEOUT = config(
+    'HERD_CACHE_TIMEOUT',
+    default=60 if CACHES['default']['BACKEND'].endswith('LocMemCache') else 3600,
+    cast=int,
+)
+
+# Seconds a token's user and role stay cached for authentication; logouts,
+# user saves and role changes invalidate them straight away. That needs a
+# cache all workers share: set CACHE_BACKEND in production (check --deploy).
+AUTH_CACHE_TIMEOUT = config('AUTH_CACHE_TIMEOUT', default=300, cast=int)
+
 # CORS settings
 
 CORS_ALLOW_ALL_ORIGINS = True
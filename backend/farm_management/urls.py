@@ -10,4 +10,5 @@ urlpatterns = [
     path('api/', include('animals.urls')),
     path('api/gallery/', include('gallery.urls')),
     path('api/news/', include('news.urls')),
+    path('api/sync/', include('sync.urls')),
 ]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
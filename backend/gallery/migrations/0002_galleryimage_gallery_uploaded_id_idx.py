@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='galleryimage',
+            index=models.Index(fields=['-uploaded_at', '-id'], name='gallery_uploaded_id_idx'),
+        ),
+    ]
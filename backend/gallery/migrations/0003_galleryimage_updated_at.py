@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:31
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    """Existing rows were last changed when they were created, as far as we know"""
+    GalleryImage = apps.get_model('gallery', 'GalleryImage')
+    GalleryImage.objects.update(updated_at=F('uploaded_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery', '0002_galleryimage_gallery_uploaded_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='galleryimage',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
@@ -4,6 +4,12 @@ class GalleryImage(models.Model):
     image = models.ImageField(upload_to='gallery/')
     caption = models.CharField(max_length=255, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-uploaded_at', '-id'], name='gallery_uploaded_id_idx'),
+        ]
 
     def __str__(self):
         return self.caption or self.image.name
@@ -1,10 +1,13 @@
 from rest_framework import viewsets, permissions
+from farm_management.conditional import ConditionalGetMixin
+from farm_management.fieldsets import SparseFieldsetMixin
 from .models import GalleryImage
 from .serializers import GalleryImageSerializer
 
-class GalleryImageViewSet(viewsets.ModelViewSet):
+class GalleryImageViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = GalleryImage.objects.all().order_by('-uploaded_at')
     serializer_class = GalleryImageSerializer
+    cursor_ordering = ('-uploaded_at', '-id')
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
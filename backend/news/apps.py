@@ -3,3 +3,8 @@ from django.apps import AppConfig
 class NewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'news'
+
+    def ready(self):
+        from farm_management import search
+        from .models import News
+        search.register(News, {'title': 'A', 'description': 'C'})
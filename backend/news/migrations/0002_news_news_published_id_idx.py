@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['-published_at', '-id'], name='news_published_id_idx'),
+        ),
+    ]
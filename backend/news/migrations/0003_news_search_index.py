@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from farm_management import search
+
+
+SEARCH_FIELDS = {'title': 'A', 'description': 'C'}
+
+
+def create_search_index(apps, schema_editor):
+    search.create_index(schema_editor, 'news_news', SEARCH_FIELDS)
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop_index(schema_editor, 'news_news')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0002_news_news_published_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:31
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    """Existing rows were last changed when they were created, as far as we know"""
+    News = apps.get_model('news', 'News')
+    News.objects.update(updated_at=F('published_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0003_news_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
@@ -5,6 +5,12 @@ class News(models.Model):
     description = models.TextField()
     image = models.ImageField(upload_to='news/', blank=True, null=True)
     published_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-published_at', '-id'], name='news_published_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -1,10 +1,15 @@
 from rest_framework import viewsets, permissions
+from farm_management.conditional import ConditionalGetMixin
+from farm_management.fieldsets import SparseFieldsetMixin
+from farm_management.search import FullTextSearchFilter
 from .models import News
 from .serializers import NewsSerializer
 
-class NewsViewSet(viewsets.ModelViewSet):
+class NewsViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = News.objects.all().order_by('-published_at')
     serializer_class = NewsSerializer
+    cursor_ordering = ('-published_at', '-id')
+    filter_backends = [FullTextSearchFilter]
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -0,0 +1,117 @@
+"""
+What each role may do, as one table.
+
+A capability is ``'<resource>.<action>'``. ``ROLE_CAPABILITIES`` grants
+them per role and is compiled once, at import, into frozensets, so a
+check is a dict lookup and a set membership test. The DRF permission
+classes (``permissions.HasCapability``) and the ``permissions`` flags the
+frontend gets from ``/api/auth/profile/`` both read it; change access
+here, not in views.
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+from .models import UserProfile
+
+
+CAPABILITIES = {
+    'animals.view': 'See animal records',
+    'animals.create': 'Add animals',
+    'animals.update': 'Edit animal records',
+    'animals.delete': 'Remove animals',
+    'records.manage': 'Record weights and health events',
+    'breeding.view': 'Use the parent picker, mate suggestions and breeding plans',
+    'tags.use': 'Print tag sheets and scan tags',
+    'sync.upload': 'Upload edits made offline',
+    'reports.view': 'See statistics and reports',
+    'data.export': 'Export herd data',
+    'users.manage': 'Manage user accounts and roles',
+}
+
+ROLE_CAPABILITIES = {
+    'admin': set(CAPABILITIES),
+    'farm_worker': {
+        'animals.view', 'animals.update', 'records.manage', 'breeding.view', 'tags.use',
+        'sync.upload', 'reports.view',
+    },
+    'farm_accountant': {'animals.view', 'reports.view', 'data.export'},
+    # Older roles no view has ever honoured; listed so that is a decision
+    'manager': set(),
+    'staff': set(),
+    'worker': set(),
+    'guest': set(),
+}
+
+# The action a request method needs when a permission names only a resource
+METHOD_ACTIONS = {
+    'GET': 'view',
+    'HEAD': 'view',
+    'OPTIONS': 'view',
+    'POST': 'create',
+    'PUT': 'update',
+    'PATCH': 'update',
+    'DELETE': 'delete',
+}
+
+# The profile payload's flags (the frontend's names) -> capability
+PROFILE_FLAGS = {
+    'can_create_animals': 'animals.create',
+    'can_edit_animals': 'animals.update',
+    'can_delete_animals': 'animals.delete',
+    'can_view_reports': 'reports.view',
+    'can_manage_users': 'users.manage',
+}
+
+
+def _compile():
+    roles = {role for role, _ in UserProfile.ROLE_CHOICES}
+    if roles != set(ROLE_CAPABILITIES):
+        raise ImproperlyConfigured(
+            f'ROLE_CAPABILITIES must list exactly the roles in UserProfile.ROLE_CHOICES: {sorted(roles)}'
+        )
+    matrix = {}
+    for role, capabilities in ROLE_CAPABILITIES.items():
+        unknown = set(capabilities) - set(CAPABILITIES)
+        if unknown:
+            raise ImproperlyConfigured(f'Unknown capabilities for {role}: {sorted(unknown)}')
+        matrix[role] = frozenset(capabilities)
+    flags = {
+        role: {flag: capability in capabilities for flag, capability in PROFILE_FLAGS.items()}
+        for role, capabilities in matrix.items()
+    }
+    return matrix, flags
+
+
+_matrix, _flags = _compile()
+
+
+def check(capability):
+    """``capability`` itself, or ``ImproperlyConfigured`` if nothing grants it"""
+    if capability not in CAPABILITIES:
+        raise ImproperlyConfigured(f'Unknown capability {capability!r}')
+    return capability
+
+
+def role_of(user):
+    """``user``'s role, or ``None`` for anonymous users and users without a profile"""
+    if not user.is_authenticated:
+        return None
+    profile = getattr(user, 'userprofile', None)
+    return profile.role if profile is not None else None
+
+
+def role_allows(role, capability):
+    return capability in _matrix.get(role, ())
+
+
+def allows(user, capability):
+    return role_allows(role_of(user), capability)
+
+
+def capabilities_of(role):
+    """The sorted capabilities of ``role`` (none for unknown roles)"""
+    return sorted(_matrix.get(role, ()))
+
+
+def profile_flags(role):
+    """The ``permissions`` flags of ``role`` for the profile payload"""
+    return dict(_flags.get(role, _flags['guest']))
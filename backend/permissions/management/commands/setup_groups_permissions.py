@@ -35,7 +35,6 @@ class Command(BaseCommand):
         # Create custom permissions
         custom_permissions = [
             ('can_view_reports', 'Can view farm reports'),
-            ('can_export_data', 'Can export farm data'),
             ('can_manage_users', 'Can manage user accounts'),
             ('can_manage_finances', 'Can manage farm finances'),
         ]
@@ -48,6 +47,10 @@ class Command(BaseCommand):
             )
             if created:
                 self.stdout.write(self.style.SUCCESS(f'Created permission: {name}'))
+
+        # Exports are gated by the data.export capability (permissions.capabilities)
+        if Permission.objects.filter(codename='can_export_data', content_type=animal_ct).delete()[0]:
+            self.stdout.write('Removed the unused can_export_data permission')
         
         # Assign permissions to groups
         
@@ -75,7 +78,6 @@ class Command(BaseCommand):
             codename__in=[
                 'view_animal',
                 'can_view_reports',
-                'can_export_data',
                 'can_manage_finances',
             ],
             content_type=animal_ct
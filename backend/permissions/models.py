@@ -26,8 +26,24 @@ class UserProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # The role as last loaded or saved (None for unsaved profiles), so
+    # saves that leave it alone can skip the group sync
+    loaded_role = None
+
     def __str__(self):
         return f"{self.user.username} - {self.get_role_display()}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # After post_save, so its receivers can still compare the two
+        self.loaded_role = self.role
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'role' in field_names:
+            instance.loaded_role = instance.role
+        return instance
     
     @property
     def full_name(self):
@@ -1,129 +1,51 @@
 from rest_framework.permissions import BasePermission
-from django.contrib.auth.models import Permission
-from .models import UserProfile
 
+from . import capabilities
 
-class IsAdminUser(BasePermission):
-    """Permission class for Farm Administrators"""
-    
-    def has_permission(self, request, view):
-        return (
-            request.user.is_authenticated and 
-            hasattr(request.user, 'userprofile') and 
-            request.user.userprofile.is_admin
-        )
 
+class HasCapability(BasePermission):
+    """
+    Allow users whose role has a capability in ``capabilities.ROLE_CAPABILITIES``.
 
-class IsFarmWorker(BasePermission):
-    """Permission class for Farm Workers"""
-    
-    def has_permission(self, request, view):
-        return (
-            request.user.is_authenticated and 
-            hasattr(request.user, 'userprofile') and 
-            (request.user.userprofile.is_farm_worker or request.user.userprofile.is_admin)
-        )
+    ``HasCapability('animals.update')`` requires that capability;
+    ``HasCapability('animals')`` requires the action the request method
+    maps to (``GET`` -> ``animals.view``, ``POST`` -> ``animals.create``, ...).
+    Instances go straight into ``permission_classes``.
+    """
 
+    def __init__(self, capability):
+        if '.' in capability:
+            self.capability = capabilities.check(capability)
+            self.resource = None
+        else:
+            self.capability = None
+            self.resource = capability
+            for action in set(capabilities.METHOD_ACTIONS.values()):
+                capabilities.check(f'{capability}.{action}')
 
-class IsFarmAccountant(BasePermission):
-    """Permission class for Farm Accountants"""
-    
-    def has_permission(self, request, view):
-        return (
-            request.user.is_authenticated and 
-            hasattr(request.user, 'userprofile') and 
-            (request.user.userprofile.is_farm_accountant or request.user.userprofile.is_admin)
-        )
+    def __call__(self):
+        # DRF instantiates each entry of permission_classes
+        return self
 
+    def __repr__(self):
+        return f'HasCapability({self.capability or self.resource!r})'
 
-class IsAdminOrReadOnlyFarmWorker(BasePermission):
-    """
-    Admin can do everything, Farm Workers can only read
-    """
-    
-    def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-            
-        if not hasattr(request.user, 'userprofile'):
-            return False
-            
-        profile = request.user.userprofile
-        
-        # Admin has full access
-        if profile.is_admin:
-            return True
-            
-        # Farm workers can only read (GET, HEAD, OPTIONS)
-        if profile.is_farm_worker:
-            return request.method in ['GET', 'HEAD', 'OPTIONS']
-            
-        return False
-
+    def required(self, request):
+        if self.capability:
+            return self.capability
+        action = capabilities.METHOD_ACTIONS.get(request.method)
+        return f'{self.resource}.{action}' if action else None
 
-class IsAdminOrFarmWorker(BasePermission):
-    """
-    Admin and Farm Workers can access, others cannot
-    """
-    
     def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-            
-        if not hasattr(request.user, 'userprofile'):
-            return False
-            
-        profile = request.user.userprofile
-        return profile.is_admin or profile.is_farm_worker
+        capability = self.required(request)
+        return capability is not None and capabilities.allows(request.user, capability)
 
 
-class CanManageAnimals(BasePermission):
-    """
-    Custom permission for animal management
-    - Admin: Full CRUD access
-    - Farm Worker: Read and Update only (no create/delete)
-    """
-    
-    def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-            
-        if not hasattr(request.user, 'userprofile'):
-            return False
-            
-        profile = request.user.userprofile
-        
-        # Admin has full access
-        if profile.is_admin:
-            return True
-            
-        # Farm workers have limited access
-        if profile.is_farm_worker:
-            # Allow read operations
-            if request.method in ['GET', 'HEAD', 'OPTIONS']:
-                return True
-            # Allow updates but not create/delete
-            if request.method in ['PUT', 'PATCH']:
-                return True
-            # Deny create and delete
-            return False
-            
-        return False
+# Admin: full CRUD; Farm Worker: read and update; Farm Accountant: read
+CanManageAnimals = HasCapability('animals')
 
+CanViewReports = HasCapability('reports.view')
 
-class CanViewReports(BasePermission):
-    """
-    Permission to view reports and statistics
-    """
-    
-    def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-            
-        if not hasattr(request.user, 'userprofile'):
-            return False
-            
-        profile = request.user.userprofile
-        
-        # Admin and Farm Workers can view reports
-        return profile.is_admin or profile.is_farm_worker or profile.is_farm_accountant
+CanExportData = HasCapability('data.export')
+
+IsAdminUser = HasCapability('users.manage')
@@ -1,4 +1,5 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User, Group
 from .models import UserProfile
@@ -8,58 +9,70 @@ from .models import UserProfile
 def create_or_update_user_profile(sender, instance, created, **kwargs):
     """Automatically create UserProfile when User is created"""
     if created:
-        profile = UserProfile.objects.create(user=instance)
-        # Assign default role based on whether this is the first user (admin) or not
-        if User.objects.count() == 1:
-            profile.role = 'admin'
-        else:
-            profile.role = 'guest'
-        
-        profile.save()
+        # The first user becomes the admin, everyone else starts as a guest
+        role = 'guest' if User.objects.exclude(pk=instance.pk).exists() else 'admin'
+        UserProfile.objects.create(user=instance, role=role)
+
+
+# role -> the group its users belong to; other roles get no farm group
+ROLE_GROUPS = {
+    'admin': 'Farm Administrators',
+    'farm_worker': 'Farm Workers',
+    'farm_accountant': 'Farm Accountants',
+    'guest': 'Guest Users',
+}
+
+# Group name -> id, filled once per process (after the transaction that
+# read or created the groups commits, so a rollback cannot leave stale ids)
+_group_ids = {}
+
+
+def farm_group_ids():
+    """``{group name: id}`` for the farm groups, creating missing ones"""
+    if len(_group_ids) == len(ROLE_GROUPS):
+        return _group_ids
+    ids = dict(Group.objects.filter(name__in=ROLE_GROUPS.values()).values_list('name', 'id'))
+    for name in ROLE_GROUPS.values():
+        if name not in ids:
+            ids[name] = Group.objects.get_or_create(name=name)[0].pk
+    transaction.on_commit(lambda: _group_ids.update(ids))
+    return ids
+
+
+@receiver([post_save, post_delete], sender=Group)
+def forget_group_ids(sender, **kwargs):
+    _group_ids.clear()
 
 
 @receiver(post_save, sender=UserProfile)
 def update_user_groups(sender, instance, created, **kwargs):
-    """Update user groups when role changes"""
-    user = instance.user
-    
-    # Remove from all farm-related groups
-    farm_groups = Group.objects.filter(name__in=[
-        'Farm Administrators',
-        'Farm Workers', 
-        'Farm Accountants',
-        'Guest Users'
-    ])
-    user.groups.remove(*farm_groups)
-    
-    # Add to appropriate group based on role
-    group_mapping = {
-        'admin': 'Farm Administrators',
-        'farm_worker': 'Farm Workers',
-        'farm_accountant': 'Farm Accountants',
-        'guest': 'Guest Users',
-    }
-    
-    if instance.role in group_mapping:
-        group, _ = Group.objects.get_or_create(name=group_mapping[instance.role])
-        user.groups.add(group)
-        
-        # Set staff and superuser status for admins
-        needs_update = False
-        if instance.role == 'admin':
-            if not user.is_staff or not user.is_superuser:
-                user.is_staff = True
-                user.is_superuser = True
-                needs_update = True
-        else:
-            if user.is_staff or user.is_superuser:
-                user.is_staff = False
-                user.is_superuser = False
-                needs_update = True
-        
-        if needs_update:
-            # Use update to avoid triggering signals
-            User.objects.filter(pk=user.pk).update(
-                is_staff=user.is_staff,
-                is_superuser=user.is_superuser
-            )
+    """
+    Move the user to their role's group when the role changes.
+
+    Saves that leave the role alone (salary, tasks, ...) cost nothing
+    here. Only the membership rows that differ are written.
+    """
+    if not created and instance.role == instance.loaded_role:
+        return
+
+    group_ids = farm_group_ids()
+    target = group_ids.get(ROLE_GROUPS.get(instance.role))
+    memberships = User.groups.through.objects.filter(user_id=instance.user_id)
+    current = set(memberships.filter(group_id__in=group_ids.values()).values_list('group_id', flat=True))
+    stale = current - {target}
+    if stale:
+        memberships.filter(group_id__in=stale).delete()
+    if target is not None and target not in current:
+        memberships.create(user_id=instance.user_id, group_id=target)
+    if target is None:
+        return
+
+    # Set staff and superuser status for admins
+    is_admin = instance.role == 'admin'
+    # Use update to avoid triggering signals
+    User.objects.filter(pk=instance.user_id).exclude(is_staff=is_admin, is_superuser=is_admin).update(
+        is_staff=is_admin,
+        is_superuser=is_admin,
+    )
+    if UserProfile.user.is_cached(instance):
+        instance.user.is_staff = instance.user.is_superuser = is_admin
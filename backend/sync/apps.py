@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+
+
+class SyncConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'sync'
+
+    def ready(self):
+        from animals.models import Animal
+        from gallery.models import GalleryImage
+        from gallery.serializers import GalleryImageSerializer
+        from news.models import News
+        from news.serializers import NewsSerializer
+        from . import changelog
+        from .serializers import AnimalSyncSerializer
+        changelog.register(Animal, 'animals', AnimalSyncSerializer)
+        changelog.register(News, 'news', NewsSerializer)
+        changelog.register(GalleryImage, 'gallery', GalleryImageSerializer)
@@ -0,0 +1,96 @@
+"""
+Change log for offline sync of models registered with ``register()``.
+
+Every save or delete of a registered row replaces its ``Change`` entry
+with a new one, so ``Change.objects.filter(id__gt=token)`` is exactly the
+set of rows changed (or deleted: ``deleted=True``, the tombstone) since
+``token``. That is a primary-key range scan, whatever the size of the
+synced tables.
+
+Entries come from ``post_save`` / ``post_delete`` signals, so code that
+writes with ``bulk_create`` or ``QuerySet.update()`` must call
+``record()`` itself, as it does for ``search.reindex()``.
+
+On PostgreSQL, writers take a transaction-level advisory lock before
+logging, so entries commit in id order and a client can never skip over
+an id that was still uncommitted when it synced. SQLite serialises
+writers already.
+"""
+from django.db import connections, transaction
+from django.db.models import Max
+from django.db.models.signals import post_delete, post_save
+
+from .models import Change
+
+
+# pg_advisory_xact_lock() key; any constant unique to this lock
+LOCK_KEY = 0x5C0FFEE
+
+BATCH_SIZE = 500
+
+_registry = {}
+_names = {}
+
+
+def register(model, name, serializer_class):
+    """
+    Log changes to ``model`` under ``name``; ``serializer_class`` renders its rows for clients.
+
+    Call from ``AppConfig.ready()``.
+    """
+    _registry[name] = (model, serializer_class)
+    _names[model] = name
+    post_save.connect(_log_save, sender=model, dispatch_uid=f'sync-save-{model._meta.label}')
+    post_delete.connect(_log_delete, sender=model, dispatch_uid=f'sync-delete-{model._meta.label}')
+
+
+def registered():
+    """``{name: (model, serializer_class)}`` in registration order"""
+    return dict(_registry)
+
+
+def name_for(model):
+    return _names[model]
+
+
+def record(model, pks, deleted=False, using='default'):
+    """Log a change (or, with ``deleted``, a deletion) of the ``model`` rows ``pks``"""
+    pks = list(dict.fromkeys(pks))
+    if not pks:
+        return
+    name = _names[model]
+    # No savepoint: inside a larger transaction the entries stand or fall with it
+    with transaction.atomic(using=using, savepoint=False):
+        connection = connections[using]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [LOCK_KEY])
+        entries = Change.objects.using(using)
+        for start in range(0, len(pks), BATCH_SIZE):
+            chunk = pks[start:start + BATCH_SIZE]
+            entries.filter(model=name, object_id__in=chunk).delete()
+            entries.bulk_create([Change(model=name, object_id=pk, deleted=deleted) for pk in chunk])
+
+
+def current_token(using='default'):
+    """The token a client that has every change up to now would hold"""
+    return Change.objects.using(using).aggregate(token=Max('id'))['token'] or 0
+
+
+def changes_since(token, limit, using='default'):
+    """
+    Up to ``limit`` entries after ``token``, oldest first.
+
+    Returns ``(entries, more)``; ``more`` is true when there are further
+    entries past the last one returned.
+    """
+    entries = list(Change.objects.using(using).filter(id__gt=token).order_by('id')[:limit + 1])
+    return entries[:limit], len(entries) > limit
+
+
+def _log_save(sender, instance, using, **kwargs):
+    record(sender, [instance.pk], using=using)
+
+
+def _log_delete(sender, instance, using, **kwargs):
+    record(sender, [instance.pk], deleted=True, using=using)
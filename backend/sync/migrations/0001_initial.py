@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:43
+
+from django.db import migrations, models
+
+
+SYNCED_MODELS = [
+    ('animals', 'Animal', 'animals'),
+    ('news', 'News', 'news'),
+    ('gallery', 'GalleryImage', 'gallery'),
+]
+
+
+def log_existing_rows(apps, schema_editor):
+    """Give every existing row an entry, so a first sync (since=0) returns it"""
+    Change = apps.get_model('sync', 'Change')
+    for app_label, model_name, name in SYNCED_MODELS:
+        pks = apps.get_model(app_label, model_name).objects.order_by('pk').values_list('pk', flat=True)
+        Change.objects.bulk_create(
+            (Change(model=name, object_id=pk) for pk in pks.iterator(chunk_size=500)),
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('animals', '0010_animal_list_filter_indexes'),
+        ('gallery', '0003_galleryimage_updated_at'),
+        ('news', '0004_news_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(help_text='Registered name, e.g. animals', max_length=30)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'constraints': [models.UniqueConstraint(fields=('model', 'object_id'), name='sync_change_object_uniq')],
+            },
+        ),
+        migrations.RunPython(log_existing_rows, migrations.RunPython.noop),
+    ]
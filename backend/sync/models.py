@@ -0,0 +1,26 @@
+from django.db import models
+
+
+class Change(models.Model):
+    """
+    The latest change to one synced row (see ``sync.changelog``).
+
+    Each write replaces the row's entry with a new one, so the table holds
+    one entry per row ever synced and the ids only grow: the id is the
+    change token clients send back as ``?since=``.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=30, help_text="Registered name, e.g. animals")
+    object_id = models.PositiveBigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'object_id'], name='sync_change_object_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.id}: {'delete' if self.deleted else 'change'} {self.model} #{self.object_id}"
@@ -0,0 +1,48 @@
+from rest_framework import serializers
+
+from animals.serializers import AnimalSerializer
+
+
+class AnimalSyncSerializer(AnimalSerializer):
+    """
+    An animal's own columns.
+
+    Parent names, offspring counts and age change without the animal
+    being saved, so they would go stale on a device; it works them out
+    from the rows it already holds.
+    """
+
+    class Meta(AnimalSerializer.Meta):
+        fields = [
+            'id', 'animal_id', 'type', 'name', 'sex', 'breed', 'year_of_birth',
+            'father', 'mother', 'weight', 'health_status', 'notes', 'qr_code_url',
+            'created_at', 'updated_at'
+        ]
+
+
+class UploadChangeSerializer(serializers.Serializer):
+    """One queued offline edit"""
+
+    OPERATIONS = ['create', 'update', 'delete']
+
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    model = serializers.CharField()
+    id = serializers.IntegerField(required=False, min_value=1)
+    token = serializers.IntegerField(required=False, min_value=0)
+    force = serializers.BooleanField(default=False)
+    client_id = serializers.CharField(required=False, allow_blank=True, max_length=100)
+    data = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        if attrs['op'] != 'create':
+            if 'id' not in attrs:
+                raise serializers.ValidationError({'id': f"Required for {attrs['op']}."})
+            if 'token' not in attrs and not attrs['force']:
+                raise serializers.ValidationError({'token': 'Send the token of the last sync, or force.'})
+        return attrs
+
+
+class UploadSerializer(serializers.Serializer):
+    MAX_CHANGES = 500
+
+    changes = UploadChangeSerializer(many=True, allow_empty=False, max_length=MAX_CHANGES)
@@ -0,0 +1,89 @@
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from animals.models import Animal, HealthEvent
+from news.models import News
+
+
+class SyncTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_user('manager', password='pw-123456')
+        admin.userprofile.role = 'admin'
+        admin.userprofile.save()
+        worker = User.objects.create_user('herder', password='pw-123456')
+        worker.userprofile.role = 'farm_worker'
+        worker.userprofile.save()
+        cls.admin_id, cls.worker_id = admin.pk, worker.pk
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.get(pk=self.admin_id))
+        self.sire = Animal.objects.create(name='Sire', sex='Male', breed='Zebu', year_of_birth=2015)
+        self.dam = Animal.objects.create(name='Dam', sex='Female', breed='Zebu', year_of_birth=2016)
+        self.calf = Animal.objects.create(
+            name='Calf', sex='Female', breed='Zebu', year_of_birth=2022, father=self.sire, mother=self.dam,
+        )
+
+    def pull(self, since, **params):
+        response = self.client.get(reverse('sync:sync'), {'since': since, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_changes_and_tombstones(self):
+        first = self.pull(0)
+        self.assertEqual([row['name'] for row in first['changes']['animals']], ['Sire', 'Dam', 'Calf'])
+        self.assertFalse(first['more'])
+
+        News.objects.create(title='Dipping day', description='Friday')
+        HealthEvent.objects.create(animal=self.dam, status='Sick')  # an UPDATE, not a save()
+        sire_pk = self.sire.pk
+        self.sire.delete()  # clears the calf's father without saving it
+        with self.assertNumQueries(3):
+            delta = self.pull(first['token'])
+        self.assertEqual(delta['deleted']['animals'], [sire_pk])
+        self.assertEqual(
+            {row['name']: row['father'] for row in delta['changes']['animals']},
+            {'Dam': None, 'Calf': None},
+        )
+        self.assertEqual([row['title'] for row in delta['changes']['news']], ['Dipping day'])
+
+        self.assertEqual(self.pull(delta['token']), {
+            'token': delta['token'], 'more': False,
+            'changes': {'animals': [], 'news': [], 'gallery': []},
+            'deleted': {'animals': [], 'news': [], 'gallery': []},
+        })
+
+    def test_limit(self):
+        page = self.pull(0, limit=2)
+        self.assertTrue(page['more'])
+        self.assertEqual(len(page['changes']['animals']), 2)
+        rest = self.pull(page['token'], limit=2)
+        self.assertFalse(rest['more'])
+        self.assertEqual([row['name'] for row in rest['changes']['animals']], ['Calf'])
+
+    def test_upload(self):
+        token = self.pull(0)['token']
+        self.dam.notes = 'Changed in the office'
+        self.dam.save()
+        self.client.force_authenticate(User.objects.get(pk=self.worker_id))
+        response = self.client.post(reverse('sync:upload'), {'changes': [
+            {'op': 'update', 'model': 'animals', 'id': self.calf.pk, 'token': token,
+             'data': {'notes': 'Limping', 'weight': '88.5'}},
+            {'op': 'update', 'model': 'animals', 'id': self.dam.pk, 'token': token, 'data': {'notes': 'Calved'}},
+            {'op': 'update', 'model': 'animals', 'id': self.calf.pk, 'token': token, 'data': {'father': self.dam.pk}},
+            {'op': 'create', 'model': 'animals', 'client_id': 'new-1', 'data': {'name': 'Kid'}},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], ['applied', 'conflict', 'invalid', 'forbidden'])
+        self.assertEqual(results[1]['current']['notes'], 'Changed in the office')
+        self.assertIn('father', results[2]['errors'])
+        self.assertEqual(results[3]['client_id'], 'new-1')
+
+        self.calf.refresh_from_db()
+        self.assertEqual(self.calf.notes, 'Limping')
+        self.assertEqual([str(record.weight) for record in self.calf.weight_records.all()], ['88.50'])
+        self.dam.refresh_from_db()
+        self.assertEqual(self.dam.notes, 'Changed in the office')
+        self.assertEqual(response.data['token'], self.pull(token)['token'])
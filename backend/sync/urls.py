@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'sync'
+
+urlpatterns = [
+    path('', views.sync_view, name='sync'),
+    path('upload/', views.upload_view, name='upload'),
+]
@@ -0,0 +1,159 @@
+from django.db import IntegrityError, transaction
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from animals.models import Animal, WeightRecord
+from animals.serializers import AnimalCreateSerializer, AnimalSerializer
+from permissions import capabilities
+from permissions.permissions import CanManageAnimals, HasCapability
+
+from . import changelog
+from .models import Change
+from .serializers import AnimalSyncSerializer, UploadSerializer
+
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 2000
+
+# Models devices may edit offline:
+# name -> (model, create serializer, update serializer, serializer for results)
+UPLOADS = {
+    'animals': (Animal, AnimalCreateSerializer, AnimalSerializer, AnimalSyncSerializer),
+}
+
+
+def _int_param(request, name, default, minimum=0, maximum=None):
+    raw = request.query_params.get(name, default)
+    try:
+        value = int(raw)
+    except (TypeError, ValueError):
+        raise ValidationError({name: 'Must be a whole number.'})
+    if value < minimum or (maximum is not None and value > maximum):
+        bounds = f'between {minimum} and {maximum}' if maximum is not None else f'at least {minimum}'
+        raise ValidationError({name: f'Must be {bounds}.'})
+    return value
+
+
+@api_view(['GET'])
+@permission_classes([CanManageAnimals])
+def sync_view(request):
+    """
+    Rows changed since ``?since=`` (0 or absent for everything).
+
+    Returns the new token to send next time, the changed rows per model
+    and the ids deleted per model. ``more`` means ``?limit=`` cut the
+    batch short: ask again with the new token straight away.
+    """
+    since = _int_param(request, 'since', 0)
+    limit = _int_param(request, 'limit', DEFAULT_LIMIT, minimum=1, maximum=MAX_LIMIT)
+    entries, more = changelog.changes_since(since, limit)
+
+    registered = changelog.registered()
+    changed = {name: [] for name in registered}
+    deleted = {name: [] for name in registered}
+    for entry in entries:
+        (deleted if entry.deleted else changed)[entry.model].append(entry.object_id)
+
+    changes = {}
+    for name, (model, serializer_class) in registered.items():
+        rows = model.objects.filter(pk__in=changed[name]).order_by('pk') if changed[name] else []
+        changes[name] = serializer_class(rows, many=True, context={'request': request}).data
+
+    return Response({
+        'token': entries[-1].id if entries else since,
+        'more': more,
+        'changes': changes,
+        'deleted': deleted,
+    })
+
+
+@api_view(['POST'])
+@permission_classes([HasCapability('sync.upload')])
+def upload_view(request):
+    """
+    Apply a batch of offline edits in one transaction.
+
+    Each change is ``{"op": "create" | "update" | "delete", "model": "animals",
+    "id", "token", "data"}``; ``token`` is the one the device last synced
+    with. An update or delete of a row changed on the server since then is
+    not applied and comes back as a ``conflict`` with the server's copy
+    (``force: true`` applies it anyway). Results are listed in request order.
+    """
+    upload = UploadSerializer(data=request.data)
+    upload.is_valid(raise_exception=True)
+    items = upload.validated_data['changes']
+    for index, item in enumerate(items):
+        if item['model'] not in UPLOADS:
+            raise ValidationError({'changes': {index: {'model': f'Choose one of: {", ".join(UPLOADS)}.'}}})
+
+    results = []
+    with transaction.atomic():
+        # One query each for the rows and their latest change entries
+        ids = {}
+        for item in items:
+            if 'id' in item:
+                ids.setdefault(item['model'], set()).add(item['id'])
+        instances = {name: UPLOADS[name][0].objects.in_bulk(pks) for name, pks in ids.items()}
+        latest = {}
+        for name, pks in ids.items():
+            for entry in Change.objects.filter(model=name, object_id__in=pks):
+                latest[(name, entry.object_id)] = entry
+
+        for item in items:
+            result = {'op': item['op'], 'model': item['model']}
+            if item.get('client_id'):
+                result['client_id'] = item['client_id']
+            _, create_serializer, update_serializer, output_serializer = UPLOADS[item['model']]
+            context = {'request': request}
+
+            if not capabilities.allows(request.user, f"{item['model']}.{item['op']}"):
+                results.append({**result, 'status': 'forbidden', 'error': f"Your role cannot {item['op']} {item['model']}."})
+                continue
+
+            instance = None
+            if item['op'] != 'create':
+                result['id'] = item['id']
+                instance = instances[item['model']].get(item['id'])
+                entry = latest.get((item['model'], item['id']))
+                if not item['force'] and entry is not None and entry.id > item['token']:
+                    results.append({
+                        **result, 'status': 'conflict',
+                        'current': output_serializer(instance, context=context).data if instance else None,
+                    })
+                    continue
+                if instance is None:
+                    results.append({**result, 'status': 'not_found'})
+                    continue
+
+            if item['op'] == 'delete':
+                instance.delete()
+                instances[item['model']].pop(item['id'])
+                results.append({**result, 'status': 'applied'})
+                continue
+
+            if item['op'] == 'create':
+                serializer = create_serializer(data=item['data'], context=context)
+            else:
+                serializer = update_serializer(instance, data=item['data'], partial=True, context=context)
+            if not serializer.is_valid():
+                results.append({**result, 'status': 'invalid', 'errors': serializer.errors})
+                continue
+            previous_weight = getattr(instance, 'weight', None)
+            try:
+                with transaction.atomic():
+                    saved = serializer.save()
+                    # Offline weighings belong in the history like any other
+                    if isinstance(saved, Animal):
+                        reading = WeightRecord.reading_for(saved, previous_weight, request.user)
+                        if reading is not None:
+                            reading.save()
+            except IntegrityError as error:
+                results.append({**result, 'status': 'invalid', 'errors': {'non_field_errors': [str(error)]}})
+                continue
+            results.append({
+                **result, 'status': 'applied', 'id': saved.pk,
+                'row': output_serializer(saved, context=context).data,
+            })
+
+    return Response({'token': changelog.current_token(), 'results': results})
@@ -1,6 +1,6 @@
 'use client'
 
-import { useState } from 'react'
+import { useEffect, useState } from 'react'
 import { animalsAPI } from '@/lib/api'
 import { Button } from '@/components/ui/button'
 import { Card, CardContent } from '@/components/ui/card'
@@ -17,6 +17,29 @@ export function QRCodeViewer({ animalId, animalName, qrCodeUrl }: QRCodeViewerPr
   const [downloading, setDownloading] = useState(false)
   const [copied, setCopied] = useState(false)
   const [error, setError] = useState<string | null>(null)
+  const [imageUrl, setImageUrl] = useState<string | null>(null)
+
+  // The QR endpoint needs the auth token, so load the image through the API client
+  useEffect(() => {
+    if (!qrCodeUrl) return
+
+    let objectUrl: string | null = null
+    let cancelled = false
+    animalsAPI.downloadQRCode(animalId)
+      .then((blob) => {
+        if (cancelled) return
+        objectUrl = window.URL.createObjectURL(blob)
+        setImageUrl(objectUrl)
+      })
+      .catch(() => {
+        if (!cancelled) setError('Failed to load QR code')
+      })
+
+    return () => {
+      cancelled = true
+      if (objectUrl) window.URL.revokeObjectURL(objectUrl)
+    }
+  }, [animalId, qrCodeUrl])
 
   const handleDownload = async () => {
     try {
@@ -73,12 +96,18 @@ export function QRCodeViewer({ animalId, animalName, qrCodeUrl }: QRCodeViewerPr
       {/* QR Code Display */}
       <div className="relative">
         <div className="bg-white p-4 rounded-lg mx-auto w-fit">
-          <img
-            src={qrCodeUrl}
-            alt={`QR Code for ${animalName}`}
-            className="w-32 h-32 mx-auto pixelated"
-            style={{ imageRendering: 'crisp-edges' }}
-          />
+          {imageUrl ? (
+            <img
+              src={imageUrl}
+              alt={`QR Code for ${animalName}`}
+              className="w-32 h-32 mx-auto pixelated"
+              style={{ imageRendering: 'crisp-edges' }}
+            />
+          ) : (
+            <div className="w-32 h-32 mx-auto flex items-center justify-center">
+              <Loader2 className="w-6 h-6 text-gray-400 animate-spin" />
+            </div>
+          )}
         </div>
         
         {/* Cyber glow effect */}
@@ -133,6 +133,16 @@ export const authAPI = {
     const response = await api.put(`/api/auth/users/${userId}/role/`, { role })
     return response.data
   },
+
+  async importStaff(file: File, role?: string) {
+    const formData = new FormData()
+    formData.append('file', file)
+    const response = await api.post('/api/auth/users/bulk/', formData, {
+      params: role ? { role } : undefined,
+      headers: { 'Content-Type': 'multipart/form-data' },
+    })
+    return response.data
+  },
 }
 
 // Animals API functions
@@ -142,6 +152,7 @@ export const animalsAPI = {
     search?: string
     sex?: string
     breed?: string
+    type?: string
     health_status?: string
     min_age?: number
     max_age?: number
@@ -186,6 +197,21 @@ export const animalsAPI = {
     return response.data
   },
 
+  async batchUpdateAnimals(updates: Array<{ id?: number; animal_id?: string } & Partial<{
+    name: string
+    sex: string
+    breed: string
+    year_of_birth: number
+    father: number | null
+    mother: number | null
+    weight: number
+    health_status: string
+    notes: string
+  }>>) {
+    const response = await api.patch('/api/api/animals/batch/', updates)
+    return response.data
+  },
+
   async deleteAnimal(id: number) {
     const response = await api.delete(`/api/api/animals/${id}/`)
     return response.data
@@ -196,8 +222,18 @@ export const animalsAPI = {
     return response.data
   },
 
-  async getParents() {
-    const response = await api.get('/api/api/animals/parents/')
+  async getParents(params?: { q?: string; type?: string; limit?: number }) {
+    const response = await api.get('/api/api/animals/parents/', { params })
+    return response.data
+  },
+
+  async getMates(id: number, limit?: number) {
+    const response = await api.get(`/api/api/animals/${id}/mates/`, { params: { limit } })
+    return response.data
+  },
+
+  async getBreedingPlan(params?: Record<string, string | number>) {
+    const response = await api.get('/api/api/animals/breeding_plan/', { params })
     return response.data
   },
 
@@ -207,6 +243,104 @@ export const animalsAPI = {
     })
     return response.data
   },
+
+  async scan(animalId: string) {
+    const response = await api.get(`/api/api/animals/scan/${animalId}/`)
+    return response.data
+  },
+
+  async scanBatch(animalIds: string[]) {
+    const response = await api.post('/api/api/animals/scan/', { animal_ids: animalIds })
+    return response.data
+  },
+
+  async downloadQRTags(format: 'pdf' | 'zip', params?: Record<string, string | number>) {
+    const response = await api.get('/api/api/animals/tags/', {
+      params: { ...params, format },
+      responseType: 'blob',
+    })
+    return response.data
+  },
+
+  async exportAnimals(format: 'csv' | 'ndjson' | 'xlsx', params?: Record<string, string | number>) {
+    const response = await api.get('/api/api/animals/export/', {
+      params: { ...params, format },
+      responseType: 'blob',
+    })
+    return response.data
+  },
+}
+
+export const weightsAPI = {
+  async getRecords(params?: { animal?: number; since?: string; until?: string; page?: number }) {
+    const response = await api.get('/api/api/weights/', { params })
+    return response.data
+  },
+
+  async recordSession(records: { animal_id: string; weight: number; measured_at?: string }[]) {
+    const response = await api.post('/api/api/weights/bulk/', records)
+    return response.data
+  },
+
+  async getADG(params?: Record<string, string | number>) {
+    const response = await api.get('/api/api/weights/adg/', { params })
+    return response.data
+  },
+
+  async getGrowthCurve(params?: Record<string, string | number>) {
+    const response = await api.get('/api/api/weights/growth_curve/', { params })
+    return response.data
+  },
+
+  async getPercentiles(params?: { metric?: 'weight' | 'adg'; group_by?: 'breed' | 'cohort' | 'type' }) {
+    const response = await api.get('/api/api/weights/percentiles/', { params })
+    return response.data
+  },
+}
+
+export const healthEventsAPI = {
+  async getEvents(params?: { animal?: number; status?: string; diagnosis?: string; since?: string; until?: string; page?: number }) {
+    const response = await api.get('/api/api/health-events/', { params })
+    return response.data
+  },
+
+  async recordEvent(data: {
+    animal: number
+    status: string
+    diagnosis?: string
+    treatment?: string
+    vet?: string
+    occurred_on?: string
+    notes?: string
+  }) {
+    const response = await api.post('/api/api/health-events/', data)
+    return response.data
+  },
+
+  async getIncidence(params?: { period?: 'week' | 'month'; status?: string; since?: string; until?: string }) {
+    const response = await api.get('/api/api/health-events/incidence/', { params })
+    return response.data
+  },
+}
+
+export const syncAPI = {
+  async pull(since = 0, limit?: number) {
+    const response = await api.get('/api/sync/', { params: { since, limit } })
+    return response.data
+  },
+
+  async push(changes: Array<{
+    op: 'create' | 'update' | 'delete'
+    model: 'animals'
+    id?: number
+    token?: number
+    force?: boolean
+    client_id?: string
+    data?: Record<string, unknown>
+  }>) {
+    const response = await api.post('/api/sync/upload/', { changes })
+    return response.data
+  },
 }
 
 export default api
@@ -14,6 +14,7 @@ export interface User {
     can_view_reports: boolean
     can_manage_users: boolean
   }
+  capabilities?: string[]
 }
 
 export interface Animal {
@@ -31,7 +32,6 @@ export interface Animal {
   weight?: number
   health_status: string
   notes: string
-  qr_code?: string
   qr_code_url?: string
   age: number
   offspring_count: number
@@ -68,6 +68,7 @@ export interface AnimalStatistics {
     female: number
   }
   by_breed: Record<string, number>
+  by_type: Record<string, number>
   by_health_status: Record<string, number>
   average_age: number
 }